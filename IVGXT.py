@@ -1,16 +1,14 @@
-import re
 import struct
 import sys
 from pathlib import Path
 
+from charmap import write_iv_charmap
+from txt_loader import iter_records, filter_chars, TABLE, ORIGINAL, INVALID
+
 # ---------- 配置 ----------
 INPUT_TXT = Path('GTA4.txt')
 OUTPUT_GXT = Path('chinese.gxt')
 
-# ---------- 文本格式 ----------
-TABLE_RE = re.compile(r'^\[([0-9a-zA-Z_]{1,7})\]\s*$')
-ENTRY_RE = re.compile(r'^(.+?)=(.*)$')
-
 # ---------- GTA4 GXT 哈希 ----------
 def gta4_gxt_hash(key: str) -> int:
     ret_hash = 0
@@ -66,89 +64,72 @@ def warn(msg):
     print("WARN:", msg)
 
 def load_txt(filepath: Path, special_chars=None):
-    
-
     if special_chars is None:
         special_chars = set()
 
     m_Data = {}
     current_table = None
+    chars = set()
 
-    raw = filepath.read_bytes()
-    # strip BOM if present (C++ SkipUTF8Signature does this)
-    if raw.startswith(b'\xEF\xBB\xBF'):
-        raw = raw[3:]
-    text = raw.decode('utf-8', errors='replace')
-    lines = text.splitlines()
-
-    for line_no, raw_line in enumerate(lines, 1):
-        line = raw_line.strip()
-        if not line:
-            continue
-
-        # 收集行中的特殊字符
-        for char in raw_line:
-            if ord(char) > 255:
-                special_chars.add(char)
-
-        m_tab = TABLE_RE.match(line)
-        if m_tab:
-            current_table = m_tab.group(1)
+    # strip BOM / 逐行读取由 txt_loader 负责（C++ SkipUTF8Signature）
+    for kind, line_no, key_left, b_string in iter_records(filepath, 'IV', errors='replace'):
+        if kind == TABLE:
+            current_table = key_left
             if current_table not in m_Data:
                 m_Data[current_table] = []
             continue
 
-        # accept both 0x...=text and plain keys
-        is_original = False
-        if line.startswith(';'):
-            # original/comment — C++ would set is_original true; we support it
-            is_original = True
-            line = line[1:]
-
-        m_entry = ENTRY_RE.match(line)
-        if m_entry:
-            key_left = m_entry.group(1).strip()
-            b_string = m_entry.group(2)
-
-            if current_table is None:
-                warn(f"{filepath}: line {line_no} has entry without table; assigning to MAIN")
-                current_table = 'MAIN'
-                if current_table not in m_Data:
-                    m_Data[current_table] = []
-
-            # compute hash_string: if left looks like 0xHEX use it, else compute hash
-            hash_str = key_left
-            # try to detect hex literal
-            try:
-                if key_left.lower().startswith('0x'):
-                    int(key_left, 16)  # validate
-                    # keep as-is
-                else:
-                    # try decimal number
-                    int(key_left)
-                # if parsing succeeded, keep original key_left
-            except Exception:
-                # treat as plain key -> compute hash
-                h = gta4_gxt_hash(key_left)
-                hash_str = f'0x{h:08X}'
-
-            # ensure list exists
+        if kind == INVALID:
+            chars.update(key_left)
+            warn(f"{filepath}: line {line_no} cannot be recognized.")
+            continue
+
+        # ';' 开头为原文（C++ 中 is_original = true）
+        is_original = kind == ORIGINAL
+        chars.update(key_left)
+        chars.update(b_string)
+        key_left = key_left.strip()
+
+        if current_table is None:
+            warn(f"{filepath}: line {line_no} has entry without table; assigning to MAIN")
+            current_table = 'MAIN'
             if current_table not in m_Data:
                 m_Data[current_table] = []
 
-            # C++ logic: if table empty or last.hash_string != hash_string -> emplace_back new TextEntry
-            if not m_Data[current_table] or m_Data[current_table][-1]['hash_string'] != hash_str:
-                m_Data[current_table].append({'hash_string': hash_str, 'original': '', 'translated': ''})
-            p_entry = m_Data[current_table][-1]
-            if is_original:
-                p_entry['original'] = b_string
+        # compute hash_string: if left looks like 0xHEX use it, else compute hash
+        hash_str = key_left
+        # try to detect hex literal
+        try:
+            if key_left.lower().startswith('0x'):
+                int(key_left, 16)  # validate
+                # keep as-is
             else:
-                p_entry['translated'] = b_string
-                # check ~ token parity like C++ did (optional warning)
-                if (b_string.count('~') & 1) == 1:
-                    warn(f"{filepath}: line {line_no} has odd number of '~'.")
+                # try decimal number
+                int(key_left)
+            # if parsing succeeded, keep original key_left
+        except Exception:
+            # treat as plain key -> compute hash
+            h = gta4_gxt_hash(key_left)
+            hash_str = f'0x{h:08X}'
+
+        # ensure list exists
+        if current_table not in m_Data:
+            m_Data[current_table] = []
+
+        # C++ logic: if table empty or last.hash_string != hash_string -> emplace_back new TextEntry
+        if not m_Data[current_table] or m_Data[current_table][-1]['hash_string'] != hash_str:
+            m_Data[current_table].append({'hash_string': hash_str, 'original': '', 'translated': ''})
+        p_entry = m_Data[current_table][-1]
+        if is_original:
+            p_entry['original'] = b_string
         else:
-            warn(f"{filepath}: line {line_no} cannot be recognized.")
+            p_entry['translated'] = b_string
+            # check ~ token parity like C++ did (optional warning)
+            if (b_string.count('~') & 1) == 1:
+                warn(f"{filepath}: line {line_no} has odd number of '~'.")
+
+    # 收集行中的特殊字符（整值 set.update 后统一过滤）
+    special_chars.update(filter_chars(chars, 255))
     # ensure MAIN exists
     if 'MAIN' not in m_Data:
         m_Data['MAIN'] = []
@@ -241,34 +222,16 @@ def generate_binary(m_Data, output_path: Path):
     print(f"已生成GXT文件: {output_path} (表的数量: {len(table_names)})")
 
 # ---------- 特殊字符收集功能 ----------
-def process_special_chars(special_chars):
+def process_special_chars(special_chars, lookup=None):
     # 移除不需要的特殊字符
     special_chars.discard(chr(0x2122))  # trademark
     special_chars.discard(chr(0x3000))  # 全角空格
     special_chars.discard(chr(0xFEFF))  # BOM标记
 
-    char_per_line = 64
-    char_index = 0
-
-    # 将结果写入CHARACTERS.txt
-    with open('CHARACTERS.txt', 'w', encoding='utf-8') as f:
-        if special_chars:
-            for char in sorted(special_chars, key=lambda c: ord(c)):
-                f.write(char)
-                char_index += 1
-                if (char_index >= char_per_line):
-                    f.write('\n')
-                    char_index = 0
+    # 写入CHARACTERS.txt与char_table.dat
+    write_iv_charmap(special_chars, lookup)
 
     print("已生成字符表 'CHARACTERS.txt'")
-
-    # 将结果写入char_table.dat
-    with open('char_table.dat', 'wb') as f:
-        if special_chars:
-            f.write(len(special_chars).to_bytes(4, byteorder='little'))
-            for char in sorted(special_chars, key=lambda c: ord(c)):
-                f.write(ord(char).to_bytes(4, byteorder='little'))
-
     print("已生成映射表 'char_table.dat'")
 
 # ---------- 主流程 ----------
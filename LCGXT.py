@@ -1,7 +1,9 @@
-import re
 import struct
 import os
 
+from charmap import write_iii_charmap
+from txt_loader import iter_records, utf16_units, INVALID
+
 class LCGXT:
     SIZE_OF_TKEY = 12
     
@@ -12,36 +14,24 @@ class LCGXT:
     def load_text(self, path):
         self.m_GxtData = {}
         self.m_WideCharCollection = set()
+        chars = set()
         
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.rstrip('\n')
-                    # 跳过空行和注释
-                    if not line or line.startswith(';'):
-                        continue
-                    
-                    # 使用正则匹配键值对
-                    match = re.match(r'([0-9a-zA-Z_]{1,7})=(.*)', line)
-                    if not match:
-                        print(f"Invalid line:\n{line}\n")
-                        return False
-                    
-                    key = match.group(1)
-                    value = match.group(2)
-                    utf16_data = self.utf8_to_utf16(value)
-                    
-                    # 特殊键名处理
-                    if key in ["CHS2500", "CHS3000"] or key not in self.m_GxtData:
-                        self.m_GxtData[key] = utf16_data
-                        # 收集宽字符
-                        for char in utf16_data:
-                            if char >= 0x80:
-                                self.m_WideCharCollection.add(char)
+            for kind, _, key, value in iter_records(path, 'III'):
+                if kind == INVALID:
+                    print(f"Invalid line:\n{key}\n")
+                    return False
+                
+                # 特殊键名处理
+                if key in ["CHS2500", "CHS3000"] or key not in self.m_GxtData:
+                    self.m_GxtData[key] = self.utf8_to_utf16(value)
+                    chars.update(value)
         except Exception as e:
             print(f"Error reading file: {e}")
             return False
         
+        # 收集宽字符
+        self.m_WideCharCollection = utf16_units(chars, 0x7F)
         return True
     
     def save_as_gxt(self, path):
@@ -90,31 +80,13 @@ class LCGXT:
             size += len(utf16_data) * 2
         return size
     
-    def generate_wmhhz_stuff(self):
+    def generate_wmhhz_stuff(self, order=None, lookup=None):
+        """order 为字符顺序（空位为 None，见 char_order），默认按码位排序；
+        lookup 为 'direct' / 'paged' 时同时生成 char_lookup.dat"""
+        if order is None:
+            order = sorted(self.m_WideCharCollection)
         try:
-            # 写入CHARACTERS.txt
-            with open('CHARACTERS.txt', 'wb') as f:
-                f.write(b'\xFF\xFE')  # UTF-16 LE BOM
-                row = 0
-                col = 0
-                for char in sorted(self.m_WideCharCollection):
-                    f.write(struct.pack('<H', char))
-                    col += 1
-                    if col >= 64:
-                        f.write(b'\x0A\x00')  # UTF-16 LE换行
-                        row += 1
-                        col = 0
-            
-            # 写入TABLE.txt
-            with open('TABLE.txt', 'w', encoding='utf-8') as f:
-                row = 0
-                col = 0
-                for char in sorted(self.m_WideCharCollection):
-                    f.write(f"m_Table[0x{char:04X}] = {{{row},{col}}};\n")
-                    col += 1
-                    if col >= 64:
-                        row += 1
-                        col = 0
+            write_iii_charmap(order, lookup)
         except Exception as e:
             print(f"Error generating files: {e}")
     
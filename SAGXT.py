@@ -1,7 +1,9 @@
 import os
-import re
 import struct
 
+from charmap import write_sa_charmap
+from txt_loader import iter_records, TABLE, ENTRY
+
 class SAGXT:
     SizeOfTABL = 12
     SizeOfTKEY = 8
@@ -11,45 +13,33 @@ class SAGXT:
         self.m_WideCharCollection = set()
 
     def load_text(self, path: str) -> bool:
-        table_format = re.compile(r"\[([0-9A-Z_]{1,7})\]")
-        entry_format = re.compile(r"([0-9a-fA-F]{1,8})=(.+)")
-
         current_table = None
+        table_name = None
         self.m_GxtData.clear()
         self.m_WideCharCollection.clear()
 
         try:
-            with open(path, encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith(';'):
-                        continue
-
-                    table_match = table_format.fullmatch(line)
-                    entry_match = entry_format.fullmatch(line)
-
-                    if table_match:
-                        table_name = table_match.group(1)
-                        self.m_GxtData[table_name] = dict()
-                        current_table = self.m_GxtData[table_name]
-                    elif entry_match:
-                        if current_table is None:
-                            print(f"键 {entry_match.group(1)} 没有对应表。")
-                            return False
-
-                        hash_key = int(entry_match.group(1), 16)
-                        text = entry_match.group(2)
-
-                        if hash_key in current_table:
-                            print(f"重复项:\n{entry_match.group(1)}\n所在表:\n{table_name}\n")
-                            return False
-
-                        current_table[hash_key] = text
-                        for ch in text:
-                            self.m_WideCharCollection.add(ch)
-                    else:
-                        print(f"非法行:\n{line}\n")
+            for kind, _, key, value in iter_records(path, 'SA'):
+                if kind == TABLE:
+                    table_name = key
+                    self.m_GxtData[table_name] = dict()
+                    current_table = self.m_GxtData[table_name]
+                elif kind == ENTRY:
+                    if current_table is None:
+                        print(f"键 {key} 没有对应表。")
+                        return False
+
+                    hash_key = int(key, 16)
+
+                    if hash_key in current_table:
+                        print(f"重复项:\n{key}\n所在表:\n{table_name}\n")
                         return False
+
+                    current_table[hash_key] = value
+                    self.m_WideCharCollection.update(value)
+                else:
+                    print(f"非法行:\n{key}\n")
+                    return False
             return True
         except Exception as e:
             print(f"读取文件出错: {e}")
@@ -108,27 +98,13 @@ class SAGXT:
         except Exception as e:
             print(f"写入GXT失败: {e}")
 
-    def generate_wmhhz_stuff(self):
+    def generate_wmhhz_stuff(self, order=None, lookup=None):
+        """order 为字符顺序（空位为 None，见 char_order），默认按码位排序；
+        lookup 为 'direct' / 'paged' 时同时生成 char_lookup.dat"""
+        if order is None:
+            order = sorted(self.m_WideCharCollection)
         try:
-            with open("TABLE.txt", "w", encoding='utf-8') as conv_code, \
-                open("CHARACTERS.txt", "wb") as characters_set:
-
-                characters_set.write(b"\xFF\xFE")  # UTF-16LE BOM
-
-                row, column = 0, 0
-                for char in sorted(self.m_WideCharCollection):
-                    if ord(char) <= 0x7F:
-                        continue  # 跳过 ASCII
-
-                    conv_code.write(f"m_Table[0x{ord(char):X}] = {{{row},{column}}};\n")
-                    characters_set.write(char.encode('utf-16le'))
-
-                    if column < 63:
-                        column += 1
-                    else:
-                        row += 1
-                        characters_set.write('\n'.encode('utf-16le'))
-                        column = 0
+            write_sa_charmap(order, lookup)
         except Exception as e:
             print(f"生成 WMHHZ 输出失败: {e}")
 
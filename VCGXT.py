@@ -1,13 +1,15 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import re
 import os
 import struct
 import sys
 from collections import OrderedDict
 from functools import cmp_to_key
 
+from charmap import write_vc_charmap
+from txt_loader import iter_records, utf16_units, TABLE, ENTRY
+
 class VCGXT:
     SizeOfTABL = 12
     SizeOfTKEY = 12
@@ -36,8 +38,7 @@ class VCGXT:
         """UTF-8转UTF-16LE并返回整数列表"""
         try:
             encoded = s.encode('utf-16le')
-            return [struct.unpack('<H', encoded[i:i+2])[0] 
-                    for i in range(0, len(encoded), 2)] + [0]
+            return list(struct.unpack(f'<{len(encoded) // 2}H', encoded)) + [0]
         except UnicodeEncodeError:
             print(f"编码错误: {s}")
             return []
@@ -46,63 +47,46 @@ class VCGXT:
         """加载并解析GXT文本文件"""
         self.m_GxtData.clear()
         current_table = None
+        chars = set()
         
         try:
-            with open(path, 'r', encoding='utf-8-sig') as f:
-                lines = f.readlines()
-        except Exception as e:
-            print(f"打开文件失败: {e}")
-            return False
-
-        table_format = re.compile(r'^\[([0-9A-Z_]{1,7})\]$')
-        entry_format = re.compile(r'^([0-9A-Z_]{1,7})=(.*)$')
-        
-        for line_num, line in enumerate(lines, 1):
-            line = line.strip()
-            if not line or line.startswith(';'):
-                continue
-
-            # 匹配表头
-            table_match = table_format.match(line)
-            if table_match:
-                table_name = table_match.group(1)
-                current_table = table_name
-                if table_name not in self.m_GxtData:
-                    self.m_GxtData[table_name] = {}
-                continue
+            for kind, line_num, key, value in iter_records(path, 'VC'):
+                # 匹配表头
+                if kind == TABLE:
+                    current_table = key
+                    if key not in self.m_GxtData:
+                        self.m_GxtData[key] = {}
+                    continue
 
-            # 匹配键值对
-            entry_match = entry_format.match(line)
-            if entry_match:
-                if current_table is None:
-                    print(f"第{line_num}行: 键不属于任何表")
-                    return False
+                # 匹配键值对
+                if kind == ENTRY:
+                    if current_table is None:
+                        print(f"第{line_num}行: 键不属于任何表")
+                        return False
                     
-                key = entry_match.group(1)
-                value = entry_match.group(2)
-                
-                # 检查波浪号配对
-                if value.count('~') % 2 != 0:
-                    print(f"第{line_num}行: 无效的波浪号格式 - {key}")
-                    continue
-                
-                # 转换编码并存储
-                utf16_data = self._utf8_to_utf16(value)
-                if key in self.m_GxtData[current_table]:
-                    print(f"第{line_num}行: 重复的键 - {key}")
-                    return False
+                    # 检查波浪号配对
+                    if value.count('~') % 2 != 0:
+                        print(f"第{line_num}行: 无效的波浪号格式 - {key}")
+                        continue
                     
-                self.m_GxtData[current_table][key] = utf16_data
-                
-                # 收集宽字符
-                for char in utf16_data:
-                    if char > 0x7F:
-                        self.m_WideCharCollection.add(char)
-                continue
+                    if key in self.m_GxtData[current_table]:
+                        print(f"第{line_num}行: 重复的键 - {key}")
+                        return False
+                    
+                    # 转换编码并存储
+                    self.m_GxtData[current_table][key] = self._utf8_to_utf16(value)
+                    chars.update(value)
+                    continue
 
-            print(f"第{line_num}行: 无效格式 - {line}")
+                print(f"第{line_num}行: 无效格式 - {key}")
+                return False
+        except Exception as e:
+            print(f"打开文件失败: {e}")
             return False
 
+        # 收集宽字符
+        self.m_WideCharCollection.update(utf16_units(chars, 0x7F))
+
         # 应用自定义排序
         self.m_GxtData = OrderedDict(sorted(
             self.m_GxtData.items(), 
@@ -172,37 +156,13 @@ class VCGXT:
             print(f"保存GXT失败: {e}")
             return False
 
-    def GenerateWMHHZStuff(self):
-        """生成字符映射文件"""
+    def GenerateWMHHZStuff(self, order=None, lookup=None):
+        """生成字符映射文件；order 为字符顺序（空位为 None，见 char_order），默认按码位排序；
+        lookup 为 'direct' / 'paged' 时同时生成 char_lookup.dat"""
+        if order is None:
+            order = sorted(self.m_WideCharCollection)
         try:
-            # 生成CHARACTERS.txt
-            with open('CHARACTERS.txt', 'wb') as f:
-                f.write(b'\xFF\xFE')  # UTF-16LE BOM
-                
-                # 按行列组织字符
-                char_table = {}
-                sorted_chars = sorted(self.m_WideCharCollection)
-                for idx, char in enumerate(sorted_chars):
-                    row = idx // 64
-                    col = idx % 64
-                    char_table[char] = (row, col)
-                    f.write(struct.pack('<H', char))
-                    if col == 63:
-                        f.write(b'\x0A\x00')  # 换行符
-                
-            # 生成wm_vcchs.dat
-            with open('wm_vcchs.dat', 'wb') as f:
-                # 初始化65536个默认值(?字符)
-                default_entry = struct.pack('BB', 63, 63)
-                for _ in range(0x10000):
-                    f.write(default_entry)
-                
-                # 更新实际字符位置
-                for char, (row, col) in char_table.items():
-                    if char < 0x10000:
-                        f.seek(char * 2)
-                        f.write(struct.pack('BB', row, col))
-            
+            write_vc_charmap(order, lookup)
             print("成功生成WMHHZ文件")
             return True
             
@@ -0,0 +1,69 @@
+import json
+import os
+
+# =======================
+# 字符映射的稳定顺序：CHARACTERS.txt、TABLE.txt、wm_vcchs.dat 按这里的顺序分配行列（每行 64 个），
+# 顺序保存在输出目录的 char_order.json 中。已有的字符保持原来的行列，新字符接在最后，
+# 不再用到的字符留下空位（None）；需要时可压缩掉空位（之后的字符会移动，贴图须重新生成）。
+# 没有 char_order.json 时按码位排序，与原来的输出相同。
+# 字体贴图的格子也按同一顺序排列（texture_layout），第 i 格即字符映射的第 i 个位置
+# =======================
+
+ORDER_NAME = 'char_order.json'
+ORDER_VERSION = 1
+CHARS_PER_ROW = 64
+
+
+def load_order(output_dir, version):
+    """读取 output_dir 中上次的顺序（码位列表，空位为 None）；没有、无法读取或版本不同时返回 None"""
+    try:
+        with open(os.path.join(output_dir, ORDER_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('order_version') != ORDER_VERSION or manifest.get('version') != version:
+        return None
+    order = manifest.get('chars')
+    if not isinstance(order, list) or not all(c is None or isinstance(c, int) for c in order):
+        return None
+    return order
+
+
+def save_order(output_dir, version, order):
+    manifest = {'order_version': ORDER_VERSION, 'version': version, 'chars': order}
+    with open(os.path.join(output_dir, ORDER_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+
+def stable_order(codes, previous=None, compact=False):
+    """本次需要的码位 codes 与上次的顺序 previous 合并：已有的保持原位，不再需要的变为空位，
+    新码位按大小接在最后；compact 为真时去掉空位"""
+    codes = set(codes)
+    if previous is None:
+        return sorted(codes)
+    order = [c if c in codes else None for c in previous]
+    order.extend(sorted(codes.difference(previous)))
+    if compact:
+        order = [c for c in order if c is not None]
+    while order and order[-1] is None:
+        order.pop()
+    return order
+
+
+def ordered_codes(output_dir, version, codes, compact=False):
+    """按 output_dir 中保存的顺序排列 codes，保存并返回新的顺序"""
+    order = stable_order(codes, load_order(output_dir, version), compact)
+    save_order(output_dir, version, order)
+    return order
+
+
+def ordered_chars(output_dir, version, chars, compact=False):
+    """同 ordered_codes，用于以字符保存字符集合的 SA：跳过 ASCII，返回字符列表"""
+    order = ordered_codes(output_dir, version, {ord(c) for c in chars if ord(c) > 0x7F}, compact)
+    return [None if c is None else chr(c) for c in order]
+
+
+def texture_layout(order):
+    """字体贴图的格子（字符，空格子为 None）：第 i 格为顺序 order 中第 i 个位置的字符。
+    UTF-16 代理码元（VC / III 中 U+FFFF 以外的字符）不能单独绘制，留空"""
+    return [None if c is None or 0xD800 <= c <= 0xDFFF else chr(c) for c in order]
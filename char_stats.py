@@ -0,0 +1,79 @@
+from collections import Counter
+
+# =======================
+# 字符统计：文档中每个字符（码位）的出现次数。打开文件时逐表批量统计（numpy），之后随编辑增量更新；
+# 字符集合、字体贴图字符等只需遍历不同的字符（通常几千个），不必再扫描所有值
+# =======================
+
+FONT_EXCLUDED = frozenset((chr(0x2122), chr(0x3000), chr(0xFEFF)))  # ™、全角空格与 BOM 不放进字体贴图
+BULK_MIN = 4096  # 文本超过这么多字符时用 numpy 统计
+
+
+def count_chars(texts):
+    """统计一组字符串中每个字符的出现次数，返回 Counter"""
+    text = ''.join(texts)
+    if len(text) < BULK_MIN:
+        return Counter(text)
+    import numpy as np
+    codes = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype='<u4')
+    counts = np.bincount(codes)
+    present = np.flatnonzero(counts)
+    return Counter(dict(zip(map(chr, present.tolist()), counts[present].tolist())))
+
+
+def is_font_char(c):
+    """字体贴图需要的字符：码点 > 255，不含 ™、全角空格与 BOM"""
+    return ord(c) > 255 and c not in FONT_EXCLUDED
+
+
+class CharHistogram:
+    """字符 -> 出现次数，只保存次数大于 0 的字符"""
+
+    def __init__(self):
+        self.counts = Counter()
+
+    @classmethod
+    def from_data(cls, data):
+        """统计 {表名: {键: 值}} 中所有值的字符"""
+        hist = cls()
+        for entries in data.values():
+            hist.add(entries.values())
+        return hist
+
+    def add(self, texts):
+        """加入一组字符串，返回其中新出现的字符"""
+        counts = self.counts
+        added = count_chars(texts)
+        new = {c for c in added if c not in counts}
+        counts.update(added)
+        return new
+
+    def remove(self, texts):
+        """去掉一组字符串（须是之前加入过的）"""
+        counts = self.counts
+        for c, n in count_chars(texts).items():
+            left = counts[c] - n
+            if left > 0:
+                counts[c] = left
+            else:
+                del counts[c]
+
+    def replace(self, old_texts, new_texts):
+        """一批修改：old_texts 换成 new_texts，返回新出现的字符（先加后减，原有的字符不算新出现）"""
+        new = self.add(new_texts)
+        self.remove(old_texts)
+        return new
+
+    def chars(self):
+        """文档中出现的所有字符"""
+        return set(self.counts)
+
+    def font_chars(self):
+        """字体贴图需要的字符，按码点排序"""
+        return "".join(sorted(c for c in self.counts if is_font_char(c)))
+
+    def __contains__(self, c):
+        return c in self.counts
+
+    def __len__(self):
+        return len(self.counts)
@@ -0,0 +1,182 @@
+import struct
+
+# =======================
+# 字符映射引擎：由字符顺序（码位或字符，空位为 None，见 char_order）用 numpy 一次算出
+# 所有字符的行列（每行 64 个），各版本的 CHARACTERS.txt、TABLE.txt、wm_vcchs.dat、
+# char_table.dat 都由它生成，每个文件一次写入。输出与原来逐字符写入的结果逐字节相同
+# =======================
+
+CHARS_PER_ROW = 64
+HOLE = ' '  # CHARACTERS.txt 中空位的占位字符
+VC_DEFAULT = 63  # wm_vcchs.dat 中未收录字符的行列（'?'）
+
+# =======================
+# 二进制查找表 char_lookup.dat（可选，各版本通用），插件 mmap 后 O(1) 查找，不必重新编译 TABLE.txt。
+# 全部为小端：文件头 16 字节 = 'GXLU' + 格式版本 u16 + 类型 u16 + 字符数 u32 + 页数 u32，之后为 u16 数组：
+#   LOOKUP_DIRECT：65536 项，下标为码位（只能收录 U+FFFF 以内的字符）
+#   LOOKUP_PAGED：0x1100 项的页目录（下标为 码位 >> 8，值为页号，0 为空页），
+#                 之后是 页数 + 1 个页（第 0 页全空），每页 256 项，下标为 码位 & 0xFF
+# 每项为字符的位置序号 slot（行 = slot // 64，列 = slot % 64），0xFFFF 表示未收录。
+# VC / III 的码位为 UTF-16 码元，与 wm_vcchs.dat / TABLE.txt 一致
+# =======================
+
+LOOKUP_NAME = 'char_lookup.dat'
+LOOKUP_MAGIC = b'GXLU'
+LOOKUP_VERSION = 1
+LOOKUP_DIRECT = 0
+LOOKUP_PAGED = 1
+LOOKUP_KINDS = {'direct': LOOKUP_DIRECT, 'paged': LOOKUP_PAGED}
+LOOKUP_EMPTY = 0xFFFF
+LOOKUP_PAGE = 256
+LOOKUP_DIRECTORY = 0x110000 // LOOKUP_PAGE
+_LOOKUP_HEADER = struct.Struct('<4sHHII')
+
+
+class CharMap:
+    """一组字符的行列：slots 为非空位的序号，codes 为对应的码位，rows / cols 为行列（numpy 数组）"""
+
+    def __init__(self, order):
+        import numpy as np
+        self.order = order
+        slots = [i for i, c in enumerate(order) if c is not None]
+        self.slots = np.array(slots, dtype=np.int64)
+        self.codes = np.array([c if isinstance(c, int) else ord(c) for c in (order[i] for i in slots)], dtype=np.int64)
+        self.rows, self.cols = np.divmod(self.slots, CHARS_PER_ROW)
+
+    def characters_text(self):
+        """CHARACTERS.txt 的内容：每个位置一个字符，每满 64 个换一行"""
+        text = ''.join(HOLE if c is None else c if isinstance(c, str) else chr(c) for c in self.order)
+        full = len(text) - len(text) % CHARS_PER_ROW
+        return ''.join([text[i:i + CHARS_PER_ROW] + '\n' for i in range(0, full, CHARS_PER_ROW)]) + text[full:]
+
+    def table_text(self, fmt):
+        """TABLE.txt 的内容，fmt 为带 (码位, 行, 列) 三个参数的单行格式"""
+        return ''.join([fmt % entry for entry in zip(self.codes.tolist(), self.rows.tolist(), self.cols.tolist())])
+
+    def direct_table(self):
+        """wm_vcchs.dat 的内容：65536 × (行, 列) 的 uint8 数组，未收录的字符为 (63, 63)"""
+        import numpy as np
+        table = np.full((0x10000, 2), VC_DEFAULT, dtype=np.uint8)
+        inside = self.codes < 0x10000
+        if inside.any() and self.rows[inside].max() > 0xFF:
+            raise ValueError("字符过多，wm_vcchs.dat 的行号超出 255")
+        table[self.codes[inside], 0] = self.rows[inside]
+        table[self.codes[inside], 1] = self.cols[inside]
+        return table
+
+    def lookup_table(self, kind='direct'):
+        """char_lookup.dat 的内容（bytes），kind 为 'direct' 或 'paged'"""
+        import numpy as np
+        if len(self.slots) and self.slots.max() >= LOOKUP_EMPTY:
+            raise ValueError(f"字符位置超出查找表范围（最多 {LOOKUP_EMPTY} 个位置）")
+        if kind == 'direct':
+            if len(self.codes) and self.codes.max() > 0xFFFF:
+                raise ValueError("直接索引表只能收录 U+FFFF 以内的字符，请使用分页表")
+            table = np.full(0x10000, LOOKUP_EMPTY, dtype='<u2')
+            table[self.codes] = self.slots
+            arrays, pages = [table], 0
+        elif kind == 'paged':
+            high = self.codes // LOOKUP_PAGE
+            used = np.unique(high)
+            directory = np.zeros(LOOKUP_DIRECTORY, dtype='<u2')
+            directory[used] = np.arange(1, len(used) + 1)
+            table = np.full((len(used) + 1, LOOKUP_PAGE), LOOKUP_EMPTY, dtype='<u2')
+            table[directory[high], self.codes % LOOKUP_PAGE] = self.slots
+            arrays, pages = [directory, table], len(used)
+        else:
+            raise ValueError(f"不支持的查找表类型: {kind}")
+        header = _LOOKUP_HEADER.pack(LOOKUP_MAGIC, LOOKUP_VERSION, LOOKUP_KINDS[kind], len(self.codes), pages)
+        return b''.join([header] + [a.tobytes() for a in arrays])
+
+
+class LookupTable:
+    """用 mmap 读取 char_lookup.dat（与插件的读法相同），get(码位) 返回 (行, 列)，未收录时返回 None"""
+
+    def __init__(self, path):
+        import mmap
+        import numpy as np
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, kind, self.count, pages = _LOOKUP_HEADER.unpack_from(self._mm)
+            if magic != LOOKUP_MAGIC or version != LOOKUP_VERSION or kind not in LOOKUP_KINDS.values():
+                raise ValueError(f"不是有效的查找表: {path}")
+            size = 0x10000 if kind == LOOKUP_DIRECT else LOOKUP_DIRECTORY + (pages + 1) * LOOKUP_PAGE
+            if len(self._mm) != _LOOKUP_HEADER.size + size * 2:
+                raise ValueError(f"查找表长度不正确: {path}")
+        except (ValueError, struct.error):
+            self._mm.close()
+            raise
+        body = np.frombuffer(self._mm, dtype='<u2', offset=_LOOKUP_HEADER.size)
+        self.kind = kind
+        if kind == LOOKUP_DIRECT:
+            self._directory, self._pages = None, body
+        else:
+            self._directory = body[:LOOKUP_DIRECTORY]
+            self._pages = body[LOOKUP_DIRECTORY:].reshape(pages + 1, LOOKUP_PAGE)
+
+    def slot(self, code):
+        if self._directory is None:
+            return int(self._pages[code]) if code < 0x10000 else LOOKUP_EMPTY
+        if code >= 0x110000:
+            return LOOKUP_EMPTY
+        return int(self._pages[self._directory[code // LOOKUP_PAGE], code % LOOKUP_PAGE])
+
+    def get(self, code):
+        slot = self.slot(code)
+        return None if slot == LOOKUP_EMPTY else divmod(slot, CHARS_PER_ROW)
+
+    def close(self):
+        self._directory = self._pages = None
+        self._mm.close()
+
+
+def _write_utf16_characters(cmap):
+    with open('CHARACTERS.txt', 'wb') as f:
+        f.write(b'\xFF\xFE' + cmap.characters_text().encode('utf-16le', 'surrogatepass'))
+
+
+def _write_lookup(cmap, lookup):
+    if lookup:
+        with open(LOOKUP_NAME, 'wb') as f:
+            f.write(cmap.lookup_table(lookup))
+
+
+# ---------- 各版本 ----------
+# lookup 为 'direct' / 'paged' 时同时生成 char_lookup.dat
+def write_vc_charmap(order, lookup=None):
+    """VC：CHARACTERS.txt + wm_vcchs.dat，order 为 UTF-16 码元"""
+    cmap = CharMap(order)
+    _write_utf16_characters(cmap)
+    cmap.direct_table().tofile('wm_vcchs.dat')
+    _write_lookup(cmap, lookup)
+
+
+def write_sa_charmap(order, lookup=None):
+    """SA：TABLE.txt + CHARACTERS.txt，order 为字符，跳过 ASCII"""
+    cmap = CharMap([c for c in order if c is None or ord(c) > 0x7F])
+    with open('TABLE.txt', 'w', encoding='utf-8') as f:
+        f.write(cmap.table_text('m_Table[0x%X] = {%d,%d};\n'))
+    _write_utf16_characters(cmap)
+    _write_lookup(cmap, lookup)
+
+
+def write_iii_charmap(order, lookup=None):
+    """III：CHARACTERS.txt + TABLE.txt，order 为 UTF-16 码元"""
+    cmap = CharMap(order)
+    _write_utf16_characters(cmap)
+    with open('TABLE.txt', 'w', encoding='utf-8') as f:
+        f.write(cmap.table_text('m_Table[0x%04X] = {%d,%d};\n'))
+    _write_lookup(cmap, lookup)
+
+
+def write_iv_charmap(chars, lookup=None):
+    """IV：CHARACTERS.txt + char_table.dat（字符数 + 按码位排序的码位，均为 u32）"""
+    import numpy as np
+    cmap = CharMap(sorted(chars))
+    with open('CHARACTERS.txt', 'w', encoding='utf-8') as f:
+        f.write(cmap.characters_text())
+    with open('char_table.dat', 'wb') as f:
+        if len(cmap.codes):
+            np.concatenate(([len(cmap.codes)], cmap.codes)).astype('<u4').tofile(f)
+    _write_lookup(cmap, lookup)
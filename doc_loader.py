@@ -0,0 +1,115 @@
+import os
+import threading
+from pathlib import Path
+
+from PySide6.QtCore import QObject, Signal
+
+from char_stats import CharHistogram
+
+# =======================
+# 后台打开文件：GXT 逐表读取、TXT 逐文件解析，每完成一步报告进度并交出读好的表；
+# 可随时取消。主窗口收到第一个表即可浏览，全部完成后再一次性换入新文档。
+# 格式模块（及 numpy）在后台线程中第一次读取时才导入；每读完一个表顺便统计字符
+# =======================
+
+KIND_GXT = 'gxt'
+KIND_DAT = 'dat'
+KIND_TXT = 'txt'
+
+
+class DocumentLoader(QObject):
+    """后台打开文件的线程：始终只处理最新一次 load，旧的读取被取消"""
+    begun = Signal(str, int)            # 版本, 总步数（GXT 为表数，TXT 为文件数，DAT 为 1）
+    progress = Signal(int, int, str)    # 已完成, 总数, 刚完成的表名或文件名
+    table_loaded = Signal(str, object)  # 表名, {键: 值}
+    finished = Signal(object)           # {'chars': CharHistogram, 'conflicts': [...]（TXT 的重复键）}
+    failed = Signal(str)                # 错误信息
+    # 跨线程只发送不带参数的信号，结果放在 _done 中，由主线程取出后再发出上面的信号
+    _ready = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._done = []
+        self._generation = 0
+        self.busy = False
+        self._ready.connect(self._deliver)
+
+    def load(self, kind, paths, version=None):
+        """开始读取。kind 为 KIND_GXT / KIND_DAT（paths 只有一个文件）或 KIND_TXT（version 为目标版本）"""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        self.busy = True
+        threading.Thread(target=self._run, args=(generation, kind, list(paths), version),
+                         name="gxt-open", daemon=True).start()
+
+    def cancel(self):
+        """取消正在进行的读取，之后不再发出它的任何信号"""
+        with self._lock:
+            self._generation += 1
+        self.busy = False
+
+    def _post(self, generation, signal, *args):
+        with self._lock:
+            self._done.append((generation, signal, args))
+        self._ready.emit()
+
+    def _deliver(self):
+        with self._lock:
+            done, self._done = self._done, []
+        for generation, signal, args in done:
+            # 已取消的读取可能还有结果在路上，丢弃
+            if generation != self._generation:
+                continue
+            if signal is self.finished or signal is self.failed:
+                self.busy = False
+            signal.emit(*args)
+
+    def _run(self, generation, kind, paths, version):
+        def is_stale():
+            return self._generation != generation
+
+        def post(signal, *args):
+            self._post(generation, signal, *args)
+
+        try:
+            chars = CharHistogram()
+            info = {'chars': chars, 'conflicts': []}
+            if kind == KIND_GXT:
+                from gxt_parser import GxtTables
+                with GxtTables(paths[0]) as gxt:
+                    post(self.begun, gxt.version, len(gxt))
+                    for done, (name, entries) in enumerate(gxt, 1):
+                        if is_stale():
+                            return
+                        chars.add(entries.values())
+                        post(self.table_loaded, name, entries)
+                        post(self.progress, done, len(gxt), name)
+            elif kind == KIND_DAT:
+                from whm_table import parse_whm_table
+                post(self.begun, "IV", 1)  # DAT文件与GTA4哈希兼容
+                items = parse_whm_table(Path(paths[0]))
+                if is_stale():
+                    return
+                # DAT文件没有表，创建一个默认表，哈希值转换为十六进制字符串作为键
+                entries = {f'0x{item["hash"]:08X}': item["text"] for item in items}
+                chars.add(entries.values())
+                post(self.table_loaded, "whm_table", entries)
+                post(self.progress, 1, 1, "whm_table")
+            else:
+                from txt_loader import load_txt_files
+                post(self.begun, version, len(paths))
+                result = load_txt_files(paths, version,
+                                        progress=lambda done, total, path: post(self.progress, done, total, os.path.basename(path)),
+                                        is_stale=is_stale)
+                if result is None:
+                    return
+                # 后面的文件可能覆盖前面文件中的表，只有全部合并后才能交出
+                data, info['conflicts'] = result
+                for name, entries in data.items():
+                    chars.add(entries.values())
+                    post(self.table_loaded, name, entries)
+            post(self.finished, info)
+        except Exception as e:
+            post(self.failed, str(e))
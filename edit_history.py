@@ -0,0 +1,152 @@
+import zlib
+from array import array
+from collections import deque
+
+# =======================
+# 撤销/重做历史：每次编辑保存为一个增量（表名、键、旧值、新值）。
+# 一次编辑的所有条目打包为一段字节（长度数组 + 表编号 + 缺失标记 + UTF-16 文本，较大时用 zlib 压缩），
+# 不为每个键创建对象；新值只保存与旧值不同的中间部分；历史总大小超过预算时丢弃最早的记录
+# =======================
+
+COMPRESS_MIN = 4096  # 打包后超过这么多字节时压缩
+FIELDS = 5           # 每个条目的长度字段：键、旧值、新值中间部分、与旧值相同的前缀、后缀
+
+
+def _prefix(a, b):
+    """a 与 b 相同前缀的长度（二分比较切片，不逐字循环）"""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _suffix(a, b, limit):
+    lo, hi = 0, min(len(a), len(b), limit)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:] == b[len(b) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class Delta:
+    """一次编辑。created / dropped 为这次编辑新建 / 删除的表，renamed 为 (旧表名, 新表名)"""
+    __slots__ = ('label', 'names', 'count', 'created', 'dropped', 'renamed', 'size', '_blob', '_compressed')
+
+    def __init__(self, label, changes, created=(), dropped=(), renamed=None):
+        """changes 为 [(表名, 键, 旧值, 新值)]，值为 None 表示该键不存在"""
+        self.label = label
+        self.created = tuple(created)
+        self.dropped = tuple(dropped)
+        self.renamed = renamed
+        names = {}
+        lengths = array('I')
+        table_ids = array('I')
+        missing = bytearray()
+        parts = []
+        for name, key, old, new in changes:
+            table_ids.append(names.setdefault(name, len(names)))
+            missing.append((old is None) | (new is None) << 1)
+            old = old or ''
+            new = new or ''
+            # 修改通常只涉及值的一小段：新值保存为 旧值前缀 + 中间部分 + 旧值后缀
+            head = _prefix(old, new)
+            tail = _suffix(old, new, min(len(old), len(new)) - head)
+            middle = new[head:len(new) - tail]
+            lengths.extend((len(key), len(old), len(middle), head, tail))
+            parts += (key, old, middle)
+        self.names = list(names)
+        self.count = len(missing)
+        raw = lengths.tobytes() + table_ids.tobytes() + bytes(missing) + ''.join(parts).encode('utf-16-le', 'surrogatepass')
+        self._compressed = len(raw) > COMPRESS_MIN
+        self._blob = zlib.compress(raw, 1) if self._compressed else raw
+        self.size = len(self._blob) + 64 * (len(self.names) + len(self.created) + len(self.dropped) + 2)
+
+    @classmethod
+    def capture(cls, label, data, changes, created=(), dropped=(), renamed=None):
+        """由 [(表名, 键, 新值)] 和当前数据记录一次编辑（在应用之前调用）；删除的表的所有条目自动记录"""
+        full = [(name, key, data.get(name, {}).get(key), new) for name, key, new in changes]
+        for name in dropped:
+            full.extend((name, key, value, None) for key, value in data.get(name, {}).items())
+        return cls(label, full, created, dropped, renamed)
+
+    def changes(self):
+        """解包为 [(表名, 键, 旧值, 新值)]"""
+        raw = zlib.decompress(self._blob) if self._compressed else self._blob
+        n = self.count
+        size = 4 * FIELDS * n
+        lengths = array('I')
+        lengths.frombytes(raw[:size])
+        table_ids = array('I')
+        table_ids.frombytes(raw[size:size + 4 * n])
+        missing = raw[size + 4 * n:size + 5 * n]
+        text = raw[size + 5 * n:].decode('utf-16-le', 'surrogatepass')
+        names = self.names
+        result = []
+        pos = 0
+        fields = iter(lengths)
+        for i, (k, o, m, head, tail) in enumerate(zip(fields, fields, fields, fields, fields)):
+            key = text[pos:pos + k]
+            old = text[pos + k:pos + k + o]
+            new = old[:head] + text[pos + k + o:pos + k + o + m] + old[o - tail:o]
+            pos += k + o + m
+            flags = missing[i]
+            result.append((names[table_ids[i]], key, None if flags & 1 else old, None if flags & 2 else new))
+        return result
+
+
+class EditHistory:
+    """撤销/重做栈，总大小不超过 budget 字节（至少保留最近一次编辑）"""
+
+    def __init__(self, budget=64 * 1024 * 1024):
+        self.budget = budget
+        self.size = 0
+        self._undo = deque()
+        self._redo = []
+
+    def push(self, delta):
+        """记录一次新的编辑，清空重做栈"""
+        for d in self._redo:
+            self.size -= d.size
+        self._redo.clear()
+        self._undo.append(delta)
+        self.size += delta.size
+        while self.size > self.budget and len(self._undo) > 1:
+            self.size -= self._undo.popleft().size
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo_label(self):
+        return self._undo[-1].label if self._undo else None
+
+    def redo_label(self):
+        return self._redo[-1].label if self._redo else None
+
+    def undo(self):
+        """取出要撤销的编辑（调用方按旧值应用）"""
+        delta = self._undo.pop()
+        self._redo.append(delta)
+        return delta
+
+    def redo(self):
+        delta = self._redo.pop()
+        self._undo.append(delta)
+        return delta
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self.size = 0
+
+    def __len__(self):
+        return len(self._undo)
@@ -0,0 +1,438 @@
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import Qt, QRect, QSize
+from PySide6.QtGui import QColor, QFont, QFontMetrics, QImage, QPainter, QPixmap
+
+from glyph_cache import font_identity, style_key, Glyph
+
+MANIFEST_VERSION = 1
+
+# =======================
+# 字体贴图生成（只依赖 QtGui，可在无界面的命令行中使用）
+# 贴图按行分成若干条带，由线程池分别绘制到 QImage（可在非界面线程中绘制）后拼接，
+# 结果与单线程逐字绘制逐像素相同。
+# 给定字形缓存时，只绘制缓存中没有的字符（同样分给线程池），贴图由缓存的字形拼贴而成。
+# 一页放不下时生成多页（font.png、font_1.png……）：第 i 个字符在第 i // 每页容量 页，
+# 与字符映射文件按 64 个一行记录的 (行, 列) 对应（4096 贴图时 页 = 行 // 每页行数）。
+# 每次生成都在贴图旁写一份清单（font.json：版本、分辨率、字体、每个格子的字符）。
+# 格子的顺序由调用方给出（与字符映射文件一致，见 char_order.texture_layout），
+# 增量更新时与清单逐格比较，只重画有变化的几行
+# =======================
+
+CHAR_HEIGHT_MAP = {"III": 80, "VC": 64, "SA": 80, "IV": 66}  # 各版本的格子高度
+GLYPH_CANVAS = 2048  # 绘制缓存中没有的字形时每张画布的最大边长
+
+
+def chars_per_line(texture_size):
+    """贴图每行的字符数"""
+    return 64 if texture_size == 4096 else 32
+
+
+def page_capacity(version, texture_size):
+    """一页贴图能放下的字符数"""
+    return chars_per_line(texture_size) * max(1, texture_size // CHAR_HEIGHT_MAP.get(version, 64))
+
+
+def page_count(characters, version, texture_size):
+    """放下这些字符需要的贴图页数"""
+    return math.ceil(len(characters) / page_capacity(version, texture_size))
+
+
+def page_path(path, page):
+    """第 page 页贴图的文件名：font.png、font_1.png、font_2.png……"""
+    if page == 0:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_{page}{ext}"
+
+
+def manifest_path(path):
+    """贴图清单的文件名：font.png → font.json"""
+    return os.path.splitext(path)[0] + ".json"
+
+
+def read_manifest(path):
+    """读取 path 这组贴图的清单，没有或无法读取时返回 None"""
+    try:
+        with open(manifest_path(path), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('manifest_version') != MANIFEST_VERSION or not isinstance(manifest.get('chars'), list):
+        return None
+    return manifest
+
+
+def _pixels(image):
+    """ARGB32_Premultiplied 格式 QImage 的像素视图（numpy uint32），使用期间 image 须保持存活"""
+    import numpy as np
+    return np.frombuffer(image.constBits(), dtype=np.uint32).reshape(image.height(), image.width())
+
+
+def _to_image(pixels):
+    """numpy 像素数组 → QImage（复制一份，之后不再引用数组）"""
+    import numpy as np
+    pixels = np.ascontiguousarray(pixels)
+    height, width = pixels.shape
+    return QImage(pixels.data, width, height, width * 4, QImage.Format.Format_ARGB32_Premultiplied).copy()
+
+
+def _crop(image, x, y, width, height, pad):
+    """从 image 的 (x, y, width, height) 区域裁出字形（格子左上角在区域内 (pad, pad) 处）；
+    字形碰到区域边缘时返回 None"""
+    import numpy as np
+    tile = _pixels(image)[y:y + height, x:x + width]
+    ink = tile != 0
+    rows = np.flatnonzero(ink.any(axis=1))
+    if not rows.size:
+        return Glyph(0, 0, None)
+    cols = np.flatnonzero(ink.any(axis=0))
+    top, bottom, left, right = int(rows[0]), int(rows[-1]), int(cols[0]), int(cols[-1])
+    if top == 0 or left == 0 or bottom == height - 1 or right == width - 1:
+        return None
+    return Glyph(left - pad, top - pad, tile[top:bottom + 1, left:right + 1].copy())
+
+
+def _byte_mul(x, a):
+    """预乘像素 x 的每个通道乘以 a/255，与 Qt 的 BYTE_MUL 取整方式相同"""
+    import numpy as np
+    x = x.astype(np.uint64)
+    a = a.astype(np.uint64)
+    t = (x & 0xff00ff) * a
+    t = ((t + ((t >> 8) & 0xff00ff) + 0x800080) >> 8) & 0xff00ff
+    x = ((x >> 8) & 0xff00ff) * a
+    x = (x + ((x >> 8) & 0xff00ff) + 0x800080) & 0xff00ff00
+    return (x | t).astype(np.uint32)
+
+
+def _source_over(src, dst):
+    """预乘 ARGB32 的 SourceOver 混合，与 QPainter 默认的合成结果相同"""
+    return src + _byte_mul(dst, 255 - (src >> 24))
+
+
+class FontTextureGenerator:
+    """GTA 字体贴图生成器核心类"""
+    def __init__(self, max_workers=None, glyph_cache=None):
+        self.margin = 2
+        self.y_offset = -4
+        self.bg_color = QColor(0, 0, 0, 0)
+        self.text_color = QColor('white')
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.glyph_cache = glyph_cache
+        self.rendered = 0  # 最近一次生成时实际绘制的字符数
+
+    def layout(self, characters, version, texture_size):
+        """计算字符的格子位置，返回 (格宽, 格高, 每页的 [(字符, x, y)])；characters 中的 None 为空格子"""
+        per_line = chars_per_line(texture_size)
+        char_width = texture_size // per_line
+        char_height = CHAR_HEIGHT_MAP.get(version, 64)
+        capacity = page_capacity(version, texture_size)
+        pages = []
+        for start in range(0, len(characters), capacity):
+            pages.append([(char, (i % per_line) * char_width, (i // per_line) * char_height)
+                          for i, char in enumerate(characters[start:start + capacity]) if char])
+        return char_width, char_height, pages
+
+    def _draw_cells(self, painter, cells, top, char_width, char_height, font):
+        """逐个绘制格子中的字符，top 为画布顶部在贴图中的位置"""
+        painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+        painter.setFont(font)
+        painter.setPen(self.text_color)
+        for char, x, y in cells:
+            draw_rect = QRect(
+                x + self.margin, y - top + self.margin + self.y_offset,
+                char_width - 2 * self.margin, char_height - 2 * self.margin
+            )
+            painter.drawText(draw_rect, Qt.AlignmentFlag.AlignCenter, char)
+
+    def _render_band(self, cells, top, bottom, width, char_width, char_height, font):
+        """绘制贴图中 [top, bottom) 这一部分（宽 width）；cells 须包含所有可能画到这一部分的字符"""
+        image = QImage(width, bottom - top, QImage.Format.Format_ARGB32_Premultiplied)
+        image.fill(self.bg_color)
+        painter = QPainter(image)
+        self._draw_cells(painter, cells, top, char_width, char_height, font)
+        painter.end()
+        return image
+
+    def _reach(self, font):
+        """字形可能超出自己格子的最大像素数"""
+        metrics = QFontMetrics(font)
+        return max(metrics.height(), metrics.maxWidth()) + abs(self.y_offset) + self.margin
+
+    def _render_glyph(self, char, char_width, char_height, font, reach):
+        """单独绘制一个字符并裁掉透明边缘；字形碰到画布边缘时加大画布重画"""
+        while True:
+            width, height = char_width + 2 * reach, char_height + 2 * reach
+            image = self._render_band([(char, reach, reach)], 0, height, width, char_width, char_height, font)
+            glyph = _crop(image, 0, 0, width, height, reach)
+            if glyph is not None:
+                return glyph
+            reach *= 2
+
+    def _render_glyphs(self, chars, char_width, char_height, font, reach):
+        """绘制一组字符，返回 [(字符, Glyph)]。字符隔开排在几张画布上一次绘制，再逐个裁出；
+        字形碰到自己的格子边缘时（可能画进了相邻格子），它和相邻格子的字符单独重画"""
+        pad = max(char_width, char_height) // 2
+        pitch_w, pitch_h = char_width + 2 * pad, char_height + 2 * pad
+        per_row = max(1, GLYPH_CANVAS // pitch_w)
+        per_canvas = per_row * max(1, GLYPH_CANVAS // pitch_h)
+        glyphs = {}
+        redo = set()
+        for start in range(0, len(chars), per_canvas):
+            batch = chars[start:start + per_canvas]
+            # 画布四周再留出 reach，外圈的字形不被画布边缘裁剪
+            width = per_row * pitch_w + 2 * reach
+            height = math.ceil(len(batch) / per_row) * pitch_h + 2 * reach
+            cells = [(c, reach + (i % per_row) * pitch_w + pad, reach + (i // per_row) * pitch_h + pad)
+                     for i, c in enumerate(batch)]
+            image = self._render_band(cells, 0, height, width, char_width, char_height, font)
+            for i, c in enumerate(batch):
+                row, col = divmod(i, per_row)
+                glyph = _crop(image, reach + col * pitch_w, reach + row * pitch_h, pitch_w, pitch_h, pad)
+                if glyph is not None:
+                    glyphs[c] = glyph
+                    continue
+                for r in (row - 1, row, row + 1):
+                    for k in (col - 1, col, col + 1):
+                        j = r * per_row + k
+                        if 0 <= k < per_row and 0 <= j < len(batch):
+                            redo.add(batch[j])
+        for c in redo:
+            glyphs[c] = self._render_glyph(c, char_width, char_height, font, reach)
+        return list(glyphs.items())
+
+    def _compose(self, cells, version, texture_size, char_width, char_height, font):
+        """从字形缓存拼贴贴图，缓存中没有的字符先绘制并存入缓存"""
+        import numpy as np
+        style = style_key(font_identity(font), char_width, char_height, version,
+                          self.margin, self.y_offset, self.text_color.name(QColor.NameFormat.HexArgb))
+        chars = {char for char, _, _ in cells}
+        glyphs = self.glyph_cache.lookup(style, chars)
+        missing = sorted(chars - glyphs.keys())
+        self.rendered += len(missing)
+        if missing:
+            reach = self._reach(font)
+            chunks = [missing[i::self.max_workers] for i in range(min(self.max_workers, len(missing)))]
+            if len(chunks) == 1:
+                results = [self._render_glyphs(missing, char_width, char_height, font, reach)]
+            else:
+                with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+                    results = list(pool.map(lambda chunk: self._render_glyphs(chunk, char_width, char_height, QFont(font), reach), chunks))
+            new = {c: glyph for result in results for c, glyph in result}
+            self.glyph_cache.store(style, new)
+            glyphs.update(new)
+        # 用 numpy 逐格拼贴（当前 PySide6 每次调用 QPainter.drawImage 都会少计一次 None 的引用，拼贴几千个字形会崩溃）
+        atlas = np.zeros((texture_size, texture_size), dtype=np.uint32)
+        clipped = []
+        for char, x, y in cells:
+            glyph = glyphs[char]
+            if glyph.pixels is None:
+                continue
+            height, width = glyph.pixels.shape
+            left, top = x + glyph.dx, y + glyph.dy
+            if (min(x, y, left, top) <= 0 or max(x + char_width, left + width) >= texture_size
+                    or max(y + 2 * char_height, top + height) > texture_size):
+                # 贴图边缘的格子：整张绘制时字形轮廓被贴图边缘裁剪，抗锯齿与单独绘制时略有不同，之后直接画到贴图上
+                clipped.append((char, x, y))
+                continue
+            dst = atlas[top:top + height, left:left + width]
+            if dst.any():
+                dst[...] = _source_over(glyph.pixels, dst)
+            else:
+                dst[...] = glyph.pixels
+        image = _to_image(atlas)
+        if clipped:
+            painter = QPainter(image)
+            self._draw_cells(painter, clipped, 0, char_width, char_height, font)
+            painter.end()
+        return image
+
+    def create_image(self, characters, version, texture_size, font, page=0):
+        """创建并返回第 page 页贴图的 QImage（可在任意线程中调用）"""
+        char_width, char_height, pages = self.layout(characters, version, texture_size)
+        self.rendered = 0
+        if page >= len(pages):
+            return QImage()
+        return self._render_page(pages[page], version, texture_size, char_width, char_height, font)
+
+    def _render_page(self, cells, version, texture_size, char_width, char_height, font):
+        """绘制一页贴图"""
+        if self.glyph_cache is not None:
+            return self._compose(cells, version, texture_size, char_width, char_height, font)
+        self.rendered += len(cells)
+        rows = math.ceil(texture_size / char_height)
+        bands = max(1, min(self.max_workers, rows))
+        if bands == 1:
+            return self._render_band(cells, 0, texture_size, texture_size, char_width, char_height, font)
+        import numpy as np
+        band_height = math.ceil(rows / bands) * char_height
+        spans = [(top, min(texture_size, top + band_height)) for top in range(0, texture_size, band_height)]
+        reach = self._reach(font)
+        with ThreadPoolExecutor(max_workers=len(spans)) as pool:
+            parts = list(pool.map(lambda span: self._render_span(cells, span[0], span[1], texture_size, char_width, char_height, QFont(font), reach), spans))
+        return _to_image(np.concatenate(parts))
+
+    def _render_span(self, cells, top, bottom, texture_size, char_width, char_height, font, reach):
+        """绘制贴图中 [top, bottom) 这几行像素，返回 numpy 数组，与整张绘制时逐像素相同。
+        可能画到这几行的字形都完整地画在画布内（被画布边缘裁剪处的抗锯齿与整张绘制时不同），
+        只有贴图本身的上下边缘与整张绘制时一样裁剪"""
+        near = [c for c in cells if top - reach - char_height < c[2] < bottom + reach]
+        canvas_top = max(0, top - char_height - 2 * reach)
+        canvas_bottom = min(texture_size, bottom + char_height + 2 * reach)
+        canvas = self._render_band(near, canvas_top, canvas_bottom, texture_size, char_width, char_height, font)
+        return _pixels(canvas)[top - canvas_top:bottom - canvas_top].copy()
+
+    def create_pixmap(self, characters, version, texture_size, font, page=0):
+        """创建并返回第 page 页贴图的 QPixmap 对象，用于预览"""
+        image = self.create_image(characters, version, texture_size, font, page)
+        return QPixmap.fromImage(image) if not image.isNull() else QPixmap()
+
+    def generate_and_save(self, characters, output_path, version, texture_size, font):
+        """生成所有页贴图并保存（第一页为 output_path，之后为 font_1.png 等）及清单，返回保存的贴图列表"""
+        char_width, char_height, pages = self.layout(characters, version, texture_size)
+        self.rendered = 0
+        saved = []
+        # 逐页绘制并保存，同一时间只保留一页贴图
+        for page, cells in enumerate(pages):
+            image = self._render_page(cells, version, texture_size, char_width, char_height, font)
+            saved.append(self._save_page(image, output_path, page))
+        self._remove_pages(output_path, len(pages))
+        self._write_manifest(output_path, version, texture_size, font, list(characters))
+        return saved
+
+    def update_and_save(self, characters, output_path, version, texture_size, font):
+        """增量更新 output_path 处已有的贴图。characters 为完整的格子顺序（None 为空格子），
+        由调用方给出，须与字符映射文件的顺序一致（见 char_order），这里不另行安排位置。
+        与清单中上次的格子逐个比较，只重画有变化（新增、删除或替换）的格子附近的几行；
+        没有清单或版本、分辨率、字体与清单不同时重画全部贴图。返回写入的贴图列表"""
+        characters = list(characters)
+        manifest = read_manifest(output_path)
+        if manifest is None or ((manifest.get('version'), manifest.get('resolution'), manifest.get('font'))
+                                != (version, texture_size, font_identity(font))):
+            return self.generate_and_save(characters, output_path, version, texture_size, font)
+        previous = manifest['chars']
+        size = max(len(previous), len(characters))
+        previous = previous + [None] * (size - len(previous))
+        current = characters + [None] * (size - len(characters))
+        dirty = [slot for slot in range(size) if previous[slot] != current[slot]]
+        char_width, char_height, pages = self.layout(characters, version, texture_size)
+        capacity = page_capacity(version, texture_size)
+        per_line = chars_per_line(texture_size)
+        reach = self._reach(font)
+        self.rendered = 0
+        saved = []
+        for page, cells in enumerate(pages):
+            page_dirty = [slot for slot in dirty if slot // capacity == page]
+            if not page_dirty:
+                continue
+            old = QImage(page_path(output_path, page))
+            if old.isNull() or old.size() != QSize(texture_size, texture_size):
+                image = self._render_page(cells, version, texture_size, char_width, char_height, font)
+            else:
+                old = old.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+                pixels = _pixels(old).copy()
+                # 字形可能画出格子 reach 像素，重画的范围是有变化的格子所在行上下各扩 reach
+                spans = []
+                for row in sorted({slot % capacity // per_line for slot in page_dirty}):
+                    top, bottom = max(0, row * char_height - reach), min(texture_size, (row + 1) * char_height + reach)
+                    if spans and top <= spans[-1][1]:
+                        spans[-1][1] = bottom
+                    else:
+                        spans.append([top, bottom])
+                for top, bottom in spans:
+                    pixels[top:bottom] = self._render_span(cells, top, bottom, texture_size, char_width, char_height, font, reach)
+                self.rendered += sum(1 for slot in page_dirty if current[slot] is not None)
+                image = _to_image(pixels)
+            saved.append(self._save_page(image, output_path, page))
+        self._remove_pages(output_path, len(pages))
+        self._write_manifest(output_path, version, texture_size, font, characters)
+        return saved
+
+    @staticmethod
+    def _remove_pages(output_path, first):
+        """删除字符减少后不再需要的贴图页（第 first 页及之后，第一页总是保留）"""
+        page = max(first, 1)
+        while os.path.exists(page_path(output_path, page)):
+            os.remove(page_path(output_path, page))
+            page += 1
+
+    def _save_page(self, image, output_path, page):
+        path = page_path(output_path, page)
+        if not image.save(path, "PNG"):
+            raise IOError(f"无法保存文件到 {path}")
+        return path
+
+    def _write_manifest(self, output_path, version, texture_size, font, order):
+        manifest = {
+            'manifest_version': MANIFEST_VERSION,
+            'version': version,
+            'resolution': texture_size,
+            'font': font_identity(font),
+            'chars': order,
+        }
+        with open(manifest_path(output_path), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+    def generate_html_preview(self, settings, texture_filename, output_path):
+        """生成HTML预览文件"""
+        char_width = settings['resolution'] // chars_per_line(settings['resolution'])
+        char_height = CHAR_HEIGHT_MAP.get(settings['version'], 64)
+        pages = max(1, page_count(settings['characters'], settings['version'], settings['resolution']))
+        count = sum(1 for char in settings['characters'] if char)  # characters 中可能有空格子（None）
+        textures = "".join(
+            f'<div class="texture-container"><h2>字体贴图{f"（第 {page + 1} 页）" if pages > 1 else ""}</h2>'
+            f'<img src="{os.path.basename(page_path(texture_filename, page))}" alt="字体贴图" class="texture-img"></div>'
+            for page in range(pages))
+
+        html_content = f"""
+        <!DOCTYPE html>
+        <html lang="zh-CN"><head><meta charset="UTF-8"><title>字体贴图预览</title>
+        <style>
+            body {{ font-family: sans-serif; background-color: #1e1e1e; color: #e0e0e0; }}
+            .container {{ max-width: 1200px; margin: 0 auto; padding: 20px; }}
+            h1, h2 {{ text-align: center; color: #4fc3f7; }}
+            .info-grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 15px; background-color: #2d2d2d; padding: 15px; border-radius: 5px; margin-bottom: 20px; }}
+            .info-item {{ margin: 5px 0; }} .info-item strong {{ color: #82b1ff; }}
+            .texture-container {{ text-align: center; margin-bottom: 30px; }}
+            .texture-img {{ max-width: 100%; border: 1px solid #444; }}
+            .char-grid {{ display: grid; grid-template-columns: repeat(auto-fill, minmax(80px, 1fr)); gap: 10px; margin-top: 20px; }}
+            .char-item {{ background-color: #2d2d2d; border: 1px solid #444; border-radius: 4px; padding: 10px; text-align: center; }}
+            .char-display {{ font-size: 24px; margin-bottom: 5px; height: 40px; display: flex; align-items: center; justify-content: center; }}
+            .char-code {{ font-size: 12px; color: #aaa; }}
+        </style></head><body><div class="container">
+            <h1>字体贴图预览</h1>
+            <div class="info-grid">
+                <div class="info-item"><strong>游戏版本:</strong> {settings['version']}</div>
+                <div class="info-item"><strong>贴图尺寸:</strong> {settings['resolution']}x{settings['resolution']}px</div>
+                <div class="info-item"><strong>字符总数:</strong> {count}</div>
+                <div class="info-item"><strong>单元格尺寸:</strong> {char_width}x{char_height}px</div>
+                <div class="info-item"><strong>贴图页数:</strong> {pages}（每页 {page_capacity(settings['version'], settings['resolution'])} 个字符）</div>
+                <div class="info-item"><strong>字体:</strong> {settings['font_normal'].family()}, {settings['font_normal'].pointSize()}pt</div>
+            </div>
+            {textures}
+            
+            <div class="char-container">
+                <h2>字符列表 (共 {count} 个字符)</h2>
+                <div class="char-grid">
+        """
+        
+        # 添加字符网格
+        for char in filter(None, settings['characters']):
+            char_code = ord(char)
+            html_content += f"""
+                <div class="char-item">
+                    <div class="char-display">{char}</div>
+                    <div class="char-code">U+{char_code:04X}</div>
+                </div>
+            """
+        
+        html_content += """
+                </div>
+            </div>
+        </div></body></html>
+        """
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(html_content)
@@ -0,0 +1,236 @@
+from bisect import bisect_left
+
+import numpy as np
+
+from search_index import _fold
+
+# =======================
+# 全局索引：整个文档（所有表）的字符二元组倒排索引，用于跨表查找文本和键
+# 中文没有分词，按相邻两个字符建立索引；查询时对各二元组的倒排列表求交集，再逐条核对原文。
+# 倒排列表是建立后只读的 numpy 数组，编辑只更新条目文本并记入“脏”集合（查询时一并核对），
+# 脏条目较多时在后台重新建立倒排列表
+# =======================
+
+_END = '\x01'           # 每条文本末尾的哨兵：每个字符都是某个二元组的首字符，单字查询只需查一个区间
+_BITS = np.uint64(21)   # 码位最多 21 位，二元组编码为 (首字符 << 21) | 次字符
+
+
+def _gram(a, b):
+    return (ord(a) << 21) | ord(b)
+
+
+def _starts(a):
+    """有序数组中每段相同值的起始位置标记"""
+    mask = np.ones(len(a), dtype=bool)
+    np.not_equal(a[1:], a[:-1], out=mask[1:])
+    return mask
+
+
+class Postings:
+    """一次建立的只读索引：二元组 -> 有序的条目编号，以及按小写键排序的条目编号"""
+
+    def __init__(self, grams, starts, ids, key_sorted, key_ids, count):
+        self.grams = grams            # 去重排序后的二元组编码
+        self.starts = starts          # grams[i] 的编号位于 ids[starts[i]:starts[i + 1]]
+        self.ids = ids
+        self.key_sorted = key_sorted  # 小写键（已排序）
+        self.key_ids = key_ids        # 与 key_sorted 对应的条目编号
+        self.count = count            # 建立时的条目数
+
+    @classmethod
+    def build(cls, texts, is_stale=None):
+        """由条目文本（None 为已删除）建立索引；is_stale() 为真时放弃并返回 None"""
+        n = len(texts)
+        texts = [t if t is not None else '' for t in texts]
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=n)
+        cps = np.frombuffer((_END.join(texts) + _END).encode('utf-32-le', 'surrogatepass'), dtype='<u4').astype(np.uint64)
+        owner = np.repeat(np.arange(n, dtype=np.uint64), lengths + 1)
+        keep = cps[:-1] != ord(_END)  # 去掉跨越两条文本的二元组
+        grams = ((cps[:-1] << _BITS) | cps[1:])[keep]
+        owner = owner[:-1][keep]
+        del cps, keep
+        if is_stale is not None and is_stale():
+            return None
+
+        id_bits = max(n.bit_length(), 1)
+        if id_bits <= 22:
+            # 二元组编码 42 位，与编号合成一个 uint64 排序，比 lexsort 快得多
+            pairs = (grams << np.uint64(id_bits)) | owner
+            pairs.sort()
+            pairs = pairs[_starts(pairs)]
+            grams = pairs >> np.uint64(id_bits)
+            ids = (pairs & np.uint64((1 << id_bits) - 1)).astype(np.uint32)
+        else:
+            order = np.lexsort((owner, grams))
+            grams, ids = grams[order], owner[order].astype(np.uint32)
+            unique = _starts(grams) | _starts(ids)
+            grams, ids = grams[unique], ids[unique]
+        if is_stale is not None and is_stale():
+            return None
+
+        starts = np.flatnonzero(_starts(grams))
+        grams = grams[starts]
+        starts = np.append(starts, len(ids))
+
+        keys = [t.partition('\x00')[0] for t in texts]
+        key_ids = sorted((i for i in range(n) if texts[i]), key=keys.__getitem__)
+        key_sorted = [keys[i] for i in key_ids]
+        return cls(grams, starts, ids, key_sorted, key_ids, n)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(0, np.uint64), np.zeros(1, np.int64), np.zeros(0, np.uint32), [], [], 0)
+
+    def _range(self, lo, hi):
+        a = np.searchsorted(self.grams, np.uint64(lo))
+        b = np.searchsorted(self.grams, np.uint64(hi))
+        return self.ids[self.starts[a]:self.starts[b]]
+
+    def candidates(self, q):
+        """可能包含 q 的条目编号（已排序、可能有误报）"""
+        if len(q) == 1:
+            c = ord(q) << 21
+            return np.unique(self._range(c, c + (1 << 21)))
+        lists = []
+        for g in {_gram(a, b) for a, b in zip(q, q[1:])}:
+            ids = self._range(g, g + 1)
+            if not len(ids):
+                return ids
+            lists.append(ids)
+        lists.sort(key=len)
+        result = lists[0]
+        for ids in lists[1:]:
+            result = np.intersect1d(result, ids, assume_unique=True)
+            if not len(result):
+                break
+        return result
+
+    def key_prefix(self, p):
+        lo = bisect_left(self.key_sorted, p)
+        hi = bisect_left(self.key_sorted, p + '\U0010ffff', lo)
+        return self.key_ids[lo:hi]
+
+
+class _Table:
+    __slots__ = ('name', 'ids')
+
+    def __init__(self, name):
+        self.name = name
+        self.ids = {}  # 键 -> 条目编号
+
+
+class GlobalIndex:
+    """整个文档的索引。条目编号只增不减，删除的条目文本置为 None"""
+
+    COMPACT_MIN = 5000  # 脏条目和已删除条目超过此值（且超过总数的 1/8）时重新建立倒排列表
+
+    def __init__(self):
+        self.tables = {}   # 表名 -> _Table
+        self.where = []    # 编号 -> (_Table, 键)
+        self.texts = []    # 编号 -> "小写键\x00小写值"，已删除为 None
+        self.postings = Postings.empty()
+        self.dirty = set()  # 倒排列表建立之后新增或修改过的编号
+        self.garbage = 0    # 倒排列表中已删除的条目数
+        self._pending = None  # 正在后台重建时，记录重建开始之后的编辑
+
+    @classmethod
+    def from_data(cls, data, is_stale=None):
+        """由 {表名: {键: 值}} 建立索引（编号按表名、键排序分配）"""
+        index = cls()
+        for name in sorted(data):
+            table = index._table(name)
+            for key in sorted(data[name]):
+                table.ids[key] = len(index.texts)
+                index.where.append((table, key))
+                index.texts.append(_fold(key, data[name][key]))
+            if is_stale is not None and is_stale():
+                return None
+        index.postings = Postings.build(index.texts, is_stale)
+        return index if index.postings is not None else None
+
+    def _table(self, name):
+        table = self.tables.get(name)
+        if table is None:
+            table = self.tables[name] = _Table(name)
+        return table
+
+    def __len__(self):
+        return len(self.texts) - self.texts.count(None)
+
+    # ---------- 编辑 ----------
+    def set(self, name, key, value):
+        table = self._table(name)
+        i = table.ids.get(key)
+        if i is None:
+            i = table.ids[key] = len(self.texts)
+            self.where.append((table, key))
+            self.texts.append(None)
+        self.texts[i] = _fold(key, value)
+        self.dirty.add(i)
+        if self._pending is not None:
+            self._pending.add(i)
+
+    def remove(self, name, key):
+        table = self.tables.get(name)
+        i = table.ids.pop(key, None) if table else None
+        if i is not None:
+            self.texts[i] = None
+            self.garbage += 1
+
+    def update_keys(self, name, entries, keys):
+        """按 entries（表的当前内容）更新这些键：存在的更新，不存在的删除"""
+        for key in keys:
+            if key in entries:
+                self.set(name, key, entries[key])
+            else:
+                self.remove(name, key)
+
+    def drop_table(self, name):
+        table = self.tables.pop(name, None)
+        if table:
+            for i in table.ids.values():
+                self.texts[i] = None
+            self.garbage += len(table.ids)
+
+    def rename_table(self, old, new):
+        table = self.tables.pop(old, None)
+        if table:
+            table.name = new
+            self.tables[new] = table
+
+    # ---------- 后台重建倒排列表 ----------
+    def needs_compact(self):
+        return self._pending is None and len(self.dirty) + self.garbage > max(self.COMPACT_MIN, len(self.texts) // 8)
+
+    def begin_compact(self):
+        """返回用于重建的文本快照；此后的编辑另行记录"""
+        self._pending = set()
+        self._garbage_at = self.garbage
+        return list(self.texts)
+
+    def install(self, postings):
+        self.postings = postings
+        self.dirty, self._pending = self._pending, None
+        self.garbage -= self._garbage_at
+
+    # ---------- 查询（返回按编号排序的条目编号） ----------
+    def _verify(self, candidates, match):
+        if self.dirty:
+            candidates = sorted(self.dirty.union(candidates))
+        texts = self.texts
+        return [i for i in candidates if texts[i] is not None and match(texts[i])]
+
+    def search(self, keyword):
+        q = keyword.lower()
+        if not q:
+            return []
+        return self._verify(self.postings.candidates(q).tolist(), lambda t: q in t)
+
+    def search_prefix(self, prefix):
+        p = prefix.lower()
+        return self._verify(self.postings.key_prefix(p), lambda t: t.startswith(p))
+
+    def hits(self, ids):
+        """编号 -> (表名, 键)"""
+        where = self.where
+        return [(where[i][0].name, where[i][1]) for i in ids]
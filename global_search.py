@@ -0,0 +1,174 @@
+import re
+import threading
+
+from PySide6.QtCore import QObject, Signal
+
+# =======================
+# 全局搜索：在后台线程中建立、重建和查询全局索引（global_index），主线程只收结果。
+# 索引模块依赖 numpy，在第一次建立索引时才在后台线程中导入，不拖慢程序启动
+# =======================
+
+MODE_TEXT = 'text'      # 键或值包含关键字（不区分大小写）
+MODE_PREFIX = 'prefix'  # 键以关键字开头（不区分大小写）
+MODE_REGEX = 'regex'    # 键或值匹配正则表达式
+
+CHUNK = 8192  # 后台扫描时每处理这么多条检查一次是否已过时
+
+
+def _build_index(data, is_stale):
+    from global_index import GlobalIndex
+    return GlobalIndex.from_data(data, is_stale)
+
+
+def _build_postings(texts, is_stale):
+    from global_index import Postings
+    return Postings.build(texts, is_stale)
+
+
+def regex_search(data, pattern, is_stale=None):
+    """在 {表名: {键: 值}} 中查找键或值匹配 pattern 的条目，按表名、键排序返回 (表名, 键)"""
+    search = pattern.search
+    hits = []
+    for name in sorted(data):
+        table = data[name]
+        keys = sorted(table)
+        for start in range(0, len(keys), CHUNK):
+            if is_stale is not None and is_stale():
+                return None
+            hits.extend((name, k) for k in keys[start:start + CHUNK] if search(k) or search(table[k]))
+    return hits
+
+
+class GlobalIndexer(QObject):
+    """管理全局索引的生命周期：打开文件后在后台建立，编辑时增量更新，需要时在后台重建"""
+    ready = Signal()                  # 索引建立完成，可以查询
+    regex_done = Signal(str, object)  # 正则表达式, 匹配的 (表名, 键) 列表
+    # 与 SearchWorker 相同：跨线程只发送不带参数的信号，结果由主线程取出
+    _ready = Signal()
+
+    ORDER = ('build', 'compact', 'regex')  # 后台任务的优先顺序
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.index = None  # 建立完成前为 None
+        self._data = {}
+        self._log = []     # 建立期间编辑过的 (表名, 键列表)，建立完成后重放
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._jobs = {}
+        self._done = []
+        self._generation = dict.fromkeys(self.ORDER, 0)
+        self._thread = None
+        self._ready.connect(self._deliver)
+
+    # ---------- 后台任务 ----------
+    def _submit(self, kind, func, callback):
+        """在后台线程中执行 func(is_stale)，完成后在主线程调用 callback(结果)；同类任务只保留最新的"""
+        with self._lock:
+            self._generation[kind] += 1
+            self._jobs[kind] = (self._generation[kind], func, callback)
+        self._wake.set()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="gxt-index", daemon=True)
+            self._thread.start()
+
+    def _cancel(self, kind):
+        with self._lock:
+            self._generation[kind] += 1
+            self._jobs.pop(kind, None)
+
+    def _deliver(self):
+        with self._lock:
+            done, self._done = self._done, []
+            current = dict(self._generation)
+        for kind, generation, callback, result in done:
+            if current[kind] == generation:
+                callback(result)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            with self._lock:
+                kind = next((k for k in self.ORDER if k in self._jobs), None)
+                if kind is None:
+                    self._wake.clear()
+                    continue
+                generation, func, callback = self._jobs.pop(kind)
+
+            def is_stale():
+                return self._generation[kind] != generation
+
+            result = func(is_stale)
+            if result is not None and not is_stale():
+                with self._lock:
+                    self._done.append((kind, generation, callback, result))
+                self._ready.emit()
+
+    # ---------- 文档变化 ----------
+    def rebuild(self, data):
+        """打开或新建文件后调用：在后台为 data 建立索引"""
+        self._data = data
+        self.index = None
+        self._log = []
+        self._cancel('compact')
+        self._cancel('regex')
+        snapshot = {name: table.copy() for name, table in data.items()}
+        self._submit('build', lambda is_stale: _build_index(snapshot, is_stale), self._built)
+
+    def _built(self, index):
+        for name, keys in self._log:
+            index.update_keys(name, self._data.get(name, {}), keys)
+        self._log = []
+        self.index = index
+        self.ready.emit()
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        index = self.index
+        if not index.needs_compact():
+            return
+        texts = index.begin_compact()
+
+        def installed(postings):
+            if self.index is index:
+                index.install(postings)
+        self._submit('compact', lambda is_stale: _build_postings(texts, is_stale), installed)
+
+    def keys_edited(self, name, entries, keys):
+        """表 name（当前内容为 entries）中的这些键被添加、修改或删除"""
+        if self.index is None:
+            self._log.append((name, list(keys)))
+            return
+        self.index.update_keys(name, entries, keys)
+        self._maybe_compact()
+
+    def table_dropped(self, name):
+        if self.index is None:
+            self.rebuild(self._data)  # 表结构在建立期间变化：按当前数据重新建立
+        else:
+            self.index.drop_table(name)
+            self._maybe_compact()
+
+    def table_renamed(self, old, new):
+        if self.index is None:
+            self.rebuild(self._data)
+        else:
+            self.index.rename_table(old, new)
+
+    # ---------- 查询 ----------
+    def search(self, mode, text):
+        """子串或键前缀查询，立即返回 (表名, 键) 列表；索引尚未建立完成时返回 None"""
+        if self.index is None:
+            return None
+        ids = self.index.search_prefix(text) if mode == MODE_PREFIX else self.index.search(text)
+        return self.index.hits(ids)
+
+    def search_regex(self, text):
+        """在后台按正则表达式查找，结果通过 regex_done 发出；表达式无效时抛出 re.error"""
+        pattern = re.compile(text)
+        snapshot = {name: table.copy() for name, table in self._data.items()}
+        self._submit('regex', lambda is_stale: regex_search(snapshot, pattern, is_stale),
+                     lambda hits: self.regex_done.emit(text, hits))
+
+    def cancel_regex(self):
+        self._cancel('regex')
@@ -0,0 +1,120 @@
+import os
+import struct
+import threading
+from collections import namedtuple
+
+from PySide6.QtCore import QStandardPaths, qVersion
+from PySide6.QtGui import QRawFont
+
+# =======================
+# 字形缓存：贴图中的每个字符单独绘制一次，裁掉透明边缘后按
+# (字体及字体文件, 字号, 格子大小, 版本, 码点) 缓存，贴图由缓存的字形拼贴而成。
+# 字形像素保存为 numpy uint32 数组（预乘 alpha 的 ARGB32，与 QImage.Format_ARGB32_Premultiplied 相同）。
+# 可选磁盘缓存：每组绘制参数一个子目录，每个字形一个文件（偏移 + 尺寸 + zlib 压缩的像素）
+# =======================
+
+CACHE_VERSION = 1
+_HEADER = struct.Struct('<hhHH')  # dx, dy, 宽, 高
+
+# 字形像素左上角相对格子左上角的偏移；空白字符的 pixels 为 None
+Glyph = namedtuple('Glyph', 'dx dy pixels')
+
+
+def default_cache_dir():
+    """图形界面使用的磁盘缓存目录"""
+    base = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.GenericCacheLocation)
+    return os.path.join(base, 'gxteditor', 'glyphs') if base else None
+
+
+def font_identity(font):
+    """字体的标识：QFont 的各项属性 + 实际使用的字体文件（head 表含整个文件的校验和与修改时间）"""
+    import hashlib
+    head = QRawFont.fromFont(font).fontTable('head')
+    return f'{font.key()}|{hashlib.sha1(bytes(head)).hexdigest()}'
+
+
+def style_key(*params):
+    """由字体标识、格子大小、版本等绘制参数生成样式键（也是磁盘缓存的子目录名）"""
+    import hashlib
+    text = '|'.join(map(str, params + (CACHE_VERSION, qVersion())))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class GlyphCache:
+    """内存中的字形缓存，cache_dir 不为空时同时读写磁盘缓存"""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._styles = {}  # 样式键 -> {字符: Glyph}
+
+    def lookup(self, style, chars):
+        """取出已缓存的字形，返回 {字符: Glyph}（不含未缓存的字符）"""
+        with self._lock:
+            glyphs = self._styles.setdefault(style, {})
+            found = {c: glyphs[c] for c in chars if c in glyphs}
+        if self.cache_dir:
+            loaded = {}
+            for c in chars:
+                if c not in found:
+                    glyph = self._read(style, c)
+                    if glyph is not None:
+                        loaded[c] = glyph
+            if loaded:
+                with self._lock:
+                    glyphs.update(loaded)
+                found.update(loaded)
+        return found
+
+    def store(self, style, glyphs):
+        """缓存新绘制的字形 {字符: Glyph}"""
+        with self._lock:
+            self._styles.setdefault(style, {}).update(glyphs)
+        if self.cache_dir and glyphs:
+            try:
+                os.makedirs(os.path.join(self.cache_dir, style), exist_ok=True)
+            except OSError:
+                return  # 磁盘缓存写不进去时只用内存缓存
+            for c, glyph in glyphs.items():
+                self._write(style, c, glyph)
+
+    def clear(self):
+        """清空内存中的缓存（磁盘缓存保留）"""
+        with self._lock:
+            self._styles.clear()
+
+    def _path(self, style, char):
+        return os.path.join(self.cache_dir, style, f'{ord(char):06x}.glyph')
+
+    def _read(self, style, char):
+        import zlib
+        import numpy as np
+        try:
+            with open(self._path(style, char), 'rb') as f:
+                blob = f.read()
+            dx, dy, width, height = _HEADER.unpack_from(blob)
+            if not width:
+                return Glyph(dx, dy, None)
+            bits = zlib.decompress(blob[_HEADER.size:])
+            if len(bits) != width * height * 4:
+                return None
+            pixels = np.frombuffer(bits, dtype='<u4').astype(np.uint32).reshape(height, width)
+            return Glyph(dx, dy, pixels)
+        except (OSError, struct.error, zlib.error):
+            return None
+
+    def _write(self, style, char, glyph):
+        import zlib
+        path = self._path(style, char)
+        try:
+            if glyph.pixels is None:
+                blob = _HEADER.pack(glyph.dx, glyph.dy, 0, 0)
+            else:
+                height, width = glyph.pixels.shape
+                blob = _HEADER.pack(glyph.dx, glyph.dy, width, height) + zlib.compress(glyph.pixels.astype('<u4').tobytes())
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        except OSError:
+            pass
@@ -0,0 +1,411 @@
+import hashlib
+import json
+import os
+import pickle
+import struct
+import sys
+import time
+from pathlib import Path
+
+# =======================
+# 增量构建：TXT → GXT
+# 每个源文件解析并编码后的表数据按内容哈希缓存到构建目录，
+# 重新构建时只解析变动过的文件，再用缓存块拼装二进制
+# =======================
+
+CACHE_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+OUTPUT_NAMES = {'IV': 'chinese.gxt', 'VC': 'wm_vcchs.gxt', 'SA': 'wm_sachs.gxt', 'III': 'wm_lcchs.gxt'}
+
+
+# ---------- 单个源文件：解析 + 编码 ----------
+def parse_source(path, version):
+    """解析单个 TXT 文件，返回 ({表名: {键: 编码后的值}}, 字符集合)；解析失败返回 None
+    字符集合与各版本生成器使用的 m_WideCharCollection / special_chars 形式一致"""
+    if version == 'IV':
+        from IVGXT import load_txt
+        txt_data, chars = load_txt(Path(path))
+        tables = {}
+        for table_name, entries in txt_data.items():
+            table = tables[table_name] = {}
+            for entry in entries:
+                h = _iv_hash_value(entry['hash_string'], table_name)
+                # LiteralToGame: '™' (U+2122) → 0x0099
+                table[h] = entry['translated'].replace('™', '\x99').encode('utf-16-le') + b'\x00\x00'
+        return tables, chars
+
+    if version == 'VC':
+        from VCGXT import VCGXT
+        g = VCGXT()
+        if not g.LoadText(path):
+            return None
+        tables = {t: {k: struct.pack(f'<{len(v)}H', *v) for k, v in d.items()} for t, d in g.m_GxtData.items()}
+        return tables, g.m_WideCharCollection
+
+    if version == 'SA':
+        from SAGXT import SAGXT
+        g = SAGXT()
+        if not g.load_text(path):
+            return None
+        tables = {t: {k: v.encode('utf-8') + b'\x00' for k, v in d.items()} for t, d in g.m_GxtData.items()}
+        return tables, g.m_WideCharCollection
+
+    if version == 'III':
+        from LCGXT import LCGXT
+        g = LCGXT()
+        if not g.load_text(path):
+            return None
+        main = {k: struct.pack(f'<{len(v)}H', *v) for k, v in g.m_GxtData.items()}
+        return {'MAIN': main}, g.m_WideCharCollection
+
+    raise ValueError(f"不支持的版本: {version}")
+
+
+def _iv_hash_value(hash_str, table_name):
+    """与 IVGXT.generate_binary 相同的哈希字符串解析"""
+    try:
+        if hash_str.lower().startswith('0x'):
+            return int(hash_str, 16)
+        return int(hash_str)
+    except Exception:
+        print(f"WARN: Invalid hash string for table {table_name}: '{hash_str}'")
+        return 0
+
+
+# ---------- 二进制拼装（与各版本写出器逐字节一致） ----------
+def _table_order(version, names):
+    """MAIN 优先，其余按字典序；IV 总是包含 MAIN"""
+    others = sorted(n for n in names if n != 'MAIN')
+    if version == 'IV' or 'MAIN' in names:
+        return ['MAIN'] + others
+    return others
+
+
+def _name8(version, name):
+    if version == 'SA':
+        return name.encode('ascii')[:7].ljust(8, b'\x00')
+    if version == 'IV':
+        return name.encode('utf-8')[:8].ljust(8, b'\x00')
+    return name.ljust(8, '\x00').encode('ascii')
+
+
+def encode_table_block(version, name, entries):
+    """把 {键: 编码后的值} 编码为一个完整的表块（可选表名 + TKEY + TDAT）"""
+    values = list(entries.values())
+    offsets = [0] * len(values)
+    pos = 0
+    for i, v in enumerate(values):
+        offsets[i] = pos
+        pos += len(v)
+
+    if version in ('SA', 'IV'):
+        fmt = '<iI' if version == 'IV' else '<II'
+        key_entry = struct.Struct(fmt).pack
+        tkey = b''.join([key_entry(off, h) for off, h in zip(offsets, entries)])
+    else:
+        if version == 'III':
+            keys = [k.ljust(7, '\x00')[:7].encode('ascii') + b'\x00' for k in entries]
+        else:
+            keys = [k.ljust(8, '\x00').encode('ascii') for k in entries]
+        tkey = b''.join([struct.pack('<I', off) + k for off, k in zip(offsets, keys)])
+
+    parts = []
+    if name != 'MAIN' and version != 'III':
+        parts.append(_name8(version, name))
+    parts += [b'TKEY', struct.pack('<I', len(tkey)), tkey, b'TDAT', struct.pack('<I', pos)]
+    parts.extend(values)
+    return b''.join(parts)
+
+
+def assemble_gxt(version, tables, blocks=None):
+    """由 {表名: {键: 编码后的值}} 拼装整个 GXT 文件内容
+    blocks 可提供已编码好的表块 {表名: bytes}，命中时直接复用"""
+    blocks = blocks or {}
+    if version == 'III':
+        return blocks.get('MAIN') or encode_table_block(version, 'MAIN', tables.get('MAIN', {}))
+
+    names = _table_order(version, tables)
+    header = b''
+    if version == 'IV':
+        header = struct.pack('<HH', 4, 16)
+    elif version == 'SA':
+        header = b'\x04\x00\x08\x00'
+    header += b'TABL' + struct.pack('<I', len(names) * 12)
+
+    encoded = [blocks.get(n) or encode_table_block(version, n, tables.get(n, {})) for n in names]
+    offset = len(header) + len(names) * 12
+    tabl = []
+    for name, block in zip(names, encoded):
+        tabl.append(_name8(version, name) + struct.pack('<I', offset))
+        offset += len(block)
+    return b''.join([header] + tabl + encoded)
+
+
+# ---------- 编辑器数据 {表名: {键: 文本}} ----------
+def encode_tables(version, data):
+    """把编辑器数据编码为 {表名: {键: 编码后的值}}，供 assemble_gxt 使用"""
+    if version == 'IV':
+        from IVGXT import gta4_gxt_hash
+        tables = {}
+        for t, d in data.items():
+            table = tables[t] = {}
+            for k, v in d.items():
+                h = int(k, 16) if k.lower().startswith('0x') else gta4_gxt_hash(k)
+                table[h] = v.replace('™', '\x99').encode('utf-16-le') + b'\x00\x00'
+        return tables
+    if version == 'SA':
+        return {t: {int(k, 16): v.encode('utf-8') + b'\x00' for k, v in d.items()} for t, d in data.items()}
+    if version == 'VC':
+        return {t: {k: v.encode('utf-16-le') + b'\x00\x00' for k, v in d.items()} for t, d in data.items()}
+    if version == 'III':
+        return {'MAIN': {k: v.encode('utf-16-le') + b'\x00\x00' for k, v in data.get('MAIN', {}).items()}}
+    raise ValueError(f"不支持的版本: {version}")
+
+
+def collect_chars(version, data):
+    """收集编辑器数据中的字符，返回各版本字符映射生成器所需的形式"""
+    from char_stats import CharHistogram
+    return charmap_chars(version, CharHistogram.from_data(data).chars())
+
+
+def charmap_chars(version, chars):
+    """把字符集合（如 CharHistogram.chars()）转换为各版本字符映射生成器所需的形式"""
+    from txt_loader import filter_chars, utf16_units
+    if version == 'IV':
+        return filter_chars(chars, 255)
+    if version in ('VC', 'III'):
+        return utf16_units(chars, 0x7F)
+    return chars
+
+
+# ---------- 缓存 ----------
+def _digest(data, version):
+    h = hashlib.sha1(data)
+    h.update(f'|{version}|{CACHE_VERSION}'.encode())
+    return h.hexdigest()
+
+
+def _parse_to_cache(path, version, cache_path):
+    """解析源文件并写入缓存（供进程池调用），返回是否成功"""
+    result = parse_source(path, version)
+    if result is None:
+        return False
+    tables, chars = result
+    # 同时缓存编码好的表块，表只来自一个文件时可直接拼装
+    blocks = {name: encode_table_block(version, name, entries) for name, entries in tables.items()}
+    tmp = cache_path.with_suffix('.tmp')
+    with open(tmp, 'wb') as f:
+        pickle.dump((tables, chars, blocks), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, cache_path)
+    return True
+
+
+def collect_sources(paths):
+    """展开目录（按文件名排序取 *.txt），保持命令行给出的顺序"""
+    files = []
+    for p in paths:
+        p = Path(p)
+        if p.is_dir():
+            files.extend(sorted(x for x in p.iterdir() if x.suffix.lower() == '.txt'))
+        else:
+            files.append(p)
+    return files
+
+
+class IncrementalBuilder:
+    """按内容哈希缓存每个源文件的解析/编码结果"""
+
+    def __init__(self, version, build_dir, keep_in_memory=False):
+        self.version = version
+        self.keep_in_memory = keep_in_memory  # 常驻进程（监视模式）在内存中保留已读取的缓存
+        self._memo = {}
+        self.build_dir = Path(build_dir)
+        self.build_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.build_dir / MANIFEST_NAME
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+        self.reparsed = []
+        self.reencoded = []
+        self._tables = {}  # 表名 -> (来源文件摘要序列, 合并后的条目, 表块)
+
+    def _cache_path(self, digest):
+        return self.build_dir / f'{digest}.pkl'
+
+    def refresh(self, files, max_workers=None):
+        """更新所有源文件的缓存，返回按文件顺序排列的摘要列表；解析失败返回 None"""
+        digests = []
+        todo = []
+        for path in files:
+            key = f'{self.version}:{os.path.abspath(path)}'
+            st = os.stat(path)
+            stamp = [st.st_mtime_ns, st.st_size]
+            cached = self.manifest.get(key)
+            if cached and cached[:2] == stamp and self._cache_path(cached[2]).exists():
+                digests.append(cached[2])
+                continue
+            # 时间戳变动时才读取内容计算哈希
+            digest = _digest(Path(path).read_bytes(), self.version)
+            self.manifest[key] = stamp + [digest]
+            digests.append(digest)
+            if not self._cache_path(digest).exists() and digest not in {d for _, d in todo}:
+                todo.append((str(path), digest))
+
+        self.reparsed = [p for p, _ in todo]
+        if len(todo) > 1 and max_workers != 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                ok = list(pool.map(_parse_to_cache, [p for p, _ in todo], [self.version] * len(todo),
+                                   [self._cache_path(d) for _, d in todo]))
+        else:
+            ok = [_parse_to_cache(p, self.version, self._cache_path(d)) for p, d in todo]
+        for (p, _), success in zip(todo, ok):
+            if not success:
+                print(f"解析失败: {p}")
+                return None
+        return digests
+
+    def load(self, digests):
+        """读取缓存并按文件顺序合并（后面的文件覆盖前面的同名键），返回 (tables, chars, blocks)
+        每个表的合并结果与表块按来源文件的摘要序列保留：来源文件都没有变化的表直接复用，
+        只有变动的文件涉及的表才重新合并、编码（表名记录在 reencoded 中）"""
+        cached = {}
+        sources = {}
+        chars = set()
+        for digest in digests:
+            file_tables, file_chars, _ = cached[digest] = self._read_cache(digest)
+            for name in file_tables:
+                sources.setdefault(name, []).append(digest)
+            chars.update(file_chars)
+
+        tables = {}
+        blocks = {}
+        memo = {}
+        self.reencoded = []
+        for name, used in sources.items():
+            used = tuple(used)
+            hit = self._tables.get(name)
+            if hit is None or hit[0] != used:
+                if len(used) == 1:
+                    # 只来自一个文件的表直接用解析时编码好的表块
+                    file_tables, _, file_blocks = cached[used[0]]
+                    hit = (used, file_tables[name], file_blocks[name])
+                else:
+                    entries = {}
+                    for digest in used:
+                        entries.update(cached[digest][0][name])
+                    hit = (used, entries, encode_table_block(self.version, name, entries))
+                self.reencoded.append(name)
+            memo[name] = hit
+            tables[name], blocks[name] = hit[1], hit[2]
+        self._tables = memo
+        if self.keep_in_memory:
+            live = set(digests)
+            self._memo = {d: v for d, v in self._memo.items() if d in live}
+        return tables, chars, blocks
+
+    def _read_cache(self, digest):
+        cached = self._memo.get(digest)
+        if cached is None:
+            with open(self._cache_path(digest), 'rb') as f:
+                cached = pickle.load(f)
+            if self.keep_in_memory:
+                self._memo[digest] = cached
+        return cached
+
+    def save_manifest(self, files):
+        """写回清单，并删除不再被引用的缓存文件"""
+        current = {f'{self.version}:{os.path.abspath(p)}' for p in files}
+        prefix = f'{self.version}:'
+        self.manifest = {k: v for k, v in self.manifest.items() if not k.startswith(prefix) or k in current}
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=1)
+        live = {v[2] for v in self.manifest.values()}
+        for p in self.build_dir.glob('*.pkl'):
+            if p.stem not in live:
+                p.unlink()
+
+
+# ---------- 字符映射辅助文件 ----------
+def write_charmaps(version, chars, output_dir, compact=False, lookup=None):
+    """在 output_dir 中生成各版本的字符映射辅助文件
+    VC / SA / III 的行列按 output_dir 中的 char_order.json 保持稳定，compact 为真时去掉空位；
+    lookup 为 'direct' / 'paged' 时同时生成二进制查找表 char_lookup.dat。
+    返回写入的位置顺序（码位列表，空位为 None），字体贴图按它排列（char_order.texture_layout）"""
+    from char_order import ordered_chars, ordered_codes
+    original_dir = os.getcwd()
+    try:
+        os.chdir(output_dir)
+        if version == 'IV':
+            from IVGXT import process_special_chars
+            special_chars = set(chars)
+            process_special_chars(special_chars, lookup)
+            # char_table.dat 按码位排序（插件二分查找），不使用 char_order.json
+            return sorted(ord(c) for c in special_chars)
+        elif version == 'VC':
+            from VCGXT import VCGXT
+            g = VCGXT()
+            g.m_WideCharCollection = set(chars)
+            order = ordered_codes('.', version, g.m_WideCharCollection, compact)
+            g.GenerateWMHHZStuff(order, lookup)
+            return order
+        elif version == 'SA':
+            from SAGXT import SAGXT
+            g = SAGXT()
+            g.m_WideCharCollection = set(chars)
+            order = ordered_chars('.', version, g.m_WideCharCollection, compact)
+            g.generate_wmhhz_stuff(order, lookup)
+            return [None if c is None else ord(c) for c in order]
+        elif version == 'III':
+            from LCGXT import LCGXT
+            g = LCGXT()
+            g.m_WideCharCollection = set(chars)
+            order = ordered_codes('.', version, g.m_WideCharCollection, compact)
+            g.generate_wmhhz_stuff(order, lookup)
+            return order
+        return []
+    finally:
+        os.chdir(original_dir)
+
+
+# ---------- 构建 ----------
+def build(version, sources, output=None, build_dir='.gxtbuild', charmap=False, max_workers=None):
+    """增量构建 GXT，成功返回 True"""
+    start = time.perf_counter()
+    files = collect_sources(sources)
+    if not files:
+        print("没有找到TXT源文件。")
+        return False
+    output = Path(output) if output else Path(OUTPUT_NAMES[version])
+
+    builder = IncrementalBuilder(version, build_dir)
+    digests = builder.refresh(files, max_workers=max_workers)
+    if digests is None:
+        return False
+    tables, chars, blocks = builder.load(digests)
+    data = assemble_gxt(version, tables, blocks)
+    with open(output, 'wb') as f:
+        f.write(data)
+    if charmap:
+        write_charmaps(version, chars, output.parent if str(output.parent) else '.')
+    builder.save_manifest(files)
+
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"已生成GXT文件: {output} (表的数量: {len(tables)}, 重新解析 {len(builder.reparsed)}/{len(files)} 个文件, 用时 {elapsed:.0f} ms)")
+    return True
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="TXT → GXT 增量构建")
+    parser.add_argument('version', choices=['IV', 'VC', 'SA', 'III'], help="游戏版本")
+    parser.add_argument('sources', nargs='+', help="TXT 源文件或目录")
+    parser.add_argument('-o', '--output', help="输出 GXT 路径（默认按版本命名）")
+    parser.add_argument('--build-dir', default='.gxtbuild', help="缓存目录")
+    parser.add_argument('--charmap', action='store_true', help="同时生成字符映射辅助文件")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="并行解析的进程数")
+    args = parser.parse_args()
+    ok = build(args.version, args.sources, args.output, args.build_dir, args.charmap, args.jobs)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+# =======================
+# 表级差异比较：GXT / TXT / DAT
+# 先比较每个表的指纹，相同的表直接跳过（GXT 的表连解码都不需要），
+# 不同的表再用集合运算（哈希连接）找出新增/删除/修改的键
+# =======================
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+
+def fingerprint(entries):
+    """表指纹：按键排序后的键值对的哈希"""
+    h = hashlib.blake2b(digest_size=16)
+    for k in sorted(entries):
+        h.update(f'{k}\x00{entries[k]}\x01'.encode('utf-8', 'surrogatepass'))
+    return h.digest()
+
+
+def _normalize_key(version, key):
+    try:
+        if version == 'SA':
+            return f'{int(key, 16):08X}'
+        if key.lower().startswith('0x'):
+            return f'0x{int(key, 16):08X}'
+    except ValueError:
+        pass
+    return key
+
+
+class Document:
+    """一个可比较的文本来源，按需解码各个表"""
+
+    def __init__(self, path, version=None):
+        self.path = str(path)
+        self.blocks = None   # GXT: {表名: 原始字节}
+        self.tables = {}     # 已解码的 {表名: {键: 值}}
+        ext = Path(path).suffix.lower()
+        if ext == '.gxt':
+            from gxt_parser import read_table_blocks
+            self.version, self.blocks = read_table_blocks(path)
+        else:
+            from gxteditor import read_document
+            self.version, self.tables = read_document(path, version)
+            if self.version in ('SA', 'IV'):
+                # TXT 中的哈希键可以不足 8 位或为小写，统一为 GXT 中的形式
+                self.tables = {t: {_normalize_key(self.version, k): v for k, v in d.items()} for t, d in self.tables.items()}
+
+    def names(self):
+        return list(self.blocks) if self.blocks is not None else list(self.tables)
+
+    def entries(self, name):
+        if name not in self.tables:
+            from gxt_parser import decode_table_block
+            self.tables[name] = decode_table_block(self.version, self.blocks[name])
+        return self.tables[name]
+
+    def has(self, name):
+        return name in (self.blocks if self.blocks is not None else self.tables)
+
+    def entries_or_empty(self, name):
+        """缺少的表视为空表"""
+        return self.entries(name) if self.has(name) else {}
+
+    def same_table(self, other, name):
+        """两边的同名表是否相同；两边都是 GXT 时只比较原始字节"""
+        if self.blocks is not None and other.blocks is not None:
+            if self.blocks[name] == other.blocks[name]:
+                return True
+        return fingerprint(self.entries(name)) == fingerprint(other.entries(name))
+
+
+def diff_documents(old, new):
+    """比较两个 Document，返回 (差异记录列表, 统计信息)
+    记录为 (操作, 表名, 键, 旧值, 新值)"""
+    records = []
+    old_names = old.names()
+    new_names = new.names()
+    new_set = set(new_names)
+    old_set = set(old_names)
+    skipped = 0
+
+    for name in old_names:
+        if name not in new_set:
+            for k, v in sorted(old.entries(name).items()):
+                records.append((REMOVED, name, k, v, None))
+            continue
+        if old.same_table(new, name):
+            skipped += 1
+            continue
+        a = old.entries(name)
+        b = new.entries(name)
+        for k in sorted(a.keys() - b.keys()):
+            records.append((REMOVED, name, k, a[k], None))
+        for k in sorted(b.keys() - a.keys()):
+            records.append((ADDED, name, k, None, b[k]))
+        for k in sorted(k for k in a.keys() & b.keys() if a[k] != b[k]):
+            records.append((CHANGED, name, k, a[k], b[k]))
+
+    for name in new_names:
+        if name not in old_set:
+            for k, v in sorted(new.entries(name).items()):
+                records.append((ADDED, name, k, None, v))
+
+    stats = {
+        'tables': len(old_set | new_set),
+        'identical_tables': skipped,
+        ADDED: sum(1 for r in records if r[0] == ADDED),
+        REMOVED: sum(1 for r in records if r[0] == REMOVED),
+        CHANGED: sum(1 for r in records if r[0] == CHANGED),
+    }
+    return records, stats
+
+
+def write_diff_txt(f, records):
+    """TXT 格式：[表名] 下 '+键=新值'、'-键=旧值'，修改为 '<键=旧值' 与 '>键=新值' 两行"""
+    current = None
+    for op, table, key, old, new in sorted(records, key=lambda r: r[1]):
+        if table != current:
+            if current is not None:
+                f.write("\n")
+            f.write(f"[{table}]\n")
+            current = table
+        if op == ADDED:
+            f.write(f"+{key}={new}\n")
+        elif op == REMOVED:
+            f.write(f"-{key}={old}\n")
+        else:
+            f.write(f"<{key}={old}\n>{key}={new}\n")
+
+
+def write_diff_json(f, records, stats):
+    items = [{'op': op, 'table': t, 'key': k, 'old': o, 'new': n} for op, t, k, o, n in records]
+    json.dump({'stats': stats, 'changes': items}, f, ensure_ascii=False, indent=2)
+
+
+def diff_files(old_path, new_path, output=None, fmt='txt', version=None):
+    """比较两个文件并输出差异（output 为空时输出到标准输出），返回统计信息"""
+    records, stats = diff_documents(Document(old_path, version), Document(new_path, version))
+    f = open(output, 'w', encoding='utf-8') if output else sys.stdout
+    try:
+        if fmt == 'json':
+            write_diff_json(f, records, stats)
+        else:
+            write_diff_txt(f, records)
+    finally:
+        if output:
+            f.close()
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="比较两个 GXT / TXT / DAT 文件")
+    parser.add_argument('old', help="旧文件")
+    parser.add_argument('new', help="新文件")
+    parser.add_argument('-o', '--output', help="输出文件（默认输出到屏幕）")
+    parser.add_argument('-f', '--format', choices=['txt', 'json'], default='txt', help="输出格式")
+    parser.add_argument('-V', '--version', choices=['IV', 'VC', 'SA', 'III'], help="TXT 输入的游戏版本")
+    args = parser.parse_args()
+    stats = diff_files(args.old, args.new, args.output, args.format, args.version)
+    print(f"表 {stats['tables']} 个（相同 {stats['identical_tables']} 个）: "
+          f"新增 {stats[ADDED]}, 删除 {stats[REMOVED]}, 修改 {stats[CHANGED]}", file=sys.stderr)
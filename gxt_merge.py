@@ -0,0 +1,146 @@
+import json
+import sys
+
+from gxt_diff import Document
+
+# =======================
+# 三方合并：base（上游旧版）、ours（我们的译本）、theirs（上游新版/他人译本）
+# 先按表比较指纹：两边相同、或只有一边相对 base 有改动的表整表采用，
+# 其余的表再逐键合并；无法自动合并的键在 TXT 中写入冲突标记
+# =======================
+
+# 冲突标记都以 ';' 开头：VC/SA/III 与编辑器导入会跳过注释行，
+# IV 会把 ';键=值' 读作同一条目的原文，默认生效的始终是 ours 的值。
+# 标记行本身不能含 '='，否则 IV 会把它当成一个新条目
+MARK_OURS = ';<<<<<<< ours'
+MARK_BASE = ';||||||| base'
+MARK_THEIRS = ';------- theirs'
+MARK_END = ';>>>>>>>'
+
+
+def _same(a, b, name):
+    """两边的同名表是否相同（缺少的表视为空表）"""
+    if a.has(name) and b.has(name):
+        return a.same_table(b, name)
+    return not a.entries_or_empty(name) and not b.entries_or_empty(name)
+
+
+def merge_tables(base, ours, theirs):
+    """逐键三方合并，返回 (合并结果, 冲突键列表, 采用 theirs 的键数)"""
+    merged = dict(ours)
+    conflicts = []
+    taken = 0
+    for k in ours.keys() | theirs.keys() | base.keys():
+        b = base.get(k)
+        o = ours.get(k)
+        t = theirs.get(k)
+        if o == t or b == t:
+            continue
+        if b == o:
+            if t is None:
+                del merged[k]
+            else:
+                merged[k] = t
+            taken += 1
+        else:
+            conflicts.append(k)
+    return merged, conflicts, taken
+
+
+def merge_documents(base, ours, theirs):
+    """三方合并三个 Document，返回 (merged, conflicts, stats)
+    merged 为 {表名: {键: 值}}（冲突处保留 ours），conflicts 为 {表名: {键: (base, ours, theirs)}}"""
+    names = list(dict.fromkeys(ours.names() + theirs.names() + base.names()))
+    merged = {}
+    conflicts = {}
+    stats = {'tables': len(names), 'fast_tables': 0, 'merged_tables': 0, 'taken': 0, 'conflicts': 0}
+    for name in names:
+        in_ours = ours.has(name)
+        in_theirs = theirs.has(name)
+        if _same(ours, theirs, name) or _same(base, theirs, name):
+            # theirs 没有改动（或与 ours 相同）：整表采用 ours
+            stats['fast_tables'] += 1
+            if in_ours:
+                merged[name] = ours.entries(name)
+            continue
+        if _same(base, ours, name):
+            # 只有 theirs 有改动：整表采用 theirs
+            stats['fast_tables'] += 1
+            if in_theirs:
+                merged[name] = theirs.entries(name)
+            continue
+
+        b = base.entries_or_empty(name)
+        o = ours.entries_or_empty(name)
+        t = theirs.entries_or_empty(name)
+        table, keys, taken = merge_tables(b, o, t)
+        stats['merged_tables'] += 1
+        stats['taken'] += taken
+        if table or keys or in_ours:
+            merged[name] = table
+        if keys:
+            conflicts[name] = {k: (b.get(k), o.get(k), t.get(k)) for k in keys}
+            stats['conflicts'] += len(keys)
+    return merged, conflicts, stats
+
+
+def write_merge_txt(path, merged, conflicts, version):
+    """写出合并结果，冲突键用标记包围；格式与“导出为单个TXT”一致"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, name in enumerate(sorted(merged.keys() | conflicts.keys())):
+            if i > 0: f.write("\n\n")
+            if version != 'III': f.write(f"[{name}]\n")
+            table = merged.get(name, {})
+            table_conflicts = conflicts.get(name, {})
+            for k in sorted(table.keys() | table_conflicts.keys()):
+                if k not in table_conflicts:
+                    f.write(f"{k}={table[k]}\n")
+                    continue
+                b, o, t = table_conflicts[k]
+                f.write(f"{MARK_OURS}\n")
+                if o is not None:
+                    f.write(f"{k}={o}\n")
+                # IV 的 ';键=值' 会被读作原文，没有 ours 时不写，避免生成空条目
+                alternatives = o is not None or version != 'IV'
+                f.write(f"{MARK_BASE}\n")
+                if b is not None and alternatives:
+                    f.write(f";{k}={b}\n")
+                f.write(f"{MARK_THEIRS}\n")
+                if t is not None and alternatives:
+                    f.write(f";{k}={t}\n")
+                f.write(f"{MARK_END} {k}\n")
+
+
+def write_conflicts_json(path, conflicts):
+    items = [{'table': t, 'key': k, 'base': b, 'ours': o, 'theirs': th}
+             for t, d in sorted(conflicts.items()) for k, (b, o, th) in sorted(d.items())]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(items, f, ensure_ascii=False, indent=2)
+
+
+def merge_files(base_path, ours_path, theirs_path, output, version=None, conflicts_json=None):
+    """三方合并三个文件（GXT / TXT / DAT），结果写为 TXT，返回统计信息"""
+    ours = Document(ours_path, version)
+    base = Document(base_path, version or ours.version)
+    theirs = Document(theirs_path, version or ours.version)
+    merged, conflicts, stats = merge_documents(base, ours, theirs)
+    write_merge_txt(output, merged, conflicts, ours.version)
+    if conflicts_json:
+        write_conflicts_json(conflicts_json, conflicts)
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="三方合并 GXT / TXT 译本")
+    parser.add_argument('base', help="共同祖先（上游旧版）")
+    parser.add_argument('ours', help="我们的译本")
+    parser.add_argument('theirs', help="上游新版或他人译本")
+    parser.add_argument('-o', '--output', required=True, help="合并结果 TXT")
+    parser.add_argument('-V', '--version', choices=['IV', 'VC', 'SA', 'III'], help="TXT 输入的游戏版本")
+    parser.add_argument('--conflicts', help="另外把冲突列表写为 JSON")
+    args = parser.parse_args()
+    stats = merge_files(args.base, args.ours, args.theirs, args.output, args.version, args.conflicts)
+    print(f"表 {stats['tables']} 个（整表处理 {stats['fast_tables']} 个，逐键合并 {stats['merged_tables']} 个）: "
+          f"采用上游修改 {stats['taken']} 个键, 冲突 {stats['conflicts']} 个", file=sys.stderr)
+    sys.exit(1 if stats['conflicts'] else 0)
@@ -1,3 +1,4 @@
+import io
 import struct
 import os
 import sys
@@ -280,6 +281,77 @@ def getReader(version):
         return IV()
     return None
 
+class GxtTables:
+    """逐表读取 GXT：打开时只读取版本和表目录，迭代时依次产生 (表名, {键: 值})"""
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            self.version = getVersion(self.file)
+            self.reader = getReader(self.version)
+            if self.reader is None:
+                raise ValueError(f"无法识别的GXT版本: {path}")
+            self.file.seek(0)
+            self.tables = self.reader.parseTables(self.file) if self.reader.hasTables() else [("MAIN", 0)]
+        except Exception:
+            self.file.close()
+            raise
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __iter__(self):
+        for name, offset in self.tables:
+            self.file.seek(offset)
+            yield name, dict(self.reader.parseTKeyTDat(self.file))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def load_gxt(path):
+    """读取整个 GXT 文件，返回 (版本, {表名: {键: 值}})"""
+    with GxtTables(path) as gxt:
+        return gxt.version, dict(gxt)
+
+def read_table_blocks(path):
+    """读取每个表的原始 TKEY+TDAT 字节（不解码字符串），返回 (版本, {表名: bytes})"""
+    with open(path, 'rb') as f:
+        version = getVersion(f)
+        reader = getReader(version)
+        if reader is None:
+            raise ValueError(f"无法识别的GXT版本: {path}")
+        raw = f.read()
+    if reader.hasTables():
+        start = raw.find(b'TABL')
+        size, = struct.unpack_from('<I', raw, start + 4)
+        tables = []
+        for pos in range(start + 8, start + 8 + size, 12):
+            rawName, offset = struct.unpack_from('8sI', raw, pos)
+            tables.append((rawName.split(b'\x00')[0].decode(), offset))
+    else:
+        tables = [("MAIN", 0)]
+    blocks = {}
+    for name, offset in tables:
+        # 非 MAIN 表的 TKEY 前面有 8 字节表名
+        tkey = raw.find(b'TKEY', offset, offset + 16)
+        if tkey == -1:
+            raise ValueError(f"表 {name} 缺少 TKEY 块")
+        key_size, = struct.unpack_from('<I', raw, tkey + 4)
+        tdat = raw.find(b'TDAT', tkey + 8 + key_size)
+        dat_size, = struct.unpack_from('<I', raw, tdat + 4)
+        blocks[name] = raw[tkey:tdat + 8 + dat_size]
+    return version, blocks
+
+def decode_table_block(version, block):
+    """解码 read_table_blocks 返回的单个表块为 {键: 值}"""
+    stream = io.BufferedReader(io.BytesIO(block))
+    return dict(getReader(version).parseTKeyTDat(stream))
+
 def _parseTables(stream):
     size = findBlock(stream, 'TABL')
     entry_count = int(size / 12)
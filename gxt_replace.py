@@ -0,0 +1,80 @@
+import re
+import sys
+
+# =======================
+# 查找替换：表达式只编译一次，逐表扫描所有值，只返回需要修改的条目（不修改数据），
+# 调用方预览之后再一次性应用
+# =======================
+
+CHUNK = 4096  # 每处理这么多条报告一次进度、检查一次是否已取消
+
+
+class Replacement:
+    """一次查找替换的规则。表达式或替换模板无效时抛出 re.error"""
+
+    def __init__(self, find, repl, regex=True, ignore_case=False):
+        if not find:
+            raise re.error("查找内容不能为空")
+        self.pattern = re.compile(find if regex else re.escape(find), re.IGNORECASE if ignore_case else 0)
+        # 正则模式下 repl 可以引用分组（\1、\g<name>）；普通模式原样替换
+        self.repl = repl if regex else (lambda m: repl)
+        # 普通、区分大小写的查找先用 in 过滤，绝大多数不含查找内容的值不必进入正则引擎
+        self.literal = find if not regex and not ignore_case else None
+        self.pattern.sub(self.repl, "")  # 提前检查替换模板
+
+    def apply(self, text):
+        """返回替换后的文本，没有变化时返回 None"""
+        if self.literal is not None and self.literal not in text:
+            return None
+        new, n = self.pattern.subn(self.repl, text)
+        return new if n and new != text else None
+
+
+def find_replacements(data, replacement, tables=None, progress=None, is_stale=None):
+    """在 data（{表名: {键: 值}}）中查找替换，返回按表名、键排序的 [(表名, 键, 原值, 新值)]
+    tables 限定要处理的表；progress(已处理, 总数) 报告进度；is_stale() 为真时放弃并返回 None"""
+    names = sorted(n for n in (data if tables is None else tables) if n in data)
+    total = sum(len(data[n]) for n in names)
+    apply = replacement.apply
+    changes = []
+    done = 0
+    for name in names:
+        table = data[name]
+        keys = sorted(table)
+        for start in range(0, len(keys), CHUNK):
+            if is_stale is not None and is_stale():
+                return None
+            chunk = keys[start:start + CHUNK]
+            for key in chunk:
+                old = table[key]
+                new = apply(old)
+                if new is not None:
+                    changes.append((name, key, old, new))
+            done += len(chunk)
+            if progress is not None:
+                progress(done, total)
+    return changes
+
+
+def apply_replacements(data, changes):
+    """把 find_replacements 的结果写回 data"""
+    for name, key, _, new in changes:
+        data[name][key] = new
+
+
+def write_changes_txt(f, changes):
+    """与 gxt_diff 的 TXT 格式相同：[表名] 下每个条目 '<键=原值' 与 '>键=新值' 两行"""
+    current = None
+    for name, key, old, new in changes:
+        if name != current:
+            if current is not None:
+                f.write("\n")
+            f.write(f"[{name}]\n")
+            current = name
+        f.write(f"<{key}={old}\n>{key}={new}\n")
+
+
+if __name__ == '__main__':
+    # 与 python -m gxteditor replace 相同
+    from gxteditor import main
+    sys.exit(main(['replace'] + sys.argv[1:]))
@@ -0,0 +1,207 @@
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+from gxt_build import IncrementalBuilder, OUTPUT_NAMES, assemble_gxt, collect_sources, write_charmaps
+
+# =======================
+# 监视模式：TXT 变动后自动重新构建 GXT 与字符映射文件
+# Linux 下使用 inotify，其它平台退回到轮询
+# =======================
+
+# inotify 事件掩码（<sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+def _is_source(name):
+    return name.lower().endswith('.txt')
+
+
+class InotifyWatcher:
+    """通过 ctypes 调用 libc 的 inotify 接口"""
+
+    def __init__(self, directory):
+        import ctypes
+        import ctypes.util
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError("找不到 libc")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("libc 不支持 inotify")
+        self.directory = Path(directory)
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(str(self.directory)), WATCH_MASK)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch 失败")
+
+    def wait(self, timeout):
+        """等待最多 timeout 秒，返回变动的 TXT 文件名集合"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        buf = os.read(self.fd, 64 * 1024)
+        changed = set()
+        pos = 0
+        while pos + EVENT_HEADER.size <= len(buf):
+            _, mask, _, length = EVENT_HEADER.unpack_from(buf, pos)
+            pos += EVENT_HEADER.size
+            name = buf[pos:pos + length].split(b'\x00', 1)[0]
+            pos += length
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                raise OSError(f"监视的目录已被删除或移动: {self.directory}")
+            name = os.fsdecode(name)
+            if _is_source(name):
+                changed.add(name)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """按固定间隔比较目录中 TXT 文件的 (mtime, size)"""
+
+    def __init__(self, directory, interval=1.0):
+        self.directory = Path(directory)
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        result = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if _is_source(entry.name) and entry.is_file():
+                    st = entry.stat()
+                    result[entry.name] = (st.st_mtime_ns, st.st_size)
+        return result
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            if current != self.snapshot:
+                changed = {n for n in current.keys() | self.snapshot.keys() if current.get(n) != self.snapshot.get(n)}
+                self.snapshot = current
+                return changed
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return set()
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+def make_watcher(directory, interval=1.0):
+    """优先使用 inotify，不可用时退回轮询"""
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            print(f"inotify 不可用（{e}），改用轮询。")
+    return PollingWatcher(directory, interval)
+
+
+class WatchBuilder:
+    """常驻的增量构建器：只重写内容有变化的输出文件"""
+
+    def __init__(self, version, source_dir, output=None, build_dir='.gxtbuild', charmap=True, max_workers=None):
+        self.version = version
+        self.source_dir = Path(source_dir)
+        self.output = Path(output) if output else Path(OUTPUT_NAMES[version])
+        self.charmap = charmap
+        self.max_workers = max_workers
+        self.builder = IncrementalBuilder(version, build_dir, keep_in_memory=True)
+        self.last_data = None
+        self.last_chars = None
+        if self.output.exists():
+            self.last_data = self.output.read_bytes()
+
+    def rebuild(self):
+        start = time.perf_counter()
+        files = collect_sources([self.source_dir])
+        digests = self.builder.refresh(files, max_workers=self.max_workers)
+        if digests is None:
+            print("构建失败，等待下一次修改。")
+            return False
+        tables, chars, blocks = self.builder.load(digests)
+        data = assemble_gxt(self.version, tables, blocks)
+
+        written = []
+        if data != self.last_data:
+            with open(self.output, 'wb') as f:
+                f.write(data)
+            self.last_data = data
+            written.append(str(self.output))
+        # 字符集合不变时，字符映射文件也不需要重写
+        if self.charmap and chars != self.last_chars:
+            write_charmaps(self.version, chars, self.output.parent if str(self.output.parent) else '.')
+            self.last_chars = chars
+            written.append("字符映射文件")
+        self.builder.save_manifest(files)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        reparsed = ", ".join(os.path.basename(p) for p in self.builder.reparsed) or "无"
+        updated = ", ".join(written) or "无变化"
+        print(f"[{time.strftime('%H:%M:%S')}] 重新解析: {reparsed}; 重新编码 {len(self.builder.reencoded)}/{len(tables)} 个表; "
+              f"已更新: {updated} ({elapsed:.0f} ms)")
+        return True
+
+
+def watch(version, source_dir, output=None, build_dir='.gxtbuild', charmap=True, debounce=0.3, interval=1.0, max_workers=None):
+    """监视 source_dir，TXT 变动（去抖动后）自动重新构建，Ctrl+C 退出"""
+    wb = WatchBuilder(version, source_dir, output, build_dir, charmap, max_workers)
+    wb.rebuild()
+    watcher = make_watcher(source_dir, interval)
+    print(f"正在监视 {source_dir}（{type(watcher).__name__}），按 Ctrl+C 退出。")
+    try:
+        while True:
+            changed = watcher.wait(3600)
+            if not changed:
+                continue
+            # 去抖动：直到 debounce 秒内没有新事件才开始构建
+            while True:
+                more = watcher.wait(debounce)
+                if not more:
+                    break
+                changed |= more
+            try:
+                wb.rebuild()
+            except OSError as e:
+                # 例如编辑器保存时文件被临时删除/改名
+                print(f"构建出错: {e}，等待下一次修改。")
+    except KeyboardInterrupt:
+        print("已停止监视。")
+    finally:
+        watcher.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="监视 TXT 目录并自动构建 GXT")
+    parser.add_argument('version', choices=['IV', 'VC', 'SA', 'III'], help="游戏版本")
+    parser.add_argument('source_dir', help="TXT 源目录")
+    parser.add_argument('-o', '--output', help="输出 GXT 路径（默认按版本命名）")
+    parser.add_argument('--build-dir', default='.gxtbuild', help="缓存目录")
+    parser.add_argument('--no-charmap', action='store_true', help="不生成字符映射辅助文件")
+    parser.add_argument('--debounce', type=float, default=0.3, help="去抖动时间（秒）")
+    parser.add_argument('--interval', type=float, default=1.0, help="轮询间隔（秒）")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="并行解析的进程数")
+    args = parser.parse_args()
+    watch(args.version, args.source_dir, args.output, args.build_dir, not args.no_charmap,
+          args.debounce, args.interval, args.jobs)
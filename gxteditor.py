@@ -0,0 +1,431 @@
+"""GTA GXT 编辑器命令行工具（不导入 Qt 界面，可在无显示器的构建服务器上运行）
+
+用法:
+  python -m gxteditor build IV src/*.txt -o chinese.gxt --charmap
+  python -m gxteditor dump *.gxt -d out/
+  python -m gxteditor stats *.gxt *.dat
+  python -m gxteditor convert -t gxt -V VC src/*.txt -d out/
+  python -m gxteditor font IV chinese.gxt -d out/ --texture
+  python -m gxteditor diff old.gxt new.gxt -f json -o changes.json
+  python -m gxteditor merge base.gxt ours.txt theirs.gxt -V IV -o merged.txt
+  python -m gxteditor replace chinese.gxt "," "，" -o fixed.gxt
+  python -m gxteditor startup --budget 350
+"""
+import glob
+import os
+import sys
+import time
+from pathlib import Path
+
+VERSIONS = ['IV', 'VC', 'SA', 'III']
+STARTUP_BUDGET_MS = 350  # 图形界面 import main 的时间预算
+# 启动时不应导入的模块：格式读写模块和 numpy 在第一次打开、保存文件或建立全局索引时才导入
+LAZY_MODULES = ['numpy', 'gxt_parser', 'whm_table', 'txt_loader', 'IVGXT', 'VCGXT', 'SAGXT', 'LCGXT', 'gxt_build', 'global_index']
+
+
+# ---------- 读写 ----------
+def read_document(path, version=None):
+    """读取 GXT / DAT / TXT，返回 (版本, {表名: {键: 值}})"""
+    ext = Path(path).suffix.lower()
+    if ext == '.gxt':
+        from gxt_parser import load_gxt
+        return load_gxt(path)
+    if ext == '.dat':
+        from whm_table import iter_whm_table
+        return 'IV', {'whm_table': {f'0x{h:08X}': text for h, text in iter_whm_table(Path(path))}}
+    if ext == '.txt':
+        if version not in VERSIONS:
+            raise ValueError("读取TXT需要用 -V 指定版本")
+        # 与 build 一样用各版本自己的 TXT 解析器（保留值首尾的空格），再按 GXT 中的形式解码，
+        # 读到的内容与由它构建的 GXT 相同
+        from gxt_build import encode_table_block, parse_source
+        from gxt_parser import decode_table_block
+        result = parse_source(path, version)
+        if result is None:
+            raise ValueError("解析TXT失败")
+        tables, _ = result
+        return version, {name: decode_table_block(version, encode_table_block(version, name, entries))
+                         for name, entries in tables.items()}
+    raise ValueError(f"不支持的文件类型: {path}")
+
+
+def write_document(path, data, version, charmap=False):
+    """按扩展名写出 GXT / DAT / TXT"""
+    ext = Path(path).suffix.lower()
+    if ext == '.txt':
+        from txt_loader import dump_txt
+        dump_txt(path, data, version)
+    elif ext == '.dat':
+        from whm_table import write_whm_table
+
+        def pairs():
+            for table in data.values():
+                for key, text in table.items():
+                    try:
+                        yield int(key, 16), text
+                    except ValueError:
+                        print(f"警告：跳过无效的哈希键 '{key}'")
+        write_whm_table(Path(path), pairs())
+    elif ext == '.gxt':
+        if version not in VERSIONS:
+            raise ValueError(f"不支持写出该版本的GXT: {version}")
+        from gxt_build import assemble_gxt, encode_tables, collect_chars, write_charmaps
+        with open(path, 'wb') as f:
+            f.write(assemble_gxt(version, encode_tables(version, data)))
+        if charmap:
+            write_charmaps(version, collect_chars(version, data), os.path.dirname(path) or '.')
+    else:
+        raise ValueError(f"不支持的文件类型: {path}")
+
+
+def txt_to_gxt(src, dst, version, charmap=False):
+    """TXT → GXT：与 build 一样使用各版本自己的 TXT 解析器（保留值首尾的空格等），输出与 build 逐字节相同"""
+    if version not in VERSIONS:
+        raise ValueError("读取TXT需要用 -V 指定版本")
+    from gxt_build import assemble_gxt, parse_source, write_charmaps
+    result = parse_source(src, version)
+    if result is None:
+        raise ValueError("解析TXT失败")
+    tables, chars = result
+    with open(dst, 'wb') as f:
+        f.write(assemble_gxt(version, tables))
+    if charmap:
+        write_charmaps(version, chars, os.path.dirname(dst) or '.')
+
+
+# ---------- 并行任务 ----------
+def expand(patterns):
+    """展开通配符（Windows 的命令行不会自动展开），保持给出的顺序并去重"""
+    files = []
+    for p in patterns:
+        matches = sorted(glob.glob(p)) if glob.has_magic(p) else [p]
+        if not matches:
+            print(f"警告：没有匹配的文件 '{p}'")
+        files.extend(matches)
+    return list(dict.fromkeys(files))
+
+
+def _run(job):
+    """在子进程中执行单个任务，捕获异常以便汇总"""
+    fn, args = job
+    start = time.perf_counter()
+    try:
+        result = fn(*args)
+        return True, result, time.perf_counter() - start
+    except Exception as e:
+        return False, f"{args[0]}: {e}", time.perf_counter() - start
+
+
+def run_jobs(fn, arg_list, jobs=None):
+    """用进程池执行任务，按输入顺序输出结果并打印汇总，返回成功任务的结果列表"""
+    start = time.perf_counter()
+    work = [(fn, args) for args in arg_list]
+    if len(work) > 1 and jobs != 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_run, work))
+    else:
+        results = [_run(w) for w in work]
+
+    ok = []
+    failed = 0
+    for success, result, elapsed in results:
+        if success:
+            ok.append(result)
+            if isinstance(result, str):
+                print(f"  {result} ({elapsed * 1000:.0f} ms)")
+        else:
+            failed += 1
+            print(f"  失败: {result}")
+    print(f"完成: {len(ok)} 个成功, {failed} 个失败, 用时 {time.perf_counter() - start:.2f} s")
+    return ok if not failed else None
+
+
+def _output_path(src, out_dir, ext):
+    directory = out_dir or os.path.dirname(src)
+    return os.path.join(directory, Path(src).stem + ext)
+
+
+def _convert_job(src, dst, version, charmap):
+    if Path(src).suffix.lower() == '.txt' and Path(dst).suffix.lower() == '.gxt':
+        txt_to_gxt(src, dst, version, charmap)
+    else:
+        version, data = read_document(src, version)
+        write_document(dst, data, version, charmap)
+    return f"{src} → {dst}"
+
+
+def _stats_job(src, version):
+    from char_stats import CharHistogram
+    version, data = read_document(src, version)
+    chars = CharHistogram.from_data(data).chars()
+    keys = sum(len(t) for t in data.values())
+    wide = sum(1 for c in chars if ord(c) > 255)
+    return f"{src}: 版本 {version}, 表 {len(data)}, 键值对 {keys}, 字符 {len(chars)} (其中 >255: {wide})"
+
+
+def _chars_job(src, version):
+    from gxt_build import collect_chars
+    version, data = read_document(src, version)
+    return collect_chars(version, data)
+
+
+# ---------- 启动时间 ----------
+def measure_startup():
+    """在新的解释器中用 -X importtime 导入图形界面，返回 import main 导入的 [(深度, 自身 us, 累计 us, 模块名)]，
+    按导入顺序（子模块在前），最后一项为 main 本身"""
+    import subprocess
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                          cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import main 失败")
+    records = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        own, total, name = line[len('import time:'):].split('|')
+        if not own.strip().isdigit():
+            continue  # 表头
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        records.append((depth, int(own), int(total), name.strip()))
+    # 解释器启动时导入的模块也在输出中：只保留 main 之前、上一个顶层模块之后的部分
+    end = next(i for i, r in enumerate(records) if r[0] == 0 and r[3] == 'main')
+    start = end
+    while start > 0 and records[start - 1][0] > 0:
+        start -= 1
+    return records[start:end + 1]
+
+
+# ---------- 子命令 ----------
+def cmd_build(args):
+    from gxt_build import build
+    files = expand(args.sources)
+    return build(args.version, files, args.output, args.build_dir, args.charmap, args.jobs)
+
+
+def cmd_dump(args):
+    files = expand(args.inputs)
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    jobs = [(f, _output_path(f, args.output_dir, '.txt'), args.version, False) for f in files]
+    return run_jobs(_convert_job, jobs, args.jobs) is not None
+
+
+def cmd_convert(args):
+    files = expand(args.inputs)
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    ext = '.' + args.to
+    jobs = [(f, _output_path(f, args.output_dir, ext), args.version, args.charmap) for f in files]
+    return run_jobs(_convert_job, jobs, args.jobs) is not None
+
+
+def cmd_stats(args):
+    files = expand(args.inputs)
+    return run_jobs(_stats_job, [(f, args.version) for f in files], args.jobs) is not None
+
+
+def cmd_font(args):
+    from gxt_build import write_charmaps
+    from char_order import texture_layout
+    files = expand(args.inputs)
+    results = run_jobs(_chars_job, [(f, args.version) for f in files], args.jobs)
+    if results is None:
+        return False
+    native = set().union(*results)
+    out_dir = args.output_dir or '.'
+    os.makedirs(out_dir, exist_ok=True)
+    # 贴图的格子与字符映射文件的位置一一对应
+    layout = texture_layout(write_charmaps(args.version, native, out_dir, args.compact_charmap, args.lookup))
+    print(f"字体贴图字符数: {sum(1 for c in layout if c)}")
+    if args.texture:
+        render_texture(layout, args.version, out_dir, args.resolution, args.font_family, args.font_size, args.font_file,
+                       args.glyph_cache, args.update)
+    return True
+
+
+def cmd_diff(args):
+    from gxt_diff import diff_files, ADDED, REMOVED, CHANGED
+    stats = diff_files(args.old, args.new, args.output, args.format, args.version)
+    print(f"表 {stats['tables']} 个（相同 {stats['identical_tables']} 个）: "
+          f"新增 {stats[ADDED]}, 删除 {stats[REMOVED]}, 修改 {stats[CHANGED]}", file=sys.stderr)
+    return True
+
+
+def cmd_merge(args):
+    from gxt_merge import merge_files
+    stats = merge_files(args.base, args.ours, args.theirs, args.output, args.version, args.conflicts)
+    print(f"表 {stats['tables']} 个（整表处理 {stats['fast_tables']} 个，逐键合并 {stats['merged_tables']} 个）: "
+          f"采用上游修改 {stats['taken']} 个键, 冲突 {stats['conflicts']} 个", file=sys.stderr)
+    return not stats['conflicts']
+
+
+def cmd_replace(args):
+    from gxt_replace import Replacement, find_replacements, apply_replacements, write_changes_txt
+    version, data = read_document(args.input, args.version)
+    changes = find_replacements(data, Replacement(args.find, args.replace, args.regex, args.ignore_case), args.table)
+    if args.output:
+        apply_replacements(data, changes)
+        write_document(args.output, data, version)
+    else:
+        write_changes_txt(sys.stdout, changes)
+    print(f"共修改 {len(changes)} 个条目，涉及 {len({c[0] for c in changes})} 个表", file=sys.stderr)
+    return True
+
+
+def cmd_startup(args):
+    measure_startup()  # 预热：生成 .pyc，之后几次测量不含编译时间
+    best = None
+    for _ in range(args.runs):
+        records = measure_startup()
+        total = records[-1][2]
+        if best is None or total < best[0]:
+            best = (total, records)
+    total, records = best
+    # main 直接导入的模块（深度 1）按累计时间排序
+    children = sorted((r for r in records if r[0] == 1), key=lambda r: -r[2])
+    print(f"{'模块':<32}{'自身 ms':>10}{'累计 ms':>10}")
+    for _, own, cumulative, name in children[:args.top]:
+        print(f"{name:<32}{own / 1000:>10.1f}{cumulative / 1000:>10.1f}")
+    print(f"{'main（自身）':<30}{records[-1][1] / 1000:>10.1f}")
+    print(f"import main: {total / 1000:.1f} ms（预算 {args.budget} ms，{args.runs} 次中最快的一次）")
+    ok = total <= args.budget * 1000
+    if not ok:
+        print(f"超出预算 {total / 1000 - args.budget:.1f} ms")
+    eager = [m for m in LAZY_MODULES if any(r[3] == m for r in records)]
+    if eager:
+        print(f"启动时导入了应当延迟导入的模块: {', '.join(eager)}")
+    return ok and not eager
+
+
+def render_texture(chars, version, out_dir, resolution, family, size, font_file=None, glyph_cache_dir=None, update=False):
+    """用 QtGui 的 offscreen 平台渲染字体贴图（不需要显示器）；chars 为各格子的字符（空格子为 None），
+    给定 glyph_cache_dir 时只绘制缓存中没有的字符，update 为真时增量更新 out_dir 中已有的贴图"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtGui import QGuiApplication, QFont, QFontDatabase
+    from font_texture import FontTextureGenerator
+    from glyph_cache import GlyphCache
+    app = QGuiApplication.instance() or QGuiApplication(['gxteditor'])
+    if font_file:
+        font_id = QFontDatabase.addApplicationFont(font_file)
+        if font_id == -1:
+            raise ValueError(f"无法加载字体文件: {font_file}")
+        family = QFontDatabase.applicationFontFamilies(font_id)[0]
+    font = QFont(family, size, QFont.Weight.Bold)
+    generator = FontTextureGenerator(glyph_cache=GlyphCache(glyph_cache_dir) if glyph_cache_dir else None)
+    path_font = os.path.join(out_dir, 'font.png')
+    if update:
+        pages = generator.update_and_save(chars, path_font, version, resolution, font)
+        print(f"增量更新: 重画 {generator.rendered} 个字符")
+    else:
+        pages = generator.generate_and_save(chars, path_font, version, resolution, font)
+        if glyph_cache_dir:
+            print(f"新绘制字形: {generator.rendered}（其余来自缓存）")
+    settings = {'version': version, 'resolution': resolution, 'characters': chars, 'font_normal': font}
+    generator.generate_html_preview(settings, path_font, os.path.join(out_dir, 'font_preview.html'))
+    print(f"已生成字体贴图: {', '.join(pages) or '无改动'}")
+    return app
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog='gxteditor', description="GTA GXT 编辑器命令行工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def common(p, version_required=False):
+        if version_required:
+            p.add_argument('version', choices=VERSIONS, help="游戏版本")
+        else:
+            p.add_argument('-V', '--version', choices=VERSIONS, help="TXT 输入的游戏版本")
+        p.add_argument('-j', '--jobs', type=int, default=None, help="并行进程数")
+
+    p = sub.add_parser('build', help="TXT → GXT 增量构建")
+    common(p, version_required=True)
+    p.add_argument('sources', nargs='+', help="TXT 源文件、目录或通配符")
+    p.add_argument('-o', '--output', help="输出 GXT 路径（默认按版本命名）")
+    p.add_argument('--build-dir', default='.gxtbuild', help="缓存目录")
+    p.add_argument('--charmap', action='store_true', help="同时生成字符映射辅助文件")
+    p.set_defaults(func=cmd_build)
+
+    p = sub.add_parser('dump', help="GXT / DAT → TXT")
+    common(p)
+    p.add_argument('inputs', nargs='+', help="输入文件或通配符")
+    p.add_argument('-d', '--output-dir', help="输出目录（默认与输入文件相同）")
+    p.set_defaults(func=cmd_dump, txt_inputs=('inputs',))
+
+    p = sub.add_parser('convert', help="在 GXT / DAT / TXT 之间转换")
+    common(p)
+    p.add_argument('inputs', nargs='+', help="输入文件或通配符")
+    p.add_argument('-t', '--to', required=True, choices=['gxt', 'txt', 'dat'], help="输出格式")
+    p.add_argument('-d', '--output-dir', help="输出目录（默认与输入文件相同）")
+    p.add_argument('--charmap', action='store_true', help="输出 GXT 时同时生成字符映射辅助文件")
+    p.set_defaults(func=cmd_convert, txt_inputs=('inputs',))
+
+    p = sub.add_parser('stats', help="统计表、键值对与字符数量")
+    common(p)
+    p.add_argument('inputs', nargs='+', help="输入文件或通配符")
+    p.set_defaults(func=cmd_stats, txt_inputs=('inputs',))
+
+    p = sub.add_parser('font', help="生成字符映射文件，可选渲染字体贴图")
+    common(p, version_required=True)
+    p.add_argument('inputs', nargs='+', help="GXT / DAT / TXT 输入文件或通配符")
+    p.add_argument('-d', '--output-dir', help="输出目录")
+    p.add_argument('--texture', action='store_true', help="渲染 font.png（需要 PySide6，使用 offscreen 平台）")
+    p.add_argument('--resolution', type=int, choices=[4096, 2048], default=4096, help="贴图分辨率")
+    p.add_argument('--font-family', default='Microsoft YaHei', help="字体名称")
+    p.add_argument('--font-size', type=int, default=42, help="字号")
+    p.add_argument('--font-file', help="字体文件 (.ttf/.otf)")
+    p.add_argument('--glyph-cache', help="字形缓存目录（重复生成时只绘制新字符）")
+    p.add_argument('--update', action='store_true', help="增量更新输出目录中已有的贴图（只重画有变化的字符）")
+    p.add_argument('--compact-charmap', action='store_true', help="去掉字符映射中已不再使用的空位（之后的字符位置会改变）")
+    p.add_argument('--lookup', choices=['direct', 'paged'],
+                   help="同时生成二进制查找表 char_lookup.dat（direct：65536 项直接索引；paged：两级分页表，适合稀疏字符集与 U+FFFF 以上的字符）")
+    p.set_defaults(func=cmd_font)
+
+    p = sub.add_parser('diff', help="比较两个 GXT / TXT / DAT 文件")
+    common(p)
+    p.add_argument('old', help="旧文件")
+    p.add_argument('new', help="新文件")
+    p.add_argument('-o', '--output', help="输出文件（默认输出到屏幕）")
+    p.add_argument('-f', '--format', choices=['txt', 'json'], default='txt', help="输出格式")
+    p.set_defaults(func=cmd_diff, txt_inputs=('old', 'new'))
+
+    p = sub.add_parser('merge', help="三方合并译本，冲突处写入标记（有冲突时返回 1）")
+    common(p)
+    p.add_argument('base', help="共同祖先（上游旧版）")
+    p.add_argument('ours', help="我们的译本")
+    p.add_argument('theirs', help="上游新版或他人译本")
+    p.add_argument('-o', '--output', required=True, help="合并结果 TXT")
+    p.add_argument('--conflicts', help="另外把冲突列表写为 JSON")
+    p.set_defaults(func=cmd_merge, txt_inputs=('ours',))  # base / theirs 没有 -V 时使用 ours 的版本
+
+    p = sub.add_parser('replace', help="在所有表中查找替换（不指定 -o 时只列出将被修改的条目）")
+    common(p)
+    p.add_argument('input', help="输入文件")
+    p.add_argument('find', help="查找内容")
+    p.add_argument('replace', help="替换为")
+    p.add_argument('-o', '--output', help="输出文件")
+    p.add_argument('-r', '--regex', action='store_true', help="按正则表达式查找")
+    p.add_argument('-i', '--ignore-case', action='store_true', help="不区分大小写")
+    p.add_argument('-t', '--table', action='append', help="只处理指定的表（可多次指定）")
+    p.set_defaults(func=cmd_replace, txt_inputs=('input',))
+
+    p = sub.add_parser('startup', help="测量图形界面的启动导入时间（-X importtime），超出预算时返回 1")
+    p.add_argument('--budget', type=int, default=STARTUP_BUDGET_MS, help=f"import main 的时间预算（毫秒，默认 {STARTUP_BUDGET_MS}）")
+    p.add_argument('--runs', type=int, default=3, help="测量次数，取最快的一次")
+    p.add_argument('--top', type=int, default=15, help="列出耗时最多的模块数")
+    p.set_defaults(func=cmd_startup)
+
+    args = parser.parse_args(argv)
+    # 读取 TXT 需要版本，在开始处理之前报错
+    inputs = []
+    for name in getattr(args, 'txt_inputs', ()):
+        value = getattr(args, name)
+        inputs.extend(value if isinstance(value, list) else [value])
+    if any(Path(p).suffix.lower() == '.txt' for p in inputs) and args.version is None:
+        sub.choices[args.command].error("读取TXT需要用 -V 指定版本")
+    return 0 if args.func(args) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,138 +1,43 @@
 import os
-import shutil
 import sys
 import re  # 添加正则表达式模块
+import html
+import difflib
+import bisect
+import threading
 from pathlib import Path
 from PySide6.QtGui import QIcon
 
-from PySide6.QtCore import Qt, QTimer, QRect, Signal, QPoint, QPointF
+from PySide6.QtCore import Qt, QTimer, Signal, QPoint, QPointF
 from PySide6.QtGui import (
-    QPalette, QColor, QAction, QGuiApplication, QFont,
-    QPixmap, QPainter, QImage, QFontDatabase, QCursor, QFontMetrics
+    QPalette, QColor, QAction, QGuiApplication, QFont, QFontDatabase, QCursor
 )
 from PySide6.QtWidgets import (
-    QApplication, QMainWindow, QDockWidget, QListWidget, QTableWidget, QTableWidgetItem,
+    QApplication, QMainWindow, QDockWidget, QListWidget, QTableView,
     QFileDialog, QLineEdit, QMessageBox, QVBoxLayout, QWidget, QMenuBar, QMenu,
     QStatusBar, QPushButton, QHBoxLayout, QLabel, QInputDialog, QTextEdit, QDialog,
     QDialogButtonBox, QAbstractItemView, QHeaderView, QCheckBox, QComboBox, QFontDialog,
-    QScrollArea, QSizePolicy, QGroupBox, QFrame
+    QScrollArea, QSizePolicy, QGroupBox, QFrame, QProgressBar
 )
 
 # --- 导入核心逻辑 ---
-from gxt_parser import getVersion, getReader
-from IVGXT import generate_binary as write_iv, load_txt as load_iv_txt, process_special_chars, gta4_gxt_hash
-from VCGXT import VCGXT
-from SAGXT import SAGXT
-from LCGXT import LCGXT
-from whm_table import parse_whm_table, dump_whm_table
+# 各格式的读写模块（以及它们依赖的 numpy）在第一次打开、保存或导出时才导入，窗口先显示出来
+from font_texture import FontTextureGenerator, page_count
+from glyph_cache import GlyphCache, default_cache_dir
+from table_model import KeyValueTableModel, HitListModel, ChangeListModel
+from gxt_replace import Replacement, find_replacements
+from edit_history import Delta, EditHistory
+from char_stats import CharHistogram, is_font_char
+from search_index import SearchWorker
+from global_search import GlobalIndexer, MODE_TEXT, MODE_PREFIX, MODE_REGEX
+from doc_loader import DocumentLoader, KIND_GXT, KIND_DAT, KIND_TXT
+
+SEARCH_DEBOUNCE_MS = 200         # 停止输入这么久之后才开始搜索
+SEARCH_THREAD_THRESHOLD = 20000  # 键数超过此值的表在后台线程中搜索
+UNDO_BUDGET_MB = 64              # 撤销历史的内存预算，超出时丢弃最早的记录
 
 # ========== 字体生成器及相关组件 ==========
 
-class FontTextureGenerator:
-    """GTA 字体贴图生成器核心类"""
-    def __init__(self):
-        self.margin = 2
-        self.y_offset = -4
-        self.bg_color = QColor(0, 0, 0, 0)
-        self.text_color = QColor('white')
-
-    def create_pixmap(self, characters, version, texture_size, font):
-        """创建并返回 QPixmap 对象，用于预览或保存"""
-        if not characters:
-            return QPixmap()
-
-        chars_per_line = 64 if texture_size == 4096 else 32
-        pixmap = QPixmap(texture_size, texture_size)
-        pixmap.fill(self.bg_color)
-
-        painter = QPainter(pixmap)
-        painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
-        painter.setFont(font)
-        painter.setPen(self.text_color)
-
-        char_width = texture_size // chars_per_line
-        char_height_map = {"III": 80, "VC": 64, "SA": 80, "IV": 66}
-        char_height = char_height_map.get(version, 64)
-
-        x, y = 0, 0
-        for char in characters:
-            draw_rect = QRect(
-                x + self.margin, y + self.margin + self.y_offset,
-                char_width - 2 * self.margin, char_height - 2 * self.margin
-            )
-            painter.drawText(draw_rect, Qt.AlignmentFlag.AlignCenter, char)
-            x += char_width
-            if x >= texture_size:
-                x = 0
-                y += char_height
-                if y + char_height > texture_size:
-                    print(f"警告：字符过多，部分字符 '{char}' 之后的内容可能未被绘制")
-                    break
-        painter.end()
-        return pixmap
-
-    def generate_and_save(self, characters, output_path, version, texture_size, font):
-        """生成贴图并保存到文件"""
-        pixmap = self.create_pixmap(characters, version, texture_size, font)
-        if not pixmap.isNull():
-            if not pixmap.save(output_path, "PNG"):
-                raise IOError(f"无法保存文件到 {output_path}")
-
-    def generate_html_preview(self, settings, texture_filename, output_path):
-        """生成HTML预览文件"""
-        char_width = settings['resolution'] // (64 if settings['resolution'] == 4096 else 32)
-        char_height_map = {"III": 80, "VC": 64, "SA": 80, "IV": 66}
-        char_height = char_height_map.get(settings['version'], 64)
-
-        html_content = f"""
-        <!DOCTYPE html>
-        <html lang="zh-CN"><head><meta charset="UTF-8"><title>字体贴图预览</title>
-        <style>
-            body {{ font-family: sans-serif; background-color: #1e1e1e; color: #e0e0e0; }}
-            .container {{ max-width: 1200px; margin: 0 auto; padding: 20px; }}
-            h1, h2 {{ text-align: center; color: #4fc3f7; }}
-            .info-grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 15px; background-color: #2d2d2d; padding: 15px; border-radius: 5px; margin-bottom: 20px; }}
-            .info-item {{ margin: 5px 0; }} .info-item strong {{ color: #82b1ff; }}
-            .texture-container {{ text-align: center; margin-bottom: 30px; }}
-            .texture-img {{ max-width: 100%; border: 1px solid #444; }}
-            .char-grid {{ display: grid; grid-template-columns: repeat(auto-fill, minmax(80px, 1fr)); gap: 10px; margin-top: 20px; }}
-            .char-item {{ background-color: #2d2d2d; border: 1px solid #444; border-radius: 4px; padding: 10px; text-align: center; }}
-            .char-display {{ font-size: 24px; margin-bottom: 5px; height: 40px; display: flex; align-items: center; justify-content: center; }}
-            .char-code {{ font-size: 12px; color: #aaa; }}
-        </style></head><body><div class="container">
-            <h1>字体贴图预览</h1>
-            <div class="info-grid">
-                <div class="info-item"><strong>游戏版本:</strong> {settings['version']}</div>
-                <div class="info-item"><strong>贴图尺寸:</strong> {settings['resolution']}x{settings['resolution']}px</div>
-                <div class="info-item"><strong>字符总数:</strong> {len(settings['characters'])}</div>
-                <div class="info-item"><strong>单元格尺寸:</strong> {char_width}x{char_height}px</div>
-                <div class="info-item"><strong>字体:</strong> {settings['font_normal'].family()}, {settings['font_normal'].pointSize()}pt</div>
-            </div>
-            <div class="texture-container"><h2>字体贴图</h2><img src="{os.path.basename(texture_filename)}" alt="字体贴图" class="texture-img"></div>
-            
-            <div class="char-container">
-                <h2>字符列表 (共 {len(settings['characters'])} 个字符)</h2>
-                <div class="char-grid">
-        """
-        
-        # 添加字符网格
-        for char in settings['characters']:
-            char_code = ord(char)
-            html_content += f"""
-                <div class="char-item">
-                    <div class="char-display">{char}</div>
-                    <div class="char-code">U+{char_code:04X}</div>
-                </div>
-            """
-        
-        html_content += """
-                </div>
-            </div>
-        </div></body></html>
-        """
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-
 class ImageViewer(QDialog):
     """图片查看器对话框，支持滚轮缩放和鼠标拖动平移"""
     def __init__(self, pixmap, title="图片预览", parent=None):
@@ -395,7 +300,8 @@ class FontGeneratorDialog(QDialog):
         self.setWindowTitle("GTA 字体贴图生成器")
         self.setMinimumSize(640, 700)  # 减小高度
         self.gxt_editor = parent
-        self.generator = FontTextureGenerator()
+        # 与主窗口共用字形缓存：再次预览或生成时只绘制新加入的字符
+        self.generator = FontTextureGenerator(glyph_cache=getattr(parent, 'glyph_cache', None))
         self.characters = initial_chars  # 存储字符数据
 
         layout = QVBoxLayout(self)
@@ -436,6 +342,10 @@ class FontGeneratorDialog(QDialog):
         # 字体选择
         self.font_normal_widget = FontSelectionWidget("字体设置", QFont("Microsoft YaHei", 42, QFont.Weight.Bold))
         settings_layout.addWidget(self.font_normal_widget)
+
+        # 增量更新：与输出目录中已有的贴图逐格比较，只重画有变化的几行
+        self.incremental_check = QCheckBox("增量更新已有贴图（只重画有变化的字符）")
+        settings_layout.addWidget(self.incremental_check)
         
         layout.addWidget(settings_group)
         
@@ -556,6 +466,8 @@ class FontGeneratorDialog(QDialog):
             pixmap_normal = self.generator.create_pixmap(settings["characters"], settings["version"], settings["resolution"], settings["font_normal"])
             if self.preview_normal_label:
                 self.display_pixmap(self.preview_normal_label, pixmap_normal)
+                pages = page_count(settings["characters"], settings["version"], settings["resolution"])
+                self.preview_normal_label.setToolTip(f"共 {pages} 页贴图，这里显示第 1 页" if pages > 1 else "")
         finally:
             QApplication.restoreOverrideCursor()
             
@@ -661,6 +573,7 @@ class FontGeneratorDialog(QDialog):
             "resolution": resolution,
             "characters": self.characters,
             "font_normal": self.font_normal_widget.get_font(),
+            "incremental": self.incremental_check.isChecked(),
         }
         return settings
 
@@ -900,6 +813,175 @@ class VersionDialog(QDialog):
                 return v
         return "IV"
 
+def diff_html(old, new):
+    """逐字比较，删除的部分标红并划线，插入的部分标绿"""
+    parts = []
+    for op, a1, a2, b1, b2 in difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+        if op == 'equal':
+            parts.append(html.escape(old[a1:a2]))
+            continue
+        if a2 > a1:
+            parts.append(f'<span style="background:#6b2b2b; text-decoration:line-through;">{html.escape(old[a1:a2])}</span>')
+        if b2 > b1:
+            parts.append(f'<span style="background:#2b6b3a;">{html.escape(new[b1:b2])}</span>')
+    return "".join(parts).replace("\n", "<br>")
+
+class ReplaceDialog(QDialog):
+    """查找替换：在后台线程中扫描，预览所有将被修改的条目，确认后由主窗口一次性应用"""
+    def __init__(self, parent=None, data=None, current_table=None):
+        super().__init__(parent)
+        self.setWindowTitle("查找替换")
+        self.setMinimumSize(820, 560)
+        self.data = data or {}
+        self.current_table = current_table
+        self.changes = []
+        self._generation = 0   # 每次预览加一，旧的扫描线程发现后自行放弃
+        self._progress = (0, 1)
+        self._result = None
+
+        layout = QVBoxLayout(self)
+        form = QHBoxLayout()
+        self.find_edit = QLineEdit()
+        self.find_edit.setPlaceholderText("查找内容")
+        self.replace_edit = QLineEdit()
+        self.replace_edit.setPlaceholderText("替换为（正则模式下可用 \\1 引用分组）")
+        form.addWidget(self.find_edit, 1)
+        form.addWidget(self.replace_edit, 1)
+        layout.addLayout(form)
+
+        options = QHBoxLayout()
+        self.regex_check = QCheckBox("正则表达式")
+        self.case_check = QCheckBox("区分大小写")
+        self.case_check.setChecked(True)
+        self.scope_combo = QComboBox()
+        self.scope_combo.addItem("所有表", False)
+        if current_table:
+            self.scope_combo.addItem(f"当前表 ({current_table})", True)
+        self.btn_preview = QPushButton("🔍 预览")
+        self.btn_preview.clicked.connect(self.start_preview)
+        options.addWidget(self.regex_check)
+        options.addWidget(self.case_check)
+        options.addWidget(self.scope_combo)
+        options.addStretch()
+        options.addWidget(self.btn_preview)
+        layout.addLayout(options)
+
+        self.progress = QProgressBar()
+        self.progress.hide()
+        layout.addWidget(self.progress)
+
+        self.model = ChangeListModel(parent=self)
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.view.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.view.verticalHeader().setVisible(False)
+        header = self.view.horizontalHeader()
+        for col in (0, 1):
+            header.setSectionResizeMode(col, QHeaderView.ResizeMode.ResizeToContents)
+        header.setResizeContentsPrecision(100)
+        for col in (2, 3):
+            header.setSectionResizeMode(col, QHeaderView.ResizeMode.Stretch)
+        self.view.selectionModel().currentRowChanged.connect(self.show_diff)
+        layout.addWidget(self.view, 1)
+
+        self.diff_view = QTextEdit()
+        self.diff_view.setReadOnly(True)
+        self.diff_view.setMaximumHeight(110)
+        layout.addWidget(self.diff_view)
+
+        self.summary = QLabel("输入查找内容后点击“预览”")
+        layout.addWidget(self.summary)
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel, parent=self)
+        self.buttons.button(QDialogButtonBox.StandardButton.Ok).setText("全部替换")
+        self.buttons.button(QDialogButtonBox.StandardButton.Cancel).setText("关闭")
+        self.buttons.button(QDialogButtonBox.StandardButton.Ok).setEnabled(False)
+        self.buttons.accepted.connect(self.accept)
+        self.buttons.rejected.connect(self.reject)
+        layout.addWidget(self.buttons)
+
+        # 修改任何条件后，之前的预览作废
+        for edit in (self.find_edit, self.replace_edit):
+            edit.textChanged.connect(self.invalidate)
+            edit.returnPressed.connect(self.start_preview)
+        self.regex_check.toggled.connect(self.invalidate)
+        self.case_check.toggled.connect(self.invalidate)
+        self.scope_combo.currentIndexChanged.connect(self.invalidate)
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(50)
+        self.poll_timer.timeout.connect(self._poll)
+
+    def invalidate(self, *_):
+        self._generation += 1
+        self.poll_timer.stop()
+        self.progress.hide()
+        self.changes = []
+        self.model.set_changes([])
+        self.diff_view.clear()
+        self.buttons.button(QDialogButtonBox.StandardButton.Ok).setEnabled(False)
+
+    def start_preview(self):
+        try:
+            rule = Replacement(self.find_edit.text(), self.replace_edit.text(),
+                               self.regex_check.isChecked(), not self.case_check.isChecked())
+        except re.error as e:
+            self.summary.setText(f"表达式错误: {e}")
+            return
+        self.invalidate()
+        generation = self._generation
+        tables = [self.current_table] if self.scope_combo.currentData() else None
+        self._progress = (0, 1)
+        self._result = None
+
+        # 扫描线程只读取数据（对话框是模态的，扫描期间数据不会被修改），结果由 _poll 取回
+        def run():
+            def progress(done, total):
+                self._progress = (done, total)
+            changes = find_replacements(self.data, rule, tables, progress, lambda: self._generation != generation)
+            if changes is not None:
+                self._result = (generation, changes)
+
+        threading.Thread(target=run, name="gxt-replace", daemon=True).start()
+        self.progress.setValue(0)
+        self.progress.show()
+        self.summary.setText("正在查找 ...")
+        self.poll_timer.start()
+
+    def _poll(self):
+        done, total = self._progress
+        self.progress.setMaximum(max(total, 1))
+        self.progress.setValue(done)
+        result = self._result
+        if result is None or result[0] != self._generation:
+            return
+        self.poll_timer.stop()
+        self.progress.hide()
+        self.changes = result[1]
+        self.model.set_changes(self.changes)
+        tables = len({c[0] for c in self.changes})
+        self.summary.setText(f"将修改 {len(self.changes)} 个条目，涉及 {tables} 个表")
+        self.buttons.button(QDialogButtonBox.StandardButton.Ok).setEnabled(bool(self.changes))
+        if self.changes:
+            self.view.selectRow(0)
+
+    def show_diff(self, current, _previous=None):
+        if not current.isValid():
+            self.diff_view.clear()
+            return
+        name, key, old, new = self.model.change_at(current.row())
+        self.diff_view.setHtml(f"<b>[{html.escape(name)}] {html.escape(key)}</b><br>{diff_html(old, new)}")
+
+    def done(self, result):
+        self._generation += 1  # 取消仍在进行的扫描
+        self.poll_timer.stop()
+        super().done(result)
+
+    def get_changes(self):
+        return self.changes
+
 # ========== 主窗口 ==========
 class GXTEditorApp(QMainWindow):
     def __init__(self, file_to_open=None):
@@ -934,6 +1016,12 @@ class GXTEditorApp(QMainWindow):
         self.version_filename_map = {'IV': 'GTA4.txt', 'VC': 'GTAVC.txt', 'SA': 'GTASA.txt', 'III': 'GTA3.txt'}
         self.remember_gen_extra_choice = None
         self.modified = False  # 新增：标记文件是否已修改
+        self.history = EditHistory(UNDO_BUDGET_MB * 1024 * 1024)  # 撤销/重做
+        self.loading = None  # 正在后台打开的文件：新文档和打开前的状态
+        self.char_counts = CharHistogram()  # 文档中每个字符的出现次数，随编辑增量更新
+        self.texture_chars = set()  # 字体贴图中已有的字符：打开文件时的字符，或最近一次生成的贴图
+        self.glyph_cache = GlyphCache(default_cache_dir())  # 字体贴图的字形缓存（内存 + 磁盘）
+        self.missing_glyphs = set()  # 编辑后新出现、字体贴图中还没有的字符
 
         # --- UI ---
         self._apply_neutral_dark_theme()
@@ -1034,7 +1122,7 @@ class GXTEditorApp(QMainWindow):
             }}
             /* ======================================================= */
 
-            QLineEdit, QTextEdit, QListWidget, QTableWidget, QComboBox {{
+            QLineEdit, QTextEdit, QListWidget, QTableView, QComboBox {{
                 background-color: {darker_bg.name()};
                 color: {text_color.name()};
                 border: 1px solid {border_color.name()};
@@ -1043,7 +1131,7 @@ class GXTEditorApp(QMainWindow):
                 selection-background-color: {highlight.name()};
                 selection-color: white;
             }}
-            QLineEdit:focus, QTextEdit:focus, QListWidget:focus, QTableWidget:focus, QComboBox:focus {{
+            QLineEdit:focus, QTextEdit:focus, QListWidget:focus, QTableView:focus, QComboBox:focus {{
                 border: 1px solid {highlight.name()};
             }}
             QDockWidget {{
@@ -1064,7 +1152,7 @@ class GXTEditorApp(QMainWindow):
                 padding: 5px;
                 border: 1px solid {border_color.name()};
             }}
-            QTableWidget::item {{
+            QTableView::item {{
                 padding: 5px;
             }}
             QTableCornerButton::section {{
@@ -1116,19 +1204,36 @@ class GXTEditorApp(QMainWindow):
         file_menu.addSeparator()
         file_menu.addAction(self._act("🆕 新建GXT文件", self.new_gxt))
         file_menu.addAction(self._act("📝 新建WHM文件", self.new_whm))
-        file_menu.addAction(self._act("💾 保存", self.save_file, "Ctrl+S"))
-        file_menu.addAction(self._act("💾 另存为...", self.save_file_as))
+        # 打开文件期间禁用的操作（它们读写的是尚未读完的文档）
+        self.document_actions = [
+            self._act("💾 保存", self.save_file, "Ctrl+S"),
+            self._act("💾 另存为...", self.save_file_as),
+            self._act("➡ 导出为单个TXT", lambda: self.export_txt(single=True)),
+            self._act("➡ 导出为多个TXT", lambda: self.export_txt(single=False)),
+            self._act("🔁 查找替换...", self.show_replace_dialog, "Ctrl+H"),
+        ]
+        file_menu.addActions(self.document_actions[:2])
         file_menu.addSeparator()
-        file_menu.addAction(self._act("➡ 导出为单个TXT", lambda: self.export_txt(single=True)))
-        file_menu.addAction(self._act("➡ 导出为多个TXT", lambda: self.export_txt(single=False)))
+        file_menu.addActions(self.document_actions[2:4])
         file_menu.addSeparator()
         file_menu.addAction(self._act("📎 设置.gxt文件关联", self.set_file_association))
         file_menu.addSeparator()
         file_menu.addAction(self._act("❌ 退出", self.close, "Ctrl+Q"))
         
+        edit_menu = QMenu("编辑", self)
+        menubar.addMenu(edit_menu)
+        self.undo_action = self._act("↶ 撤销", self.undo, "Ctrl+Z")
+        self.redo_action = self._act("↷ 重做", self.redo, "Ctrl+Y")
+        edit_menu.addAction(self.undo_action)
+        edit_menu.addAction(self.redo_action)
+        edit_menu.addSeparator()
+        edit_menu.addAction(self.document_actions[4])
+        self._update_undo_actions()
+
         tools_menu = QMenu("工具", self)
         menubar.addMenu(tools_menu)
         tools_menu.addAction(self._act("🎨 GTA 字体贴图生成器", self.open_font_generator))
+        tools_menu.addAction(self._act("🔎 全局搜索", self.show_global_search, "Ctrl+Shift+F"))
 
         help_menu = QMenu("帮助", self)
         menubar.addMenu(help_menu)
@@ -1138,6 +1243,25 @@ class GXTEditorApp(QMainWindow):
     def _setup_statusbar(self):
         self.status = QStatusBar()
         self.setStatusBar(self.status)
+        # 打开文件的进度和取消按钮，只在后台读取时显示
+        self.load_progress = QProgressBar()
+        self.load_progress.setMaximumWidth(200)
+        self.load_progress.setTextVisible(False)
+        self.load_cancel = QPushButton("取消")
+        self.load_cancel.clicked.connect(self.cancel_loading)
+        self.glyph_label = QLabel()
+        self.glyph_label.hide()
+        self.status.addPermanentWidget(self.glyph_label)
+        self.status.addPermanentWidget(self.load_progress)
+        self.status.addPermanentWidget(self.load_cancel)
+        self.load_progress.hide()
+        self.load_cancel.hide()
+        self.loader = DocumentLoader(self)
+        self.loader.begun.connect(self._on_load_begun)
+        self.loader.progress.connect(self._on_load_progress)
+        self.loader.table_loaded.connect(self._on_table_loaded)
+        self.loader.finished.connect(self._on_load_finished)
+        self.loader.failed.connect(self._on_load_failed)
         self.update_status("就绪。将 .gxt, .dat 或 .txt 文件拖入窗口可打开。")
 
     def _setup_body(self):
@@ -1190,12 +1314,21 @@ class GXTEditorApp(QMainWindow):
         # 搜索框
         self.key_search = QLineEdit()
         self.key_search.setPlaceholderText("🔍 搜索键或值...")
-        self.key_search.textChanged.connect(self.search_key_value)
+        # 输入去抖动：每次按键重新计时，停止输入后才搜索
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.search_key_value)
+        self.key_search.textChanged.connect(lambda _: self.search_timer.start())
+        self.search_worker = SearchWorker(self)
+        self.search_worker.finished.connect(self._apply_search_result)
+        self.search_worker.index_built.connect(lambda table, index, version: self.key_model.store_search_index(table, index, version))
         c_layout.addWidget(self.key_search)
         
         # 表格
-        self.table = QTableWidget(0, 3)
-        self.table.setHorizontalHeaderLabels(["序号", "键名 (Key)", "值 (Value)"])
+        self.key_model = KeyValueTableModel(self.value_display_limit, self)
+        self.table = QTableView()
+        self.table.setModel(self.key_model)
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
@@ -1204,6 +1337,7 @@ class GXTEditorApp(QMainWindow):
         self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)
         self.table.setColumnWidth(0, 50)  # 减小序号列宽度
         self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setResizeContentsPrecision(100)  # 只按部分行计算键名列宽，大表切换时不逐行测量
         self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
         
         # 设置右键菜单
@@ -1215,22 +1349,82 @@ class GXTEditorApp(QMainWindow):
         # 底部按钮栏 - 移动到表格下方
         key_btns = QHBoxLayout()
         key_btns.setContentsMargins(0, 5, 0, 0)  # 添加上边距
-        btn_kadd = QPushButton("➕ 添加键")
-        btn_clear = QPushButton("💥 清空此表")
+        self.btn_add_key = QPushButton("➕ 添加键")
+        self.btn_clear_table = QPushButton("💥 清空此表")
         
-        btn_kadd.clicked.connect(self.add_key)
-        btn_clear.clicked.connect(self.clear_current_table)
+        self.btn_add_key.clicked.connect(self.add_key)
+        self.btn_clear_table.clicked.connect(self.clear_current_table)
         
-        key_btns.addWidget(btn_kadd)
-        key_btns.addWidget(btn_clear)
+        key_btns.addWidget(self.btn_add_key)
+        key_btns.addWidget(self.btn_clear_table)
         key_btns.addStretch()  # 添加弹性空间使按钮左对齐
         c_layout.addLayout(key_btns)
         
         self.setCentralWidget(central)
+        self._setup_global_search()
+
+    def _setup_global_search(self):
+        """底部的全局搜索面板：在所有表中查找，双击结果跳转到对应的表和键"""
+        self.global_dock = QDockWidget("全局搜索", self)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.global_dock)
+        panel = QWidget()
+        layout = QVBoxLayout(panel)
+        layout.setContentsMargins(5, 5, 5, 5)
+
+        row = QHBoxLayout()
+        self.global_search = QLineEdit()
+        self.global_search.setPlaceholderText("🔍 在所有表中搜索...")
+        self.global_mode = QComboBox()
+        self.global_mode.addItem("键或值", MODE_TEXT)
+        self.global_mode.addItem("键名前缀", MODE_PREFIX)
+        self.global_mode.addItem("正则表达式", MODE_REGEX)
+        row.addWidget(self.global_search, 1)
+        row.addWidget(self.global_mode)
+        layout.addLayout(row)
+
+        self.global_timer = QTimer(self)
+        self.global_timer.setSingleShot(True)
+        self.global_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.global_timer.timeout.connect(self.run_global_search)
+        self.global_search.textChanged.connect(lambda _: self.global_timer.start())
+        self.global_mode.currentIndexChanged.connect(lambda _: self.global_timer.start())
+
+        self.hit_model = HitListModel(self.value_display_limit, self)
+        self.hit_view = QTableView()
+        self.hit_view.setModel(self.hit_model)
+        self.hit_view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.hit_view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.hit_view.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.hit_view.verticalHeader().setVisible(False)
+        self.hit_view.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
+        self.hit_view.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
+        self.hit_view.horizontalHeader().setResizeContentsPrecision(100)
+        self.hit_view.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        self.hit_view.activated.connect(self.jump_to_hit)
+        layout.addWidget(self.hit_view)
+
+        self.global_dock.setWidget(panel)
+        self.global_dock.hide()
+
+        self.global_indexer = GlobalIndexer(self)
+        self.global_indexer.ready.connect(self._on_global_index_ready)
+        self.global_indexer.regex_done.connect(self._on_global_regex_done)
+        self.key_model.keys_edited.connect(self._on_keys_edited)
+
+    def _table_name(self, table):
+        """表（字典）对应的表名；批量修改可能涉及当前表以外的表"""
+        if self.current_table and self.data.get(self.current_table) is table:
+            return self.current_table
+        return next((name for name, t in self.data.items() if t is table), None)
+
+    def _on_keys_edited(self, table, keys):
+        name = self._table_name(table)
+        if name is not None:
+            self.global_indexer.keys_edited(name, table, keys)
 
     def show_context_menu(self, position):
         """显示右键菜单"""
-        if not self.current_table:
+        if not self.current_table or self.loading:
             return
 
         menu = QMenu()
@@ -1299,36 +1493,234 @@ class GXTEditorApp(QMainWindow):
         self.update_status(f"查看表: {self.current_table}，共 {len(self.data.get(self.current_table, {}))} 个键值对")
 
     def refresh_keys(self):
-        self.table.setRowCount(0)
-        if self.current_table and self.current_table in self.data:
-            for idx, (k, v) in enumerate(sorted(self.data[self.current_table].items()), 1):
-                display_value = v if len(v) <= self.value_display_limit else v[:self.value_display_limit] + "..."
-                self._insert_row(idx, k, display_value, v)
-
-    def _insert_row(self, idx, key, display_value, full_value):
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-        idx_item = QTableWidgetItem(str(idx))
-        idx_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.table.setItem(row, 0, idx_item)
-        self.table.setItem(row, 1, QTableWidgetItem(key))
-        value_item = QTableWidgetItem(display_value)
-        value_item.setData(Qt.ItemDataRole.UserRole, full_value)
-        self.table.setItem(row, 2, value_item)
+        """重新显示当前表（切换表、整表变化时调用；单个键的编辑由模型发出细粒度信号）"""
+        self.search_worker.cancel()
+        self.key_model.set_table(self.data.get(self.current_table) if self.current_table else None)
 
     def search_key_value(self):
         keyword = self.key_search.text().lower()
-        self.table.setRowCount(0)
-        count = 0
-        if self.current_table and self.current_table in self.data:
-            current_index = 1
-            for k, v in sorted(self.data[self.current_table].items()):
-                if keyword in k.lower() or keyword in str(v).lower():
-                    display_value = v if len(v) <= self.value_display_limit else v[:self.value_display_limit] + "..."
-                    self._insert_row(current_index, k, display_value, v)
-                    current_index += 1
-            count = current_index - 1
-        self.update_status(f"搜索结果: {count} 个匹配项")
+        self.search_worker.cancel()
+        if not (self.current_table and self.current_table in self.data):
+            self.key_model.set_table(None)
+            self.update_status("搜索结果: 0 个匹配项")
+            return
+        table = self.data[self.current_table]
+        if not keyword:
+            self._apply_search_result(table, keyword, None)
+            return
+        keys = self.key_model.sorted_keys(table)
+        index = self.key_model.search_index(table)
+        if len(table) < SEARCH_THREAD_THRESHOLD:
+            if index is None:
+                index = self.key_model.build_search_index(table)
+            self._apply_search_result(table, keyword, index.search(keys, keyword))
+            return
+        # 大表：在后台线程中搜索（需要时先建立索引），界面保持可操作
+        items = table.copy().items() if index is None else None
+        self.search_worker.submit(table, keyword, keys.copy(), index, items, self.key_model.edit_version)
+        self.update_status(f"正在搜索 '{keyword}' ...")
+
+    def _apply_search_result(self, table, keyword, keys, version=None):
+        # 表已切换或关键字已变化时丢弃过时的结果
+        if table is not self.data.get(self.current_table) or keyword != self.key_search.text().lower():
+            return
+        if version is not None and version != self.key_model.edit_version:
+            # 搜索期间表被编辑过，重新搜索
+            self.search_timer.start()
+            return
+        self.key_model.set_table(table, keys)
+        self.update_status(f"搜索结果: {self.key_model.rowCount()} 个匹配项")
+
+    # ====== 全局搜索 ======
+    def show_global_search(self):
+        self.global_dock.show()
+        self.global_search.setFocus()
+        self.global_search.selectAll()
+
+    def reset_document_state(self, char_counts=None):
+        """打开或新建文件后调用：清空撤销记录和旧的搜索结果，在后台为新文档建立全局索引。
+        char_counts 为读取文件时统计好的字符；打开时已有的字符视为字体贴图中已有"""
+        self.char_counts = char_counts if char_counts is not None else CharHistogram.from_data(self.data)
+        self.texture_chars = set(self.char_counts.font_chars())
+        self.missing_glyphs = set()
+        self._update_missing_glyphs()
+        self.history.clear()
+        self._update_undo_actions()
+        self.hit_model.set_hits(self.data, [])
+        self.global_indexer.rebuild(self.data)
+        if self.global_search.text():
+            self.global_timer.start()
+
+    def run_global_search(self):
+        text = self.global_search.text()
+        mode = self.global_mode.currentData()
+        self.global_indexer.cancel_regex()
+        if not text:
+            self.hit_model.set_hits(self.data, [])
+            return
+        if self.loading:
+            # 打开完成后会自动重新搜索
+            self.update_status("正在打开文件 ...")
+            return
+        if mode == MODE_REGEX:
+            try:
+                self.global_indexer.search_regex(text)
+            except re.error as e:
+                self.update_status(f"正则表达式错误: {e}")
+                return
+            self.update_status(f"正在搜索 '{text}' ...")
+            return
+        hits = self.global_indexer.search(mode, text)
+        if hits is None:
+            # 索引建立完成后会自动重新搜索
+            self.update_status("正在建立全局索引 ...")
+            return
+        self._show_global_hits(hits)
+
+    def _on_global_index_ready(self):
+        if self.global_search.text() and self.global_mode.currentData() != MODE_REGEX:
+            self.run_global_search()
+
+    def _on_global_regex_done(self, text, hits):
+        if text == self.global_search.text() and self.global_mode.currentData() == MODE_REGEX:
+            self._show_global_hits(hits)
+
+    def _show_global_hits(self, hits):
+        self.hit_model.set_hits(self.data, hits)
+        tables = len({name for name, _ in hits})
+        self.update_status(f"全局搜索结果: {len(hits)} 个匹配项，分布在 {tables} 个表中")
+
+    def jump_to_hit(self, index):
+        """跳转到搜索结果所在的表，并选中该键"""
+        name, key = self.hit_model.hit_at(index.row())
+        if key not in self.data.get(name, {}):
+            self.update_status(f"[{name}] {key} 已不存在")
+            return
+        if not self.table_list.findItems(name, Qt.MatchFlag.MatchExactly):
+            self.table_search.clear()
+        if self.key_search.text():
+            # 清除表内搜索；不等去抖动计时器，下面直接显示整个表
+            self.key_search.clear()
+            self.search_timer.stop()
+        if name != self.current_table:
+            self.table_list.setCurrentItem(self.table_list.findItems(name, Qt.MatchFlag.MatchExactly)[0])
+        elif self.key_model.is_filtered():
+            self.refresh_keys()
+        row = self.key_model.row_of(key)
+        self.table.selectRow(row)
+        self.table.scrollTo(self.key_model.index(row, 1), QAbstractItemView.ScrollHint.PositionAtCenter)
+        self.table.setFocus()
+
+    # ====== 编辑与撤销 ======
+    def commit_edit(self, label, changes, created=(), dropped=(), renamed=None):
+        """记录并应用一次编辑：changes 为 [(表名, 键, 新值)]（新值为 None 表示删除），
+        created / dropped 为新建 / 删除的表，renamed 为 (旧表名, 新表名)"""
+        delta = Delta.capture(label, self.data, changes, created, dropped, renamed)
+        self._apply_delta(delta, forward=True)
+        self.history.push(delta)
+        self._update_undo_actions()
+        self.set_modified(True)
+
+    def _apply_delta(self, delta, forward):
+        """正向（执行/重做）或反向（撤销）应用一次编辑"""
+        created, dropped = (delta.created, delta.dropped) if forward else (delta.dropped, delta.created)
+        for name in created:
+            self.data[name] = {}
+        if delta.renamed:
+            old, new = delta.renamed if forward else delta.renamed[::-1]
+            self.data[new] = self.data.pop(old)
+            self.global_indexer.table_renamed(old, new)
+            if self.current_table == old:
+                self.current_table = new
+        # 要删除的表不必逐键修改
+        new_chars = self.apply_batch([(name, key, new if forward else old) for name, key, old, new in delta.changes() if name not in dropped])
+        for name in dropped:
+            self.char_counts.remove(self.data[name].values())
+            del self.data[name]
+            self.global_indexer.table_dropped(name)
+            if self.current_table == name:
+                self.current_table = None
+                self.refresh_keys()
+        self._update_missing_glyphs(new_chars)
+        if created or dropped or delta.renamed:
+            target = created[0] if created else (self.current_table if not delta.renamed else new)
+            self.filter_tables()
+            self._select_table_by_name(target)
+
+    def apply_batch(self, changes):
+        """一次性应用 [(表名, 键, 新值)]（新值为 None 表示删除），按表分组交给表格模型；
+        同时更新字符统计，返回新出现的字符"""
+        by_table = {}
+        old_texts, new_texts = [], []
+        for name, key, value in changes:
+            table = self.data.get(name)
+            if table is None:
+                continue
+            by_table.setdefault(name, []).append((key, value))
+            old_texts.append(table.get(key, ""))
+            new_texts.append(value or "")
+        new_chars = self.char_counts.replace(old_texts, new_texts)
+        for name, items in by_table.items():
+            self.key_model.apply_changes(self.data[name], items)
+        return new_chars
+
+    def _update_missing_glyphs(self, new_chars=()):
+        """记录编辑后新出现、字体贴图中还没有的字符，显示在状态栏"""
+        self.missing_glyphs = {c for c in self.missing_glyphs.union(new_chars)
+                               if c in self.char_counts and is_font_char(c) and c not in self.texture_chars}
+        missing = "".join(sorted(self.missing_glyphs))
+        self.glyph_label.setText(f"⚠ {len(missing)} 个新字符不在字体贴图中")
+        self.glyph_label.setToolTip(f"需要重新生成字体贴图（工具→GTA 字体贴图生成器）:\n{missing[:200]}{' ...' if len(missing) > 200 else ''}")
+        self.glyph_label.setVisible(bool(missing))
+
+    def _select_table_by_name(self, name):
+        if not name or name not in self.data:
+            return
+        if not self.table_list.findItems(name, Qt.MatchFlag.MatchExactly):
+            self.table_search.clear()
+        items = self.table_list.findItems(name, Qt.MatchFlag.MatchExactly)
+        if items:
+            self.table_list.setCurrentItem(items[0])
+
+    def _update_undo_actions(self):
+        undo, redo = self.history.undo_label(), self.history.redo_label()
+        self.undo_action.setEnabled(undo is not None and not self.loading)
+        self.undo_action.setText(f"↶ 撤销 {undo}" if undo else "↶ 撤销")
+        self.redo_action.setEnabled(redo is not None and not self.loading)
+        self.redo_action.setText(f"↷ 重做 {redo}" if redo else "↷ 重做")
+
+    def undo(self):
+        if not self.history.can_undo():
+            return
+        delta = self.history.undo()
+        self._apply_delta(delta, forward=False)
+        self._after_history_step(delta, "已撤销")
+
+    def redo(self):
+        if not self.history.can_redo():
+            return
+        delta = self.history.redo()
+        self._apply_delta(delta, forward=True)
+        self._after_history_step(delta, "已重做")
+
+    def _after_history_step(self, delta, verb):
+        # 只涉及一个表时切换到该表，便于看到变化
+        if len(delta.names) == 1 and delta.names[0] != self.current_table and not delta.dropped:
+            self._select_table_by_name(delta.names[0])
+        self._update_undo_actions()
+        self.update_status(f"{verb}: {delta.label}（历史记录 {len(self.history)} 步，占用 {self.history.size / 1024:.0f} KB）")
+        self.set_modified(True)
+
+    def show_replace_dialog(self):
+        if not self.data:
+            QMessageBox.information(self, "提示", "请先打开或新建一个文件")
+            return
+        dlg = ReplaceDialog(self, self.data, self.current_table)
+        if dlg.exec() != QDialog.DialogCode.Accepted or not dlg.get_changes():
+            return
+        changes = dlg.get_changes()
+        self.commit_edit(f"替换 {len(changes)} 个条目", [(name, key, new) for name, key, _, new in changes])
+        self.update_status(f"已替换 {len(changes)} 个条目")
 
     def add_table(self):
         if self.file_type == 'dat':
@@ -1344,50 +1736,38 @@ class GXTEditorApp(QMainWindow):
             if name in self.data:
                 QMessageBox.warning(self, "错误", f"表 '{name}' 已存在！")
                 return
-            self.data[name] = {}
-            self.table_search.clear()
-            self.filter_tables()
-            items = self.table_list.findItems(name, Qt.MatchFlag.MatchExactly)
-            if items: self.table_list.setCurrentItem(items[0])
+            self.commit_edit(f"新建表 {name}", [], created=[name])
             self.update_status(f"已添加新表: {name}")
-            self.set_modified(True)
 
     def delete_table(self):
         if self.file_type == 'dat':
             QMessageBox.information(self, "提示", "DAT 文件不支持多表操作。")
             return
         if not self.current_table: return
-        msg_box = QMessageBox(QMessageBox.Icon.Question, "确认", f"是否删除表 '{self.current_table}'？\n此操作不可恢复！", 
+        msg_box = QMessageBox(QMessageBox.Icon.Question, "确认", f"是否删除表 '{self.current_table}'？", 
                              QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, self)
         msg_box.button(QMessageBox.StandardButton.Yes).setText("是")
         msg_box.button(QMessageBox.StandardButton.No).setText("否")
         if msg_box.exec() == QMessageBox.StandardButton.Yes:
             old = self.current_table
-            del self.data[self.current_table]
-            self.current_table = None
-            self.refresh_keys()
-            self.filter_tables()
+            self.commit_edit(f"删除表 {old}", [], dropped=[old])
             self.update_status(f"已删除表: {old}")
-            self.set_modified(True)
 
     def rename_table(self, _item):
-        if self.file_type == 'dat':
+        if self.file_type == 'dat' or self.loading:
             return
         if not self.current_table: return
         old = self.current_table
         new, ok = QInputDialog.getText(self, "重命名表", "请输入新名称：", text=old)
         if ok and new.strip():
             new = new.strip()
-            if new in self.data and new != old:
+            if new == old:
+                return
+            if new in self.data:
                 QMessageBox.warning(self, "错误", f"表 '{new}' 已存在！")
                 return
-            self.data[new] = self.data.pop(old)
-            self.current_table = new
-            self.filter_tables()
-            items = self.table_list.findItems(new, Qt.MatchFlag.MatchExactly)
-            if items: self.table_list.setCurrentItem(items[0])
+            self.commit_edit(f"重命名表 {old}", [], renamed=(old, new))
             self.update_status(f"已将表 '{old}' 重命名为 '{new}'")
-            self.set_modified(True)
 
     def export_current_table(self):
         if not self.current_table or not self.data.get(self.current_table):
@@ -1405,10 +1785,10 @@ class GXTEditorApp(QMainWindow):
             QMessageBox.critical(self, "错误", f"导出失败: {str(e)}")
 
     def on_table_double_click(self):
-        if not self.current_table: return
-        row = self.table.currentRow()
+        if not self.current_table or self.loading: return
+        row = self.table.currentIndex().row()
         if row < 0: return
-        key = self.table.item(row, 1).text()
+        key = self.key_model.key_at(row)
         original_value = self.data[self.current_table].get(key, "")
         dlg = EditKeyDialog(self, title=f"编辑: {key}", key=key, value=original_value, version=self.version, file_type=self.file_type)
         if dlg.exec() == QDialog.DialogCode.Accepted:
@@ -1419,12 +1799,10 @@ class GXTEditorApp(QMainWindow):
             if new_key != key and new_key in self.data[self.current_table]:
                 QMessageBox.critical(self, "错误", f"键名 '{new_key}' 已存在！")
                 return
-            if new_key != key:
-                if key in self.data[self.current_table]: del self.data[self.current_table][key]
-            self.data[self.current_table][new_key] = new_val
-            self.refresh_keys()
+            t = self.current_table
+            changes = [(t, key, new_val)] if new_key == key else [(t, key, None), (t, new_key, new_val)]
+            self.commit_edit(f"编辑 {new_key}", changes)
             self.update_status(f"已更新键: {new_key}")
-            self.set_modified(True)
 
     def add_key(self):
         if not self.current_table: 
@@ -1437,18 +1815,18 @@ class GXTEditorApp(QMainWindow):
             
             if isinstance(result, list):  # 批量添加模式
                 pairs = result
-                added_count = 0
+                new_pairs = {}
                 duplicate_keys = []
                 
                 for key, value in pairs:
-                    if key in self.data[self.current_table]:
+                    if key in self.data[self.current_table] or key in new_pairs:
                         duplicate_keys.append(key)
                         continue
                         
-                    self.data[self.current_table][key] = value
-                    added_count += 1
+                    new_pairs[key] = value
                     
-                self.refresh_keys()
+                added_count = len(new_pairs)
+                self.commit_edit(f"添加 {added_count} 个键", [(self.current_table, k, v) for k, v in new_pairs.items()])
                 
                 msg = f"成功添加 {added_count} 个键值对"
                 if duplicate_keys:
@@ -1458,7 +1836,6 @@ class GXTEditorApp(QMainWindow):
                         
                 QMessageBox.information(self, "添加完成", msg)
                 self.update_status(f"批量添加了 {added_count} 个键值对")
-                self.set_modified(True)
             else:  # 单个添加模式
                 new_key, new_val = result
                 if not new_key:
@@ -1467,10 +1844,8 @@ class GXTEditorApp(QMainWindow):
                 if new_key in self.data[self.current_table]:
                     QMessageBox.critical(self, "错误", f"键名 '{new_key}' 已存在！")
                     return
-                self.data[self.current_table][new_key] = new_val
-                self.refresh_keys()
+                self.commit_edit(f"添加 {new_key}", [(self.current_table, new_key, new_val)])
                 self.update_status(f"已添加键: {new_key}")
-                self.set_modified(True)
 
     def delete_key(self):
         if not self.current_table: return
@@ -1481,23 +1856,20 @@ class GXTEditorApp(QMainWindow):
         msg_box.button(QMessageBox.StandardButton.Yes).setText("是")
         msg_box.button(QMessageBox.StandardButton.No).setText("否")
         if msg_box.exec() == QMessageBox.StandardButton.Yes:
-            keys = [self.table.item(idx.row(), 1).text() for idx in rows]
-            for k in keys: self.data[self.current_table].pop(k, None)
-            self.refresh_keys()
+            keys = [self.key_model.key_at(idx.row()) for idx in rows]
+            self.commit_edit(f"删除 {len(keys)} 个键", [(self.current_table, k, None) for k in keys])
             self.update_status(f"已删除 {len(keys)} 个键值对")
-            self.set_modified(True)
 
     def clear_current_table(self):
         if not self.current_table: return
-        msg_box = QMessageBox(QMessageBox.Icon.Question, "确认", f"是否清空表 '{self.current_table}' 中的所有键值对？\n此操作不可恢复！", 
+        msg_box = QMessageBox(QMessageBox.Icon.Question, "确认", f"是否清空表 '{self.current_table}' 中的所有键值对？", 
                              QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, self)
         msg_box.button(QMessageBox.StandardButton.Yes).setText("是")
         msg_box.button(QMessageBox.StandardButton.No).setText("否")
         if msg_box.exec() == QMessageBox.StandardButton.Yes:
-            self.data[self.current_table].clear()
-            self.refresh_keys()
-            self.update_status(f"已清空表 {self.current_table}")
-            self.set_modified(True)
+            t = self.current_table
+            self.commit_edit(f"清空表 {t}", [(t, k, None) for k in self.data[t]])
+            self.update_status(f"已清空表 {t}")
 
     def copy_selected(self):
         if not self.current_table: return
@@ -1505,7 +1877,7 @@ class GXTEditorApp(QMainWindow):
         if not rows: return
         pairs = []
         for idx in rows:
-            k = self.table.item(idx.row(), 1).text()
+            k = self.key_model.key_at(idx.row())
             v = self.data[self.current_table].get(k, "")
             pairs.append(f"{k}={v}")
         if pairs:
@@ -1515,6 +1887,7 @@ class GXTEditorApp(QMainWindow):
     def new_gxt(self):
         dlg = VersionDialog(self, default="IV")
         if dlg.exec() != QDialog.DialogCode.Accepted: return
+        self.cancel_loading()
         self.data.clear()
         self.version = dlg.get_value()
         self.filepath = None
@@ -1524,12 +1897,14 @@ class GXTEditorApp(QMainWindow):
         self.table_search.clear()
         self.filter_tables()
         if self.table_list.count() > 0: self.table_list.setCurrentRow(0)
+        self.reset_document_state()
         self.update_status(f"已创建新GXT文件 (版本: {self.version})")
         self._update_ui_for_file_type()
         self.set_modified(False)  # 重置修改状态
 
     def new_whm(self):
         """新建WHM文件"""
+        self.cancel_loading()
         self.data.clear()
         self.version = "IV"  # WHM文件使用GTA IV的哈希算法
         self.filepath = None
@@ -1539,6 +1914,7 @@ class GXTEditorApp(QMainWindow):
         self.table_search.clear()
         self.filter_tables()
         if self.table_list.count() > 0: self.table_list.setCurrentRow(0)
+        self.reset_document_state()
         self.update_status("已创建新WHM文件")
         self._update_ui_for_file_type()
         self.set_modified(False)  # 重置修改状态
@@ -1548,62 +1924,10 @@ class GXTEditorApp(QMainWindow):
         self.open_file(path)
 
     def open_gxt(self, path=None):
-        try:
-            with open(path, "rb") as f:
-                version = getVersion(f)
-                reader = getReader(version)
-                f.seek(0)
-                self.data.clear()
-                if reader.hasTables():
-                    for name, offset in reader.parseTables(f):
-                        f.seek(offset)
-                        self.data[name] = dict(reader.parseTKeyTDat(f))
-                else:
-                    self.data["MAIN"] = dict(reader.parseTKeyTDat(f))
-                self.version = version
-                self.filepath = path
-                self.file_type = 'gxt'
-                self.table_search.clear()
-                self.filter_tables()
-                if self.table_list.count() > 0: self.table_list.setCurrentRow(0)
-                self.update_status(f"已打开GXT文件: {os.path.basename(path)}, 版本: {version}")
-                
-                # 更新: 改善成功弹窗信息
-                version_map = {'IV': 'GTA4', 'VC': 'Vice City', 'SA': 'San Andreas', 'III': 'GTA3'}
-                display_version = version_map.get(version, version)
-                total_keys = sum(len(table) for table in self.data.values())
-                
-                QMessageBox.information(self, "成功", f"已成功打开GXT文件\n版本: {display_version}\n表数量: {len(self.data)}\n键值对总数: {total_keys}")
-                self._update_ui_for_file_type()
-                self.set_modified(False)  # 重置修改状态
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"打开文件失败: {str(e)}")
+        self.start_loading(KIND_GXT, [path])
 
     def open_dat(self, path=None):
-        try:
-            items = parse_whm_table(Path(path))
-            self.data.clear()
-            
-            # DAT文件没有表，我们创建一个默认表
-            table_name = "whm_table"
-            self.data[table_name] = {}
-            for item in items:
-                # 将哈希值转换为十六进制字符串作为键
-                key = f'0x{item["hash"]:08X}'
-                self.data[table_name][key] = item["text"]
-                
-            self.version = "IV"  # DAT文件与GTA4哈希兼容
-            self.filepath = path
-            self.file_type = 'dat'
-            self.table_search.clear()
-            self.filter_tables()
-            if self.table_list.count() > 0: self.table_list.setCurrentRow(0)
-            self.update_status(f"已打开DAT文件: {os.path.basename(path)}")
-            QMessageBox.information(self, "成功", f"已成功打开DAT文件\n条目数量: {len(self.data[table_name])}")
-            self._update_ui_for_file_type()
-            self.set_modified(False)  # 重置修改状态
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"打开文件失败: {str(e)}")
+        self.start_loading(KIND_DAT, [path])
 
     def open_txt(self, files=None):
         dlg = VersionDialog(self, default="IV")
@@ -1612,31 +1936,119 @@ class GXTEditorApp(QMainWindow):
         if not files:
             files, _ = QFileDialog.getOpenFileNames(self, "打开TXT文件", "", "文本文件 (*.txt);;所有文件 (*.*)")
         if not files: return
-        try:
-            self.data.clear()
-            if version == 'IV':
-                merged_data = {}
-                for file_path in files:
-                    txt_data, _ = load_iv_txt(Path(file_path))
-                    for table_name, entries in txt_data.items():
-                        if table_name not in merged_data: merged_data[table_name] = {}
-                        for entry in entries: merged_data[table_name][entry['hash_string']] = entry['translated']
-                self.data = merged_data
-            else:
-                reader = getReader(version)
-                self.data = self._load_standard_txt(files, has_tables=reader.hasTables())
-            self.version = version
-            self.filepath = None
-            self.file_type = 'gxt'
-            self.table_search.clear()
-            self.filter_tables()
-            if self.table_list.count() > 0: self.table_list.setCurrentRow(0)
-            self.update_status(f"已打开 {len(files)} 个TXT文件 (版本: {version})")
-            QMessageBox.information(self, "成功", f"已成功打开{len(files)}个TXT文件\n版本: {version}\n表数量: {len(self.data)}")
+        # 多文件解析（文件较大且有多个 CPU 时并行），按文件顺序合并（后面的文件覆盖前面的同名键）
+        self.start_loading(KIND_TXT, files, version)
+
+    # ====== 后台打开文件 ======
+    def start_loading(self, kind, paths, version=None):
+        """在后台读取文件。读到第一个表后即可浏览（只读），全部读完才换入新文档；取消或失败时恢复原来的文档"""
+        self.cancel_loading()
+        self.loading = {
+            'kind': kind, 'paths': paths, 'version': version, 'data': {},
+            'previous': (self.data, self.version, self.filepath, self.file_type, self.current_table),
+        }
+        self._set_loading_ui(True)
+        self.update_status(f"正在打开 {os.path.basename(paths[0])} ...")
+        self.loader.load(kind, paths, version)
+
+    def cancel_loading(self):
+        if not self.loading:
+            return
+        self.loader.cancel()
+        self._restore_previous_document()
+        self.update_status("已取消打开文件")
+
+    def _set_loading_ui(self, loading):
+        for action in self.document_actions:
+            action.setEnabled(not loading)
+        for button in (self.btn_add_table, self.btn_del_table, self.btn_export_table, self.btn_add_key, self.btn_clear_table):
+            button.setEnabled(not loading)
+        self.load_progress.setVisible(loading)
+        self.load_cancel.setVisible(loading)
+        self.load_progress.setRange(0, 0)  # 总数未知前显示忙碌状态
+        if not loading:
             self._update_ui_for_file_type()
-            self.set_modified(False)  # 重置修改状态
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"打开文件失败: {str(e)}")
+        self._update_undo_actions()
+
+    def _on_load_begun(self, version, total):
+        self.loading['version'] = version
+        self.load_progress.setRange(0, total)
+        self.load_progress.setValue(0)
+
+    def _on_load_progress(self, done, total, label):
+        self.load_progress.setValue(done)
+        self.update_status(f"正在打开 {os.path.basename(self.loading['paths'][0])}: {label} ({done}/{total})")
+
+    def _on_table_loaded(self, name, entries):
+        data = self.loading['data']
+        data[name] = entries
+        if len(data) == 1:
+            # 第一个表：先换上正在读取的文档，可以浏览但不能编辑
+            self._show_document(data, self.loading['version'], None, 'dat' if self.loading['kind'] == KIND_DAT else 'gxt')
+        elif self.table_search.text().lower() in name.lower():
+            # 按表名顺序插入，不重建列表，不影响当前选中的表
+            names = [self.table_list.item(i).text() for i in range(self.table_list.count())]
+            self.table_list.insertItem(bisect.bisect(names, name), name)
+
+    def _show_document(self, data, version, filepath, file_type, current_table=None):
+        self.data = data
+        self.version = version
+        self.filepath = filepath
+        self.file_type = file_type
+        self.current_table = None
+        self.hit_model.set_hits(self.data, [])
+        self.table_search.clear()
+        self.filter_tables()
+        if current_table in self.data:
+            self._select_table_by_name(current_table)
+        elif self.table_list.count() > 0:
+            self.table_list.setCurrentRow(0)
+        else:
+            self.refresh_keys()
+
+    def _restore_previous_document(self):
+        loading, self.loading = self.loading, None
+        data, version, filepath, file_type, current_table = loading['previous']
+        if self.data is not data:
+            self._show_document(data, version, filepath, file_type, current_table)
+        self._set_loading_ui(False)
+
+    def _on_load_finished(self, info):
+        loading, self.loading = self.loading, None
+        kind, paths, version = loading['kind'], loading['paths'], loading['version']
+        if self.data is not loading['data']:
+            # 文件中没有任何表
+            self._show_document(loading['data'], version, None, 'gxt')
+        self.filepath = None if kind == KIND_TXT else paths[0]
+        self._set_loading_ui(False)
+        self.reset_document_state(info['chars'])
+        self.set_modified(False)  # 重置修改状态
+        if kind == KIND_GXT:
+            self.update_status(f"已打开GXT文件: {os.path.basename(paths[0])}, 版本: {version}")
+            # 更新: 改善成功弹窗信息
+            version_map = {'IV': 'GTA4', 'VC': 'Vice City', 'SA': 'San Andreas', 'III': 'GTA3'}
+            display_version = version_map.get(version, version)
+            total_keys = sum(len(table) for table in self.data.values())
+            QMessageBox.information(self, "成功", f"已成功打开GXT文件\n版本: {display_version}\n表数量: {len(self.data)}\n键值对总数: {total_keys}")
+        elif kind == KIND_DAT:
+            self.update_status(f"已打开DAT文件: {os.path.basename(paths[0])}")
+            QMessageBox.information(self, "成功", f"已成功打开DAT文件\n条目数量: {len(self.data['whm_table'])}")
+        else:
+            conflicts = info['conflicts']
+            self.update_status(f"已打开 {len(paths)} 个TXT文件 (版本: {version})")
+            msg = f"已成功打开{len(paths)}个TXT文件\n版本: {version}\n表数量: {len(self.data)}"
+            if conflicts:
+                msg += f"\n\n有 {len(conflicts)} 个键在多个文件中重复定义（以后加载的文件为准）:"
+                for table_name, key, first, second in conflicts[:5]:
+                    msg += f"\n[{table_name}] {key}: {os.path.basename(first)} → {os.path.basename(second)}"
+                if len(conflicts) > 5:
+                    msg += f"\n... (共 {len(conflicts)} 个)"
+            QMessageBox.information(self, "成功", msg)
+
+    def _on_load_failed(self, message):
+        self._restore_previous_document()
+        self.update_status("打开文件失败")
+        QMessageBox.critical(self, "错误", f"打开文件失败: {message}")
 
     def _update_ui_for_file_type(self):
         is_dat = self.file_type == 'dat'
@@ -1686,6 +2098,7 @@ class GXTEditorApp(QMainWindow):
         # 如果是DAT文件，使用专用逻辑保存
         if self.file_type == 'dat':
             try:
+                from whm_table import dump_whm_table
                 table_content = self.data.get("whm_table", {})
                 items_to_dump = []
                 for key, text in table_content.items():
@@ -1726,36 +2139,40 @@ class GXTEditorApp(QMainWindow):
             if dir_name:
                 os.chdir(dir_name)
             if self.version == 'IV':
+                from IVGXT import generate_binary as write_iv, process_special_chars, gta4_gxt_hash
                 m_Data = {}
-                all_chars = set()
                 for table_name, entries_dict in self.data.items():
                     m_Data[table_name] = []
                     for key_str, translated_text in entries_dict.items():
                         hash_str = f'0x{gta4_gxt_hash(key_str):08X}' if not key_str.lower().startswith('0x') else key_str
                         m_Data[table_name].append({'hash_string': hash_str, 'original': '', 'translated': translated_text})
-                        if gen_extra: all_chars.update(c for c in translated_text if ord(c) > 255)
+                all_chars = {c for c in self.char_counts.chars() if ord(c) > 255}
                 write_iv(m_Data, Path(os.path.basename(path)))
                 if gen_extra: process_special_chars(all_chars)
             else:
-                all_chars = {char for table in self.data.values() for value in table.values() for char in value}
+                from char_order import ordered_chars, ordered_codes
+                all_chars = self.char_counts.chars()
                 if self.version == 'VC':
+                    from VCGXT import VCGXT
                     g = VCGXT()
                     g.m_GxtData = {t: {k: g._utf8_to_utf16(v) for k, v in d.items()} for t, d in self.data.items()}
-                    if gen_extra: g.m_WideCharCollection = {ord(c) for c in all_chars if ord(c) > 0x7F}; g.GenerateWMHHZStuff()
+                    if gen_extra: g.m_WideCharCollection = {ord(c) for c in all_chars if ord(c) > 0x7F}; g.GenerateWMHHZStuff(ordered_codes('.', 'VC', g.m_WideCharCollection))
                     else:
                         if hasattr(g, 'm_WideCharCollection'): g.m_WideCharCollection.clear()
                     g.SaveAsGXT(os.path.basename(path))
                 elif self.version == 'SA':
+                    from SAGXT import SAGXT
                     g = SAGXT()
                     g.m_GxtData = {t: {int(k, 16): v for k, v in d.items()} for t, d in self.data.items()}
-                    if gen_extra: g.m_WideCharCollection = {c for c in all_chars if ord(c) > 0x7F}; g.generate_wmhhz_stuff()
+                    if gen_extra: g.m_WideCharCollection = {c for c in all_chars if ord(c) > 0x7F}; g.generate_wmhhz_stuff(ordered_chars('.', 'SA', g.m_WideCharCollection))
                     else:
                         if hasattr(g, 'm_WideCharCollection'): g.m_WideCharCollection.clear()
                     g.save_as_gxt(os.path.basename(path))
                 elif self.version == 'III':
+                    from LCGXT import LCGXT
                     g = LCGXT()
                     g.m_GxtData = {k: g.utf8_to_utf16(v) for k, v in self.data.get('MAIN', {}).items()}
-                    if gen_extra: g.m_WideCharCollection = {ord(c) for c in all_chars if ord(c) >= 0x80}; g.generate_wmhhz_stuff()
+                    if gen_extra: g.m_WideCharCollection = {ord(c) for c in all_chars if ord(c) >= 0x80}; g.generate_wmhhz_stuff(ordered_codes('.', 'III', g.m_WideCharCollection))
                     else:
                         if hasattr(g, 'm_WideCharCollection'): g.m_WideCharCollection.clear()
                     g.save_as_gxt(os.path.basename(path))
@@ -1775,11 +2192,8 @@ class GXTEditorApp(QMainWindow):
                 default_filename = self.version_filename_map.get(self.version, "merged.txt")
                 filepath, _ = QFileDialog.getSaveFileName(self, "导出为单个TXT文件", default_filename, "文本文件 (*.txt)")
                 if not filepath: return
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    for i, (t, d) in enumerate(sorted(self.data.items())):
-                        if i > 0: f.write("\n\n")
-                        if self.version != 'III': f.write(f"[{t}]\n")
-                        for k, v in sorted(d.items()): f.write(f"{k}={v}\n")
+                from txt_loader import dump_txt
+                dump_txt(filepath, self.data, self.version)
                 QMessageBox.information(self, "导出成功", f"已导出到: {filepath}")
             else:
                 if self.version == 'III' or self.file_type == 'dat':
@@ -1804,6 +2218,7 @@ class GXTEditorApp(QMainWindow):
                     msg_box.button(QMessageBox.StandardButton.Yes).setText("是")
                     msg_box.button(QMessageBox.StandardButton.No).setText("否")
                     if msg_box.exec() != QMessageBox.StandardButton.Yes: return
+                    import shutil
                     shutil.rmtree(export_dir)
                 os.makedirs(export_dir)
                 for t, d in sorted(self.data.items()):
@@ -1814,42 +2229,10 @@ class GXTEditorApp(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "错误", f"导出失败: {str(e)}")
 
-    def _load_standard_txt(self, files, has_tables):
-        data = {}
-        current_table = "MAIN" if not has_tables else None
-        if not has_tables: data["MAIN"] = {}
-        for file_path in files:
-            with open(file_path, 'r', encoding='utf-8-sig') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line: continue
-                    if has_tables and line.startswith('[') and line.endswith(']'):
-                        current_table = line[1:-1].strip()
-                        if current_table and current_table not in data: data[current_table] = {}
-                    elif '=' in line and current_table is not None:
-                        key, value = line.split('=', 1)
-                        if key.strip(): data[current_table][key.strip()] = value.strip()
-        return data
-
     # ====== 辅助与工具 ======
     def collect_and_filter_chars(self):
-        """根据指定逻辑收集和筛选GXT中的特殊字符"""
-        if not self.data:
-            return ""
-        
-        all_chars = {char for table in self.data.values() for value in table.values() for char in value}
-        
-        special_chars = set()
-        for char in all_chars:
-            if ord(char) > 255:
-                special_chars.add(char)
-        
-        # 排除特定字符
-        special_chars.discard(chr(0x2122))  # trademark
-        special_chars.discard(chr(0x3000))  # ideographic space
-        special_chars.discard(chr(0xFEFF))  # byte order mark
-        
-        return "".join(sorted(list(special_chars), key=lambda c: ord(c)))
+        """GXT中的特殊字符（码点 > 255，排除 ™、全角空格与 BOM），由字符统计直接得出"""
+        return self.char_counts.font_chars()
         
     def open_font_generator(self):
         initial_chars = self.collect_and_filter_chars()
@@ -1871,16 +2254,25 @@ class GXTEditorApp(QMainWindow):
             self.update_status("正在生成字体贴图，请稍候...")
             QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
 
-            generator = FontTextureGenerator()
+            generator = FontTextureGenerator(glyph_cache=self.glyph_cache)
             version = settings["version"]
 
             # 生成 Font
             path_font = os.path.join(output_dir, 'font.png')
-            generator.generate_and_save(settings["characters"], path_font, version, settings["resolution"], settings["font_normal"])
+            # 字符映射文件写在贴图旁，贴图的第 i 格即字符映射的第 i 个位置
+            from gxt_build import charmap_chars, write_charmaps
+            from char_order import texture_layout
+            chars = texture_layout(write_charmaps(version, charmap_chars(version, set(settings["characters"])), output_dir))
+            save = generator.update_and_save if settings.get("incremental") else generator.generate_and_save
+            pages = save(chars, path_font, version, settings["resolution"], settings["font_normal"])
+            # 贴图中现在正好是这些字符，文档中其余的字体字符都算缺少
+            self.texture_chars = {c for c in chars if c}
+            self._update_missing_glyphs(self.char_counts.font_chars())
             # 生成 HTML
             html_path = os.path.join(output_dir, 'font_preview.html')
-            generator.generate_html_preview(settings, path_font, html_path)
-            QMessageBox.information(self, "生成成功", f"已成功生成文件:\n- {path_font}\n- {html_path}")
+            generator.generate_html_preview(dict(settings, characters=chars), path_font, html_path)
+            files = "\n".join(f"- {path}" for path in pages + [html_path])
+            QMessageBox.information(self, "生成成功", f"已成功生成文件:\n{files}\n字符映射文件已写入同一目录。")
             
             self.update_status(f"成功生成字体贴图到: {output_dir}")
         except Exception as e:
@@ -1911,7 +2303,16 @@ class GXTEditorApp(QMainWindow):
             "9. TXT 导入：支持单个或多个TXT导入并直接生成GXT。\n"
             "10. GTA IV 特别说明：键名可为明文（如 T1_NAME_82）或哈希（0xhash），保存时自动转换哈希。\n"
             "11. WHM Table 支持：可以打开和保存以及编辑 GTA4 民间汉化补丁的 whm_table.dat 文件。\n"
-            "12. 字体生成器：工具菜单→GTA字体贴图生成器，用于创建游戏字体PNG文件。支持为VC/III分别设置字体，加载外部字体文件，点击预览图可放大查看。【仅限：汉化字体贴图】")
+            "12. 字体生成器：工具菜单→GTA字体贴图生成器，用于创建游戏字体PNG文件。支持为VC/III分别设置字体，加载外部字体文件，点击预览图可放大查看。【仅限：汉化字体贴图】\n"
+            "13. 全局搜索：工具菜单→全局搜索 (Ctrl+Shift+F)，在所有表中按文本、键名前缀或正则表达式查找，双击结果跳转到对应条目。\n"
+            "14. 查找替换：编辑菜单→查找替换 (Ctrl+H)，支持正则表达式，替换前可预览所有将被修改的条目。\n"
+            "15. 撤销/重做：编辑菜单 (Ctrl+Z / Ctrl+Y)，编辑、删除、清空、查找替换和表的增删改名都可以撤销。\n"
+            "16. 打开大文件时在后台读取，状态栏显示进度，可随时取消；读到第一个表后即可浏览，读取完成后才能编辑。\n"
+            "17. 字符统计：编辑时实时统计文档中的字符，新增的字符不在字体贴图中时，状态栏右侧会提示（鼠标悬停可查看这些字符）。\n"
+            "18. 字体贴图：每个字符绘制后按字体、字号、版本缓存（内存和磁盘），再次预览或生成时只绘制新加入的字符。\n"
+            "19. 字符较多、一页贴图放不下时自动生成多页（font.png、font_1.png……），每页的容量由版本的格子高度决定。\n"
+            "20. 生成贴图时在同一目录写入字符映射文件，贴图的格子与其中的行列一一对应；勾选增量更新后与上次的清单（font.json）逐格比较，只重画字符有变化的几行。\n"
+            "21. 字符映射辅助文件（VC / SA / III）的行列记录在同目录的 char_order.json 中，再次生成时原有字符位置不变，新字符接在最后；删除该文件即按码位重新排列。")
 
     def set_file_association(self):
         if sys.platform != 'win32':
@@ -1948,6 +2349,7 @@ class GXTEditorApp(QMainWindow):
 
     def closeEvent(self, event):
         """重写关闭事件，检查是否有未保存的修改"""
+        self.cancel_loading()  # 先恢复原来的文档，保存的不能是读了一半的文件
         if self.modified:
             msg_box = QMessageBox(QMessageBox.Icon.Question, "确认", "检测文件在编辑中有变动，是否保存更改？",
                                  QMessageBox.StandardButton.Save | 
@@ -1973,6 +2375,8 @@ class GXTEditorApp(QMainWindow):
 # ========== 入口 ==========
 if __name__ == "__main__":
     import sys
+    import multiprocessing
+    multiprocessing.freeze_support()  # 打包后 TXT 并行导入的进程池需要
     QApplication.setHighDpiScaleFactorRoundingPolicy(Qt.HighDpiScaleFactorRoundingPolicy.PassThrough)
     app = QApplication(sys.argv)
 
@@ -0,0 +1,111 @@
+import threading
+
+from PySide6.QtCore import QObject, Signal
+
+# =======================
+# 表内搜索：每个表一份小写索引（编辑时增量更新），大表在后台线程中搜索；
+# 新的查询会取消尚未完成的旧查询
+# =======================
+
+
+def _fold(key, value):
+    # 与原来的 keyword in k.lower() or keyword in v.lower() 等价：\x00 不会出现在关键字中
+    return f"{key.lower()}\x00{value.lower()}"
+
+
+class SearchIndex:
+    """键 -> "小写键\\x00小写值"。"""
+
+    CHUNK = 8192  # 每处理这么多键检查一次查询是否已过时
+
+    def __init__(self, items):
+        self.lower = {k: _fold(k, v) for k, v in items}
+
+    def set(self, key, value):
+        self.lower[key] = _fold(key, value)
+
+    def remove(self, key):
+        self.lower.pop(key, None)
+
+    def clear(self):
+        self.lower.clear()
+
+    def search(self, keys, keyword, is_stale=None):
+        """按 keys 的顺序返回匹配的键；is_stale() 为真时放弃并返回 None"""
+        get = self.lower.get
+        result = []
+        for start in range(0, len(keys), self.CHUNK):
+            if is_stale is not None and is_stale():
+                return None
+            result.extend(k for k in keys[start:start + self.CHUNK] if keyword in get(k, ""))
+        return result
+
+
+class SearchWorker(QObject):
+    """后台搜索线程：始终只处理最新提交的查询"""
+    finished = Signal(object, str, object, int)  # 表, 关键字, 匹配的键, 提交时的编辑版本
+    index_built = Signal(object, object, int)    # 表, 索引, 构建时的编辑版本
+    # 跨线程只发送不带参数的信号，结果放在 _done 中，由主线程取出后再发出上面两个信号
+    _ready = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._job = None
+        self._done = []
+        self._generation = 0
+        self._thread = None
+        self._ready.connect(self._deliver)
+
+    def cancel(self):
+        """取消正在进行和等待中的查询"""
+        with self._lock:
+            self._generation += 1
+            self._job = None
+
+    def submit(self, table, keyword, keys, index, items, version):
+        """提交查询。keys 与 items 须为快照（主线程之后的编辑不影响它们）；index 为 None 时由 items 先建立索引"""
+        with self._lock:
+            self._generation += 1
+            self._job = (self._generation, table, keyword, keys, index, items, version)
+        self._wake.set()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="gxt-search", daemon=True)
+            self._thread.start()
+
+    def _post(self, signal, *args):
+        with self._lock:
+            self._done.append((signal, args))
+        self._ready.emit()
+
+    def _deliver(self):
+        with self._lock:
+            done, self._done = self._done, []
+        for signal, args in done:
+            signal.emit(*args)
+
+    def _run(self):
+        built = None  # 最近建立的 (表, 索引, 编辑版本)，主线程尚未收下时可直接复用
+        while True:
+            self._wake.wait()
+            with self._lock:
+                job, self._job = self._job, None
+                self._wake.clear()
+            if job is None:
+                continue
+            generation, table, keyword, keys, index, items, version = job
+
+            def is_stale():
+                return self._generation != generation
+
+            if index is None:
+                if built and built[0] is table and built[2] == version:
+                    index = built[1]
+                else:
+                    index = SearchIndex(items)
+                    built = (table, index, version)
+                    self._post(self.index_built, table, index, version)
+            result = index.search(keys, keyword, is_stale)
+            if result is not None and not is_stale():
+                self._post(self.finished, table, keyword, result, version)
@@ -0,0 +1,320 @@
+from bisect import bisect_left
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal
+
+from search_index import SearchIndex
+
+# =======================
+# 键值表格模型：按需提供行数据，不为每一行创建控件
+# 行顺序为按键排序（与原 sorted(items()) 一致），值的截断在 data() 中按需计算；
+# 编辑只发出对应行的信号，不重建整个表格，并同步更新该表的搜索索引
+# =======================
+
+
+def _truncate(value, limit):
+    return value if len(value) <= limit else value[:limit] + "..."
+
+
+class KeyValueTableModel(QAbstractTableModel):
+    HEADERS = ["序号", "键名 (Key)", "值 (Value)"]
+    keys_edited = Signal(object, object)  # 表, 被添加/修改/删除的键（编辑完成后发出，用于更新全局索引）
+    CACHE_SIZE = 8      # 缓存最近几个表的已排序键
+    RESET_THRESHOLD = 200  # 批量修改超过此数量时直接重置模型
+
+    def __init__(self, display_limit=60, parent=None):
+        super().__init__(parent)
+        self.display_limit = display_limit
+        self._table = None   # 当前表 {键: 值}（即编辑器数据中的字典，模型直接修改它）
+        self._all_keys = []  # 当前表全部键，已排序
+        self._keys = []      # 显示的键（过滤时为 _all_keys 的有序子集，否则就是 _all_keys）
+        self._cache = {}     # id(表) -> (表, 已排序键)
+        self._indexes = {}   # id(表) -> (表, SearchIndex)
+        self.edit_version = 0  # 每次编辑加一，用于丢弃基于旧数据建立的索引
+
+    # ---------- Qt 接口 ----------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._keys)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 3
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == 0:
+                return str(row + 1)
+            key = self._keys[row]
+            if col == 1:
+                return key
+            return _truncate(self._table.get(key, ""), self.display_limit)
+        if role == Qt.ItemDataRole.TextAlignmentRole and col == 0:
+            return Qt.AlignmentFlag.AlignCenter
+        if role == Qt.ItemDataRole.UserRole and col == 2:
+            return self._table.get(self._keys[row], "")
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    # ---------- 切换表 / 过滤 ----------
+    def sorted_keys(self, table):
+        """表的全部键（已排序，带缓存）"""
+        entry = self._cache.get(id(table))
+        # 键只通过本模型增删；长度不符说明表在外部被修改过
+        if entry and entry[0] is table and len(entry[1]) == len(table):
+            return entry[1]
+        keys = sorted(table)
+        self._remember(self._cache, table, keys)
+        return keys
+
+    def _remember(self, cache, table, value):
+        cache.pop(id(table), None)
+        if len(cache) >= self.CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+        cache[id(table)] = (table, value)
+
+    def set_table(self, table, keys=None):
+        """显示 table（None 为清空）；keys 为要显示的已排序键子集，None 表示全部"""
+        self.beginResetModel()
+        self._table = table
+        self._all_keys = self.sorted_keys(table) if table is not None else []
+        self._keys = self._all_keys if keys is None else keys
+        self.endResetModel()
+
+    def is_filtered(self):
+        return self._keys is not self._all_keys
+
+    def key_at(self, row):
+        return self._keys[row]
+
+    def row_of(self, key):
+        row = bisect_left(self._keys, key)
+        return row if row < len(self._keys) and self._keys[row] == key else -1
+
+    # ---------- 搜索索引 ----------
+    def search_index(self, table):
+        """表的搜索索引，尚未建立或已失效时返回 None"""
+        entry = self._indexes.get(id(table))
+        if entry and entry[0] is table and len(entry[1].lower) == len(table):
+            return entry[1]
+        return None
+
+    def build_search_index(self, table):
+        index = SearchIndex(table.items())
+        self._remember(self._indexes, table, index)
+        return index
+
+    def store_search_index(self, table, index, version):
+        """保存后台线程建立的索引；建立期间有过编辑则丢弃"""
+        if version == self.edit_version:
+            self._remember(self._indexes, table, index)
+
+    def _begin_edit(self):
+        """记录一次编辑，返回当前表已建立的搜索索引（没有则为 None）"""
+        self.edit_version += 1
+        entry = self._indexes.get(id(self._table))
+        return entry[1] if entry and entry[0] is self._table else None
+
+    # ---------- 编辑（同时修改表数据） ----------
+    def _renumber(self, first):
+        """插入/删除后，first 之后各行的序号列变化"""
+        if first < len(self._keys):
+            self.dataChanged.emit(self.index(first, 0), self.index(len(self._keys) - 1, 0))
+
+    def set_value(self, key, value):
+        """修改已有键的值，或添加新键"""
+        if key not in self._table:
+            self.add_key(key, value)
+            return
+        self._table[key] = value
+        index = self._begin_edit()
+        if index is not None:
+            index.set(key, value)
+        row = self.row_of(key)
+        if row >= 0:
+            self.dataChanged.emit(self.index(row, 2), self.index(row, 2))
+        self.keys_edited.emit(self._table, [key])
+
+    def add_key(self, key, value):
+        self._table[key] = value
+        index = self._begin_edit()
+        if index is not None:
+            index.set(key, value)
+        if self.is_filtered():
+            pos = bisect_left(self._all_keys, key)
+            self._all_keys.insert(pos, key)
+        # 过滤时新键也插入显示，便于看到刚添加的内容
+        row = bisect_left(self._keys, key)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._keys.insert(row, key)
+        self.endInsertRows()
+        self._renumber(row + 1)
+        self.keys_edited.emit(self._table, [key])
+
+    def remove_keys(self, keys):
+        keys = set(keys) & self._table.keys()
+        if not keys:
+            return
+        rows = sorted((r for r in map(self.row_of, keys) if r >= 0), reverse=True)
+        # 连续的行合并为一段，从后往前删
+        runs = []
+        for r in rows:
+            if runs and runs[-1][0] == r + 1:
+                runs[-1][0] = r
+            else:
+                runs.append([r, r])
+        index = self._begin_edit()
+        for k in keys:
+            del self._table[k]
+            if index is not None:
+                index.remove(k)
+        if len(runs) > self.RESET_THRESHOLD:
+            # 零散的大量删除：直接重建键数组并重置模型
+            self.beginResetModel()
+            self._all_keys[:] = [k for k in self._all_keys if k not in keys]
+            if self.is_filtered():
+                self._keys[:] = [k for k in self._keys if k not in keys]
+            self.endResetModel()
+            self.keys_edited.emit(self._table, keys)
+            return
+        for first, last in runs:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._keys[first:last + 1]
+            self.endRemoveRows()
+        if self.is_filtered():
+            self._all_keys[:] = [k for k in self._all_keys if k not in keys]
+        if rows:
+            self._renumber(rows[-1])
+        self.keys_edited.emit(self._table, keys)
+
+    def apply_changes(self, table, changes):
+        """把 [(键, 新值)] 写入任意一个表（新值为 None 表示删除该键，每个键最多出现一次）。
+        所有编辑、撤销与重做都经过这里；当前表的少量修改发出逐行信号，其余情况一次性处理"""
+        if not changes:
+            return
+        current = table is self._table
+        if current and len(changes) < self.RESET_THRESHOLD:
+            self.remove_keys([k for k, v in changes if v is None])
+            for key, value in changes:
+                if value is not None:
+                    self.set_value(key, value)
+            return
+        added = {k for k, v in changes if v is not None and k not in table}
+        removed = {k for k, v in changes if v is None and k in table}
+        self.edit_version += 1
+        entry = self._indexes.get(id(table))
+        index = entry[1] if entry and entry[0] is table else None
+        if current and (added or removed):
+            self.beginResetModel()
+        for key, value in changes:
+            if value is None:
+                table.pop(key, None)
+                if index is not None:
+                    index.remove(key)
+            else:
+                table[key] = value
+                if index is not None:
+                    index.set(key, value)
+        if added or removed:
+            self._cache.pop(id(table), None)  # 键集合变了，已排序的键需要重新计算
+            if current:
+                filtered = self.is_filtered()
+                self._all_keys = self.sorted_keys(table)
+                # 过滤时保留仍存在的键，新添加的键也显示出来（与 add_key 一致）
+                self._keys = sorted({k for k in self._keys if k in table} | added) if filtered else self._all_keys
+                self.endResetModel()
+        elif current and self._keys:
+            # 只有值变化：刷新值列即可，选中和滚动位置不变
+            self.dataChanged.emit(self.index(0, 2), self.index(len(self._keys) - 1, 2))
+        self.keys_edited.emit(table, [k for k, _ in changes])
+
+
+
+# =======================
+# 全局搜索结果：(表名, 键) 列表，值按需从文档数据中读取
+# =======================
+
+
+class HitListModel(QAbstractTableModel):
+    HEADERS = ["表", "键名 (Key)", "值 (Value)"]
+
+    def __init__(self, display_limit=60, parent=None):
+        super().__init__(parent)
+        self.display_limit = display_limit
+        self._data = {}
+        self._hits = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._hits)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 3
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        name, key = self._hits[index.row()]
+        col = index.column()
+        if col == 0:
+            return name
+        if col == 1:
+            return key
+        # 结果显示之后条目可能已被删除
+        return _truncate(self._data.get(name, {}).get(key, ""), self.display_limit)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def set_hits(self, data, hits):
+        self.beginResetModel()
+        self._data = data
+        self._hits = hits
+        self.endResetModel()
+
+    def hit_at(self, row):
+        return self._hits[row]
+
+
+# =======================
+# 查找替换预览：[(表名, 键, 原值, 新值)]
+# =======================
+
+
+class ChangeListModel(QAbstractTableModel):
+    HEADERS = ["表", "键名 (Key)", "原文", "替换后"]
+
+    def __init__(self, display_limit=60, parent=None):
+        super().__init__(parent)
+        self.display_limit = display_limit
+        self._changes = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._changes)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 4
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        value = self._changes[index.row()][index.column()]
+        return value if index.column() < 2 else _truncate(value, self.display_limit)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def set_changes(self, changes):
+        self.beginResetModel()
+        self._changes = changes
+        self.endResetModel()
+
+    def change_at(self, row):
+        return self._changes[row]
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+pytest.importorskip('PySide6')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from PySide6.QtGui import QFont, QImage
+
+import gxteditor
+from char_order import load_order, texture_layout
+from font_texture import FontTextureGenerator, read_manifest, page_path
+
+# 第二次生成时去掉 β、加入 ж：β 的位置变为空位，ж 接在最后（IV 按码位排序，之后的字符整体移动）
+BEFORE = "[MAIN]\nA1=αβγδ中文字\nA2=ÉÀ\n"
+AFTER = "[MAIN]\nA1=αγδ中文字ж\nA2=ÉÀ\n"
+
+
+def charmap_entries(version, out_dir):
+    """读取字符映射文件，返回 {位置序号: 字符}"""
+    if version == 'VC':
+        table = np.fromfile(os.path.join(out_dir, 'wm_vcchs.dat'), dtype=np.uint8).reshape(-1, 2)
+        codes = np.flatnonzero((table != 63).any(axis=1))
+        return {int(table[c, 0]) * 64 + int(table[c, 1]): chr(c) for c in codes}
+    if version == 'SA':
+        entries = {}
+        with open(os.path.join(out_dir, 'TABLE.txt'), encoding='utf-8') as f:
+            for line in f:
+                code, row, col = line[len('m_Table['):].replace('] = {', ',').rstrip('};\n').split(',')
+                entries[int(row) * 64 + int(col)] = chr(int(code, 16))
+        return entries
+    codes = np.fromfile(os.path.join(out_dir, 'char_table.dat'), dtype='<u4')[1:]
+    return {i: chr(c) for i, c in enumerate(codes.tolist())}
+
+
+def render(src, out_dir, version, update):
+    argv = ['font', version, '-j', '1', str(src), '-d', str(out_dir), '--texture', '--resolution', '2048',
+            '--font-family', 'DejaVu Sans', '--font-size', '20']
+    assert gxteditor.main(argv + (['--update'] if update else [])) == 0
+
+
+def pixels(path):
+    image = QImage(path).convertToFormat(QImage.Format.Format_ARGB32)
+    return np.frombuffer(image.constBits(), dtype=np.uint8).reshape(image.height(), -1).copy()
+
+
+@pytest.mark.parametrize('version', ['VC', 'SA', 'IV'])
+def test_texture_cells_follow_charmap(tmp_path, version):
+    src = tmp_path / 'src.txt'
+    out_dir = tmp_path / 'out'
+    src.write_text(BEFORE, encoding='utf-8')
+    render(src, out_dir, version, update=False)
+    src.write_text(AFTER, encoding='utf-8')
+    render(src, out_dir, version, update=True)
+
+    path_font = str(out_dir / 'font.png')
+    cells = read_manifest(path_font)['chars']
+    entries = charmap_entries(version, out_dir)
+    assert {i: c for i, c in enumerate(cells) if c} == entries
+    assert 'β' not in cells and 'ж' in cells
+    if version != 'IV':
+        assert cells == texture_layout(load_order(str(out_dir), version))
+        assert cells.index('ж') == len(cells) - 1 and None in cells
+
+    # 增量更新的结果与按同一格子顺序整张重画的结果逐像素相同
+    full = str(tmp_path / 'full' / 'font.png')
+    os.makedirs(os.path.dirname(full))
+    font = QFont('DejaVu Sans', 20, QFont.Weight.Bold)
+    saved = FontTextureGenerator().generate_and_save(cells, full, version, 2048, font)
+    for page in range(len(saved)):
+        assert np.array_equal(pixels(page_path(path_font, page)), pixels(page_path(full, page)))
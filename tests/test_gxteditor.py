@@ -0,0 +1,78 @@
+import pytest
+
+import gxteditor
+
+# 各版本的 TXT 源文件，包含值首尾的空格（KZE39）、全角空格（U+3000）、空值等宽松解析器会改写的内容
+SOURCES = {
+    'VC': "[MAIN]\nKZE39= 前面有空格\nA1=中文 \nA2=\u3000全角\n\n[TABLE1]\nB1=第二个表\nB2=Hello™\n",
+    'SA': "[MAIN]\n0ABCDEF1= 前面有空格\n12345678=中文\n0ABCDEF2=\u3000全角\n[TABLE1]\n1=第二个表\n",
+    'III': "KZE39= 前面有空格\nA1=中文 \nA2=\u3000全角\nB2=\n",
+    'IV': "[MAIN]\n0x12345678= 前面有空格\n;0x12345678=original\nSOMEKEY=中文™\n0x00000002=\u3000全角\n[TABLE1]\n0x00000001=第二个表\n",
+}
+
+
+@pytest.mark.parametrize('version', sorted(SOURCES))
+def test_convert_txt_matches_build(tmp_path, version):
+    src = tmp_path / 'src.txt'
+    src.write_text(SOURCES[version], encoding='utf-8')
+    convert_dir = tmp_path / 'convert'
+    convert_dir.mkdir()
+    built = tmp_path / 'built.gxt'
+
+    assert gxteditor.main(['convert', '-t', 'gxt', '-V', version, '-j', '1', str(src), '-d', str(convert_dir)]) == 0
+    assert gxteditor.main(['build', version, str(src), '-o', str(built), '--build-dir', str(tmp_path / 'cache')]) == 0
+
+    assert (convert_dir / 'src.gxt').read_bytes() == built.read_bytes()
+
+
+def build_source(tmp_path, version):
+    """写出 SOURCES[version] 并构建为 GXT，返回 (TXT 路径, GXT 路径)"""
+    src = tmp_path / 'src.txt'
+    src.write_text(SOURCES[version], encoding='utf-8')
+    built = tmp_path / 'built.gxt'
+    assert gxteditor.main(['build', version, str(src), '-o', str(built), '--build-dir', str(tmp_path / 'cache')]) == 0
+    return src, built
+
+
+def test_convert_creates_output_dir(tmp_path):
+    _, built = build_source(tmp_path, 'VC')
+    out_dir = tmp_path / 'missing' / 'out'
+    assert gxteditor.main(['dump', '-j', '1', str(built), '-d', str(out_dir)]) == 0
+    assert gxteditor.main(['convert', '-t', 'gxt', '-j', '1', str(built), '-d', str(out_dir / 'gxt')]) == 0
+    assert (out_dir / 'built.txt').exists() and (out_dir / 'gxt' / 'built.gxt').read_bytes() == built.read_bytes()
+
+
+@pytest.mark.parametrize('version', sorted(SOURCES))
+def test_diff_built_gxt_against_source(tmp_path, version):
+    from gxt_diff import diff_files, ADDED, REMOVED, CHANGED
+    src, built = build_source(tmp_path, version)
+    stats = diff_files(str(built), str(src), str(tmp_path / 'diff.txt'), 'txt', version)
+    assert (stats[ADDED], stats[REMOVED], stats[CHANGED]) == (0, 0, 0)
+
+
+@pytest.mark.parametrize('argv', [['diff', 'a.gxt', 'b.txt'], ['stats', 'a.txt'], ['replace', 'a.txt', 'x', 'y'],
+                                  ['merge', 'a.gxt', 'b.txt', 'c.gxt', '-o', 'm.txt']])
+def test_txt_input_requires_version(argv, capsys):
+    with pytest.raises(SystemExit) as e:
+        gxteditor.main(argv)
+    assert e.value.code == 2 and '-V' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('version', sorted(SOURCES))
+def test_merge_without_edits_reproduces_input(tmp_path, version):
+    _, built = build_source(tmp_path, version)
+    assert gxteditor.main(['dump', '-j', '1', str(built), '-d', str(tmp_path)]) == 0
+    txt = tmp_path / 'built.txt'
+    merged = tmp_path / 'merged.txt'
+    assert gxteditor.main(['merge', '-V', version, str(txt), str(txt), str(txt), '-o', str(merged)]) == 0
+    assert merged.read_bytes() == txt.read_bytes()
+
+
+@pytest.mark.parametrize('version', sorted(SOURCES))
+def test_replace_without_matches_keeps_input(tmp_path, version):
+    _, built = build_source(tmp_path, version)
+    assert gxteditor.main(['dump', '-j', '1', str(built), '-d', str(tmp_path)]) == 0
+    for src in (tmp_path / 'built.txt', built):
+        out = tmp_path / ('replaced' + src.suffix)
+        assert gxteditor.main(['replace', '-V', version, str(src), '不存在的文本', 'x', '-o', str(out)]) == 0
+        assert out.read_bytes() == src.read_bytes()
@@ -0,0 +1,40 @@
+import struct
+
+from whm_table import BINARY_TEXT, WhmTableReader, iter_whm_table, parse_whm_table, write_whm_table
+
+PAIRS = [(0x30, "第三"), (0x10, ""), (0x20, "Hello"), (0x40, ""), (0x10, "重复的哈希"), (0x50, "café")]
+
+
+def _check_reader_matches_parser(path):
+    parsed = {item["hash"]: item["text"] for item in parse_whm_table(path)}
+    with WhmTableReader(path) as reader:
+        for h, text in parsed.items():
+            assert reader.get(h) == text
+        assert reader.get(0x99) is None
+
+
+def test_reader_matches_parser(tmp_path):
+    for optimize in (False, True):
+        path = tmp_path / f"whm_{optimize}.dat"
+        write_whm_table(path, PAIRS, optimize)
+        _check_reader_matches_parser(path)
+        with WhmTableReader(path) as reader:
+            assert reader.get(0x40) == BINARY_TEXT
+
+
+def test_out_of_range_offset(tmp_path):
+    path = tmp_path / "whm.dat"
+    write_whm_table(path, [(1, "有效"), (2, "越界")])
+    data = bytearray(path.read_bytes())
+    struct.pack_into("<I", data, 4 + 8 + 4, 0xFFFF)  # 第二个条目的偏移
+    path.write_bytes(bytes(data))
+    _check_reader_matches_parser(path)
+    with WhmTableReader(path) as reader:
+        assert reader.get(2) == BINARY_TEXT
+
+
+def test_iter_keeps_empty_text(tmp_path):
+    # 流式读取用于格式转换，空字符串原样保留，不写成占位文本
+    path = tmp_path / "whm.dat"
+    write_whm_table(path, PAIRS)
+    assert list(iter_whm_table(path)) == PAIRS
@@ -0,0 +1,202 @@
+import os
+import re
+
+# =======================
+# 流式 TXT 解析（四种格式 + 编辑器通用格式共用）
+# 逐行读取，不整体载入文件；各版本的正则预编译一次
+# =======================
+
+# 记录类型
+TABLE = 0     # 表头:       (TABLE, 行号, 表名, None)
+ENTRY = 1     # 键值对:     (ENTRY, 行号, 键, 值)
+ORIGINAL = 2  # 原文(IV ;): (ORIGINAL, 行号, 键, 值)
+INVALID = 3   # 无法识别:   (INVALID, 行号, 整行, None)
+
+
+class TxtDialect:
+    """单个版本的 TXT 语法描述"""
+    __slots__ = ('table_re', 'entry_re', 'strip', 'comment')
+
+    def __init__(self, table_re, entry_re, strip=True, comment='skip'):
+        self.table_re = re.compile(table_re) if table_re else None
+        self.entry_re = re.compile(entry_re)
+        self.strip = strip        # True: 去除首尾空白; False: 仅去除换行
+        self.comment = comment    # 'skip': 跳过 ; 行; 'original': ; 行为原文; None: 不处理
+
+
+DIALECTS = {
+    'III': TxtDialect(None, r'([0-9a-zA-Z_]{1,7})=(.*)', strip=False),
+    'VC': TxtDialect(r'\[([0-9A-Z_]{1,7})\]', r'([0-9A-Z_]{1,7})=(.*)'),
+    'SA': TxtDialect(r'\[([0-9A-Z_]{1,7})\]', r'([0-9a-fA-F]{1,8})=(.+)'),
+    'IV': TxtDialect(r'\[([0-9a-zA-Z_]{1,7})\]\s*', r'(.+?)=(.*)', comment='original'),
+    # 编辑器导入用的宽松格式（与各版本一样跳过 ; 注释行，例如合并冲突标记）
+    'TXT': TxtDialect(r'\[(.*)\]', r'([^=]*)=(.*)'),
+    'TXT-MAIN': TxtDialect(None, r'([^=]*)=(.*)'),
+}
+
+
+def iter_records(path, dialect, errors='strict'):
+    """逐行产出 (类型, 行号, 名称/键, 值) 记录，内存占用与文件大小无关"""
+    if isinstance(dialect, str):
+        dialect = DIALECTS[dialect]
+    table_match = dialect.table_re.fullmatch if dialect.table_re else None
+    entry_match = dialect.entry_re.fullmatch
+    strip = dialect.strip
+    comment = dialect.comment
+
+    with open(path, 'r', encoding='utf-8-sig', errors=errors) as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip() if strip else line.rstrip('\n')
+            if not line:
+                continue
+
+            kind = ENTRY
+            if line[0] == ';':
+                if comment == 'skip':
+                    continue
+                if comment == 'original':
+                    kind = ORIGINAL
+                    line = line[1:]
+
+            if kind == ENTRY and table_match is not None:
+                m = table_match(line)
+                if m:
+                    yield TABLE, line_no, m.group(1), None
+                    continue
+
+            m = entry_match(line)
+            if m:
+                yield kind, line_no, m.group(1), m.group(2)
+            else:
+                yield INVALID, line_no, line, None
+
+
+def filter_chars(chars, threshold):
+    """从字符集合中取出码点大于 threshold 的字符"""
+    return {c for c in chars if ord(c) > threshold}
+
+
+def utf16_units(chars, threshold):
+    """把字符集合转换为 UTF-16 码元集合，结果与逐个值编码后再收集一致"""
+    units = set()
+    for c in chars:
+        o = ord(c)
+        if o > 0xFFFF:
+            o -= 0x10000
+            units.add(0xD800 + (o >> 10))
+            units.add(0xDC00 + (o & 0x3FF))
+        elif o > threshold:
+            units.add(o)
+    return units
+
+
+def dump_txt(path, data, version):
+    """按编辑器“导出为单个TXT”的格式写出 {表名: {键: 值}}"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, (t, d) in enumerate(sorted(data.items())):
+            if i > 0: f.write("\n\n")
+            if version != 'III': f.write(f"[{t}]\n")
+            f.writelines([f"{k}={v}\n" for k, v in sorted(d.items())])
+
+
+# =======================
+# 多文件导入：进程池并行解析，按文件顺序合并（后者覆盖前者）
+# =======================
+
+# 文件总大小低于此值时串行解析：进程池的启动（Windows 的 spawn 方式下每个子进程都要重新导入
+# __main__，即带 PySide6 的 main.py，约 0.5 s）和结果回传（约为解析时间的 0.3~0.4 倍）超过并行节省的时间
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+
+
+def _parallel_workers(files, max_workers):
+    """并行解析使用的进程数；返回 1 表示串行解析"""
+    workers = min(max_workers or os.cpu_count() or 1, len(files))
+    if workers < 2:
+        return 1
+    total = 0
+    for path in files:
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    return workers if total >= PARALLEL_MIN_BYTES else 1
+
+def load_txt_file(path, version):
+    """解析单个 TXT 文件为编辑器数据（供进程池调用）
+    返回 (首个表头之前的条目, {表名: {键: 值}}, 最后一个表头)"""
+    lead = {}
+    tables = {}
+    if version == 'IV':
+        from IVGXT import load_txt as load_iv_txt
+        txt_data, _ = load_iv_txt(path)
+        for table_name, entries in txt_data.items():
+            tables[table_name] = {e['hash_string']: e['translated'] for e in entries}
+        return lead, tables, None
+
+    if version == 'III':
+        target = tables['MAIN'] = {}
+        dialect = 'TXT-MAIN'
+    else:
+        target = lead
+        dialect = 'TXT'
+    current_table = None
+    for kind, _, name, value in iter_records(path, dialect):
+        if kind == TABLE:
+            current_table = name.strip()
+            target = tables.setdefault(current_table, {}) if current_table else None
+        elif kind == ENTRY and target is not None:
+            key = name.strip()
+            if key: target[key] = value.strip()
+    return lead, tables, current_table
+
+
+def load_txt_files(files, version, max_workers=None, progress=None, is_stale=None):
+    """解析多个 TXT 文件（总大小超过 PARALLEL_MIN_BYTES 且有多个 CPU 时用进程池并行）并按文件顺序确定性合并
+    返回 (data, conflicts)，conflicts 为 (表名, 键, 先前文件, 覆盖文件) 列表
+    progress(已解析文件数, 文件总数, 文件路径) 报告进度；is_stale() 为真时放弃并返回 None"""
+    files = [str(p) for p in files]
+    results = []
+
+    def collect(parsed):
+        for path, result in zip(files, parsed):
+            if is_stale is not None and is_stale():
+                return False
+            results.append(result)
+            if progress is not None:
+                progress(len(results), len(files), path)
+        return True
+
+    workers = _parallel_workers(files, max_workers)
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            chunksize = max(1, len(files) // (workers * 4))
+            finished = collect(pool.map(load_txt_file, files, [version] * len(files), chunksize=chunksize))
+        finally:
+            # 放弃时不等待尚未开始的文件
+            pool.shutdown(wait=True, cancel_futures=True)
+    else:
+        finished = collect(load_txt_file(p, version) for p in files)
+    if not finished:
+        return None
+
+    data = {'MAIN': {}} if version == 'III' else {}
+    owners = {}
+    conflicts = []
+    current_table = None
+    for path, (lead, tables, last_table) in zip(files, results):
+        # 没有表头的条目沿用上一个文件最后的表（与逐个文件顺序读取一致）
+        parts = [(current_table, lead)] if lead and current_table in data else []
+        parts.extend(tables.items())
+        for table_name, entries in parts:
+            table = data.setdefault(table_name, {})
+            owner = owners.setdefault(table_name, {})
+            for key in table.keys() & entries.keys():
+                if owner[key] != path:
+                    conflicts.append((table_name, key, owner[key], path))
+            table.update(entries)
+            owner.update(dict.fromkeys(entries, path))
+        if last_table is not None:
+            current_table = last_table
+    return data, conflicts
@@ -1,19 +1,22 @@
-import struct, json
+import struct, json, mmap, re
+from array import array
 from pathlib import Path
 
+import numpy as np
+
 UINT32 = "<I"
 ENTRY_STRUCT = "<II"  # hash(uint32), offset(uint32)
+ENTRY_DTYPE = np.dtype([("hash", "<u4"), ("offset", "<u4")])
+BINARY_TEXT = "[BINARY]"  # 空字符串或越界偏移的显示文本（parse_whm_table、WhmTableReader.get 与界面一致）
 
 def read_u32(b: bytes, off: int):
     return struct.unpack_from(UINT32, b, off)[0], off + 4
 
 def read_entries(data: bytes):
+    """返回 (条目数组[hash, offset], blob 起始位置, blob 大小)，条目表一次读入"""
     count, off = read_u32(data, 0)
-    entries = []
-    for _ in range(count):
-        h, o = struct.unpack_from(ENTRY_STRUCT, data, off)
-        entries.append((h, o))
-        off += struct.calcsize(ENTRY_STRUCT)
+    entries = np.frombuffer(data, dtype=ENTRY_DTYPE, count=count, offset=off)
+    off += count * ENTRY_DTYPE.itemsize
     blob_size, _ = read_u32(data, off)
     blob_start = off + 4
     return entries, blob_start, blob_size
@@ -26,57 +29,321 @@ def decode_bytes(bts: bytes):
             continue
     return bts.hex()
 
+def decode_blob(blob: bytes, offsets):
+    """按偏移取出 blob 中以 0 结尾的字符串并解码
+    整个 blob 先一次性按 UTF-8 解码再按 0 切分（0 不会出现在多字节字符中间），
+    偏移用 searchsorted 对应到各段；失败时才逐段回退到 decode_bytes"""
+    size = len(blob)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    zero_idx = np.flatnonzero(np.frombuffer(blob, dtype=np.uint8) == 0)
+    # blob.split(b'\0') 的第 i 段从 piece_starts[i] 开始
+    piece_starts = np.concatenate(([0], zero_idx + 1))
+    idx = np.searchsorted(piece_starts, offsets, side='right') - 1
+    aligned = (offsets < size) & (piece_starts[idx] == offsets)
+
+    try:
+        pieces = blob.decode("utf-8").split("\x00")
+    except UnicodeDecodeError:
+        pieces = [decode_bytes(p) for p in blob.split(b"\x00")]
+    texts = np.array(pieces, dtype=object)[idx]
+
+    # 少数指向字符串中间或越界的偏移单独处理
+    for i in np.flatnonzero(~aligned).tolist():
+        off = int(offsets[i])
+        if off < size:
+            end = blob.find(b"\x00", off)
+            texts[i] = decode_bytes(blob[off:end if end != -1 else size])
+        else:
+            texts[i] = ""
+    # 空字符串或越界，标记为二进制
+    return [t or BINARY_TEXT for t in texts.tolist()]
+
 def parse_whm_table(path: Path):
     data = path.read_bytes()
     entries, blob_start, blob_size = read_entries(data)
     blob = data[blob_start:blob_start+blob_size]
 
-    results = []
-    for h, off in entries:
-        # offset 相对于 blob 起始
-        if off < blob_size:
-            j = off
-            while j < blob_size and blob[j] != 0:
-                j += 1
-            bts = blob[off:j]
-        else:
-            # 越界，标记为二进制
-            bts = b''
-        text = decode_bytes(bts) if bts else "[BINARY]"
-        results.append({"hash": h, "offset": off, "text": text})
-    return results
+    # offset 相对于 blob 起始
+    texts = decode_blob(blob, entries["offset"])
+    hashes = entries["hash"].tolist()
+    offsets = entries["offset"].tolist()
+    return [{"hash": h, "offset": off, "text": text} for h, off, text in zip(hashes, offsets, texts)]
+
+def dump_whm_table(out_path: Path, items, optimize: bool = False):
+    write_whm_table(out_path, ((item["hash"], item["text"]) for item in items), optimize)
+
+# ---------- 流式读写（不经过 JSON） ----------
+def iter_whm_table(path: Path, chunk: int = 4096):
+    """逐条产出 (hash, text)；用 mmap 按块读取条目表，内存占用与文件大小无关。空字符串产出 ''"""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        count, off = read_u32(mm, 0)
+        blob_size, blob_start = read_u32(mm, off + count * ENTRY_DTYPE.itemsize)
+        blob_end = min(blob_start + blob_size, len(mm))
+        for base in range(0, count, chunk):
+            n = min(chunk, count - base)
+            block = mm[off + base * ENTRY_DTYPE.itemsize:off + (base + n) * ENTRY_DTYPE.itemsize]
+            for h, o in struct.iter_unpack(ENTRY_STRUCT, block):
+                yield h, _read_string(mm, blob_start + o, blob_end)
+
+def _read_string(buf, start: int, end_limit: int):
+    """读取 buf[start:] 中以 0 结尾的字符串，越界时返回 ''"""
+    if start >= end_limit:
+        return ""
+    end = buf.find(b"\x00", start, end_limit)
+    bts = buf[start:end if end != -1 else end_limit]
+    try:
+        return bts.decode("utf-8")
+    except UnicodeDecodeError:
+        return decode_bytes(bts)
 
-def dump_whm_table(out_path: Path, items):
+def write_whm_table(out_path: Path, pairs, optimize: bool = False):
+    """由 (hash, text) 写出 whm_table.dat：条目表打包为一个数组，整个文件一次写出。返回条目数
+    optimize=True 时按哈希排序（重复的哈希保留最后一个）并让相同的文本共用同一个偏移，
+    便于 WhmTableReader 二分查找"""
+    if optimize:
+        pairs = sorted(dict(pairs).items())
+    shared = {} if optimize else None
+    hashes = array("I")
+    offsets = array("I")
     blob = bytearray()
-    offsets = []
-    for item in items:
-        b = item["text"].encode("utf-8")
+    for h, text in pairs:
+        hashes.append(h)
+        if shared is not None:
+            off = shared.get(text)
+            if off is not None:
+                offsets.append(off)
+                continue
+            shared[text] = len(blob)
         offsets.append(len(blob))
-        blob.extend(b)
+        blob += text.encode("utf-8")
         blob.append(0)
-    count = len(items)
-    header = bytearray()
-    header.extend(struct.pack(UINT32, count))
-    for (item, off) in zip(items, offsets):
-        header.extend(struct.pack(ENTRY_STRUCT, item["hash"], off))
-    header.extend(struct.pack(UINT32, len(blob)))
-    out_data = bytes(header) + bytes(blob)
-    out_path.write_bytes(out_data)
+
+    count = len(hashes)
+    blob_start = 4 + count * ENTRY_DTYPE.itemsize + 4
+    buf = bytearray(blob_start + len(blob))
+    struct.pack_into(UINT32, buf, 0, count)
+    header = np.frombuffer(buf, dtype=ENTRY_DTYPE, count=count, offset=4)
+    header["hash"] = np.frombuffer(hashes, dtype=np.uint32)
+    header["offset"] = np.frombuffer(offsets, dtype=np.uint32)
+    del header
+    struct.pack_into(UINT32, buf, blob_start - 4, len(blob))
+    buf[blob_start:] = blob
+    Path(out_path).write_bytes(buf)
+    return count
+
+# ---------- mmap 查找与校验 ----------
+class WhmTableReader:
+    """用 mmap 打开 whm_table.dat，get(hash) 在条目表上二分查找，不解析整个文件
+
+    按哈希排序的文件（write_whm_table(optimize=True)）直接查找；
+    未排序的文件在打开时建立一次排序索引。重复的哈希取最后一个，与 parse_whm_table 转为字典时一致"""
+
+    def __init__(self, path: Path):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        count, off = read_u32(self._mm, 0)
+        self._entries = np.frombuffer(self._mm, dtype=ENTRY_DTYPE, count=count, offset=off)
+        blob_size, self._blob_start = read_u32(self._mm, off + count * ENTRY_DTYPE.itemsize)
+        self._blob_end = min(self._blob_start + blob_size, len(self._mm))
+        # searchsorted 需要连续数组：哈希列复制一次（每条 4 字节），文本仍按需从 mmap 读取
+        self._keys = np.ascontiguousarray(self._entries["hash"])
+        self._order = None
+        self.is_sorted = bool(np.all(self._keys[1:] >= self._keys[:-1]))
+        if not self.is_sorted:
+            self._order = np.argsort(self._keys, kind="stable")
+            self._keys = self._keys[self._order]
+
+    def _index(self, h: int):
+        if not 0 <= h <= 0xFFFFFFFF:
+            return -1
+        # 用 np.uint32 作为查找值，否则 NumPy 会把整个数组转换为 int64 再查找
+        i = int(self._keys.searchsorted(np.uint32(h), side="right")) - 1
+        if i < 0 or self._keys[i] != h:
+            return -1
+        return int(self._order[i]) if self._order is not None else i
+
+    def get(self, h: int, default=None):
+        """返回哈希对应的文本，与 parse_whm_table 相同：空字符串或越界偏移返回 BINARY_TEXT"""
+        i = self._index(h)
+        if i < 0:
+            return default
+        return _read_string(self._mm, self._blob_start + int(self._entries["offset"][i]), self._blob_end) or BINARY_TEXT
+
+    def __contains__(self, h: int):
+        return self._index(h) >= 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def close(self):
+        # 先释放指向 mmap 的数组，否则 mmap 无法关闭
+        self._entries = self._keys = self._order = None
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def verify_whm_table(path: Path):
+    """用 mmap 检查 whm_table.dat 的结构，返回 (问题列表, 信息)；问题列表为空表示文件有效"""
+    problems = []
+    info = {"count": 0, "sorted": False, "duplicates": 0, "shared": 0}
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        if size < 8:
+            return ["文件太小，不是有效的 whm_table"], info
+        count, off = read_u32(mm, 0)
+        info["count"] = count
+        header_end = off + count * ENTRY_DTYPE.itemsize + 4
+        if header_end > size:
+            return [f"条目数 {count} 超出文件大小"], info
+        blob_size, blob_start = read_u32(mm, header_end - 4)
+        if blob_start + blob_size != size:
+            problems.append(f"blob 大小 {blob_size} 与文件剩余 {size - blob_start} 字节不符")
+        blob_size = min(blob_size, size - blob_start)
+
+        entries = np.frombuffer(mm, dtype=ENTRY_DTYPE, count=count, offset=off)
+        blob = np.frombuffer(mm, dtype=np.uint8, count=blob_size, offset=blob_start)
+        try:
+            hashes = entries["hash"]
+            offsets = entries["offset"]
+            info["sorted"] = bool(np.all(hashes[1:] >= hashes[:-1]))
+            info["duplicates"] = count - len(np.unique(hashes))
+            info["shared"] = count - len(np.unique(offsets))
+            if info["duplicates"]:
+                problems.append(f"有 {info['duplicates']} 个重复的哈希")
+
+            bad = int(np.count_nonzero(offsets >= blob_size))
+            if bad:
+                problems.append(f"有 {bad} 个偏移超出 blob")
+            zero_idx = np.flatnonzero(blob == 0)
+            if count and bad < count and (not len(zero_idx) or offsets[offsets < blob_size].max() > zero_idx[-1]):
+                problems.append("最后一个字符串缺少 0 终止符")
+            try:
+                mm[blob_start:blob_start + blob_size].decode("utf-8")
+            except UnicodeDecodeError as e:
+                problems.append(f"blob 中有非 UTF-8 文本（位置 {e.start}）")
+        finally:
+            # 释放指向 mmap 的数组后 mmap 才能关闭
+            del entries, blob
+            hashes = offsets = zero_idx = None
+    return problems, info
+
+# 文本格式：每行 "0xHASH<TAB>文本"，文本中的 \、制表符和换行转义
+_ESCAPE_TABLE = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+_UNESCAPES = {"\\": "\\", "t": "\t", "n": "\n", "r": "\r"}
+_UNESCAPE_RE = re.compile(r"\\(.)")
+
+def _unescape(text: str):
+    if "\\" not in text:
+        return text
+    return _UNESCAPE_RE.sub(lambda m: _UNESCAPES.get(m.group(1), m.group(0)), text)
+
+def iter_lines(path: Path):
+    """逐行读取 "hash<TAB>text" 文本，产出 (hash, text)"""
+    with open(path, "r", encoding="utf-8-sig", newline="\n") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.rstrip("\r\n")
+            if not line:
+                continue
+            key, sep, text = line.partition("\t")
+            try:
+                if not sep:
+                    raise ValueError("缺少制表符")
+                h = int(key, 16)
+            except ValueError as e:
+                raise ValueError(f"{path}: 第 {line_no} 行无法识别: {e}") from None
+            yield h, _unescape(text)
+
+def dat_to_lines(src: Path, dst: Path):
+    count = 0
+    with open(dst, "w", encoding="utf-8", newline="\n") as f:
+        for h, text in iter_whm_table(src):
+            f.write(f"0x{h:08X}\t{text.translate(_ESCAPE_TABLE)}\n")
+            count += 1
+    return count
+
+def lines_to_dat(src: Path, dst: Path):
+    return write_whm_table(dst, iter_lines(src))
+
+def dat_to_gxt(src: Path, dst: Path, table: str = "MAIN"):
+    """whm_table.dat → GTA IV GXT（全部条目放入一个表）"""
+    from gxt_build import assemble_gxt, encode_tables
+    data = {table: {f"0x{h:08X}": text for h, text in iter_whm_table(src)}}
+    Path(dst).write_bytes(assemble_gxt("IV", encode_tables("IV", data)))
+    return len(data[table])
+
+def gxt_to_dat(src: Path, dst: Path, tables=None):
+    """按哈希索引的 GXT（IV / SA）→ whm_table.dat，每次只解码一个表"""
+    from gxt_parser import read_table_blocks, decode_table_block
+    version, blocks = read_table_blocks(src)
+    if version not in ("IV", "SA"):
+        raise ValueError(f"{version} 版本的 GXT 没有哈希键，无法转换为 whm_table")
+    for name in tables or []:
+        if name not in blocks:
+            raise ValueError(f"GXT 中没有表 '{name}'")
+
+    def pairs():
+        for name in tables or list(blocks):
+            for key, text in decode_table_block(version, blocks.pop(name)).items():
+                yield int(key, 16), text
+    return write_whm_table(dst, pairs())
+
+USAGE = """用法:
+ 解析: python whm_table.py parse in.dat out.json
+ 生成: python whm_table.py dump in.json out.dat
+ 导出文本: python whm_table.py totxt in.dat out.txt      (每行 0xHASH<TAB>文本)
+ 导入文本: python whm_table.py fromtxt in.txt out.dat
+ 转为GXT: python whm_table.py togxt in.dat out.gxt [表名]
+ 由GXT生成: python whm_table.py fromgxt in.gxt out.dat [表名...]
+ 排序去重: python whm_table.py optimize in.dat out.dat     (按哈希排序，相同文本共用偏移)
+ 校验: python whm_table.py verify in.dat
+ 查找: python whm_table.py get in.dat 0xHASH"""
 
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) < 3:
-        print("用法:\n 解析: python whm_table_tool.py parse in.dat out.json\n 生成: python whm_table_tool.py dump in.json out.dat")
+    if len(sys.argv) == 3 and sys.argv[1] == "verify":
+        problems, info = verify_whm_table(Path(sys.argv[2]))
+        print(f"条目 {info['count']}, 按哈希排序: {'是' if info['sorted'] else '否'}, 共用偏移 {info['shared']}")
+        for problem in problems:
+            print(f"错误: {problem}")
+        raise SystemExit(1 if problems else 0)
+    if len(sys.argv) < 4:
+        print(USAGE)
         raise SystemExit(1)
 
-    cmd = sys.argv[1]
-    if cmd == "parse":
-        items = parse_whm_table(Path(sys.argv[2]))
-        with open(sys.argv[3], "w", encoding="utf-8") as f:
+    cmd, src, dst = sys.argv[1], Path(sys.argv[2]), Path(sys.argv[3])
+    if cmd == "get":
+        with WhmTableReader(src) as reader:
+            text = reader.get(int(sys.argv[3], 16))
+        if text is None:
+            print(f"未找到: {sys.argv[3]}")
+            raise SystemExit(1)
+        print(text)
+    elif cmd == "optimize":
+        print(f"生成完成: {write_whm_table(dst, iter_whm_table(src), optimize=True)} 条 → {dst}")
+    elif cmd == "parse":
+        items = parse_whm_table(src)
+        with open(dst, "w", encoding="utf-8") as f:
             json.dump(items, f, ensure_ascii=False, indent=2)
-        print(f"解析完成: {len(items)} 条 → {sys.argv[3]}")
+        print(f"解析完成: {len(items)} 条 → {dst}")
     elif cmd == "dump":
-        with open(sys.argv[2], "r", encoding="utf-8") as f:
+        with open(src, "r", encoding="utf-8") as f:
             items = json.load(f)
-        dump_whm_table(Path(sys.argv[3]), items)
-        print(f"生成完成: {len(items)} 条 → {sys.argv[3]}")
+        dump_whm_table(dst, items)
+        print(f"生成完成: {len(items)} 条 → {dst}")
+    elif cmd == "totxt":
+        print(f"导出完成: {dat_to_lines(src, dst)} 条 → {dst}")
+    elif cmd == "fromtxt":
+        print(f"生成完成: {lines_to_dat(src, dst)} 条 → {dst}")
+    elif cmd == "togxt":
+        table = sys.argv[4] if len(sys.argv) > 4 else "MAIN"
+        print(f"转换完成: {dat_to_gxt(src, dst, table)} 条 → {dst}")
+    elif cmd == "fromgxt":
+        print(f"生成完成: {gxt_to_dat(src, dst, sys.argv[4:])} 条 → {dst}")
+    else:
+        print(USAGE)
+        raise SystemExit(1)